@@ -1,7 +1,11 @@
 import os
-import requests
+import sys
 from dotenv import load_dotenv
 
+# Allow running as `python agents/<script>.py` from the repo root.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from dashboard import providers  # noqa: E402
+
 load_dotenv()
 
 
@@ -11,14 +15,9 @@ def query_openrouter(prompt: str):
         print("❌ ERROR: OPENROUTER_API_KEY not found in .env")
         return ""
 
-    url = "https://openrouter.ai/api/v1/chat/completions"
-    headers = {
-        "Authorization": f"Bearer {api_key}",
-        "Content-Type": "application/json"
-    }
-
     payload = {
-        "model": "openai/gpt-4",  # You can replace with: mistralai/mistral-7b-instruct
+        "agent": "credit",
+        "models": {"openrouter": "openai/gpt-4"},  # You can replace with: mistralai/mistral-7b-instruct
         "messages": [
             {"role": "system", "content": "You are a Credit Scoring and Lending Advisor AI. Your job is to analyze applicant data and make smart loan recommendations, considering financial inclusion and local economic realities."},
             {"role": "user", "content": prompt}
@@ -29,19 +28,11 @@ def query_openrouter(prompt: str):
 
     try:
         print("🔍 Sending request to OpenRouter...")
-        response = requests.post(url, headers=headers, json=payload)
-        response.raise_for_status()
+        content = providers.call(providers.PROVIDERS["openrouter"], payload)
         print("✅ Response received")
-        return response.json()["choices"][0]["message"]["content"]
-    except requests.exceptions.HTTPError as http_err:
-        print(f"❌ HTTP error: {http_err}")
-        print("🔁 Response:", response.text)
-    except Exception as err:
-        print(f"❌ Unexpected error: {err}")
-        try:
-            print("🔁 Raw response:", response.json())
-        except:
-            print("⚠️ Unable to decode JSON.")
+        return content
+    except providers.UpstreamError as err:
+        print(f"❌ {err}")
 
     return ""
 
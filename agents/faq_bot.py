@@ -1,9 +1,14 @@
 # agents/faq_bot.py
 
 import os
-import requests
+import sys
 from dotenv import load_dotenv
 
+# Allow running as `python agents/<script>.py` from the repo root.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from dashboard import providers  # noqa: E402
+from dashboard.knowledge import knowledge_index  # noqa: E402
+
 load_dotenv()
 
 
@@ -15,7 +20,8 @@ def query_openrouter(prompt: str):
 
     print("\n🧾 Generating FAQ response...\n")
     payload = {
-        "model": "openai/gpt-4",
+        "agent": "faq",
+        "models": {"openrouter": "openai/gpt-4"},
         "messages": [
             {"role": "system", "content": "You are a friendly Customer Support FAQ Bot. You reply using clear, helpful responses pulled from known company policy and FAQ tone. You do not hallucinate."},
             {"role": "user", "content": prompt}
@@ -24,29 +30,23 @@ def query_openrouter(prompt: str):
         "max_tokens": 300
     }
 
-    headers = {
-        "Authorization": f"Bearer {api_key}",
-        "Content-Type": "application/json"
-    }
-
     try:
         print("🔍 Sending request to OpenRouter...")
-        response = requests.post(
-            "https://openrouter.ai/api/v1/chat/completions", headers=headers, json=payload)
-        response.raise_for_status()
+        content = providers.call(providers.PROVIDERS["openrouter"], payload)
         print("✅ Response received")
-        return response.json()["choices"][0]["message"]["content"]
-    except requests.exceptions.HTTPError as http_err:
-        print(f"❌ HTTP error: {http_err}\n🔁 Response: {response.text}")
-    except Exception as err:
-        print(f"❌ Unexpected error: {err}")
+        return content
+    except providers.UpstreamError as err:
+        print(f"❌ {err}")
+
     return None
 
 
 if __name__ == "__main__":
     print("📝 Ask a common customer support question:")
     user_question = input(">> ")
-    result = query_openrouter(user_question)
+    result = knowledge_index.answer(user_question)
+    if result is None:
+        result = query_openrouter(knowledge_index.with_context(user_question))
     if result:
         print("\n=== FAQ Bot Response ===\n")
         print(result)
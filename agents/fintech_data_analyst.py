@@ -1,7 +1,11 @@
 import os
-import requests
+import sys
 from dotenv import load_dotenv
 
+# Allow running as `python agents/<script>.py` from the repo root.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from dashboard import providers  # noqa: E402
+
 # Load environment variables
 load_dotenv()
 
@@ -13,16 +17,11 @@ def query_openrouter(prompt: str):
         print("❌ ERROR: OPENROUTER_API_KEY not found in .env")
         return ""
 
-    url = "https://openrouter.ai/api/v1/chat/completions"
-
-    headers = {
-        "Authorization": f"Bearer {api_key}",
-        "Content-Type": "application/json"
-    }
 
     payload = {
         # or try: openrouter/mistral-7b, openrouter/claude-3-sonnet
-        "model": "openai/gpt-4",
+        "agent": "fintech",
+        "models": {"openrouter": "openai/gpt-4"},
         "messages": [
             {"role": "system", "content": "You are a senior Fintech Data Analyst."},
             {"role": "user", "content": prompt}
@@ -34,21 +33,11 @@ def query_openrouter(prompt: str):
 
     try:
         print("🔍 Sending request to OpenRouter...")
-        response = requests.post(url, headers=headers, json=payload)
-        response.raise_for_status()
+        content = providers.call(providers.PROVIDERS["openrouter"], payload)
         print("✅ Response received")
-
-        return response.json()["choices"][0]["message"]["content"]
-
-    except requests.exceptions.HTTPError as http_err:
-        print(f"❌ HTTP error: {http_err}")
-        print("🔁 Response:", response.text)
-    except Exception as err:
-        print(f"❌ Unexpected error: {err}")
-        try:
-            print("🔁 Raw response:", response.json())
-        except:
-            print("⚠️ Unable to decode JSON.")
+        return content
+    except providers.UpstreamError as err:
+        print(f"❌ {err}")
 
     return ""
 
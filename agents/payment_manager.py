@@ -1,7 +1,11 @@
 import os
-import requests
+import sys
 from dotenv import load_dotenv
 
+# Allow running as `python agents/<script>.py` from the repo root.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from dashboard import providers  # noqa: E402
+
 # Load environment variables
 load_dotenv()
 
@@ -13,15 +17,10 @@ def query_openrouter(prompt: str):
         print("❌ ERROR: OPENROUTER_API_KEY not found in .env")
         return ""
 
-    url = "https://openrouter.ai/api/v1/chat/completions"
-    headers = {
-        "Authorization": f"Bearer {api_key}",
-        "Content-Type": "application/json"
-    }
-
     payload = {
         # Change to cheaper model like mistralai/mistral-7b-instruct if needed
-        "model": "openai/gpt-4",
+        "agent": "payment",
+        "models": {"openrouter": "openai/gpt-4"},
         "messages": [
             {"role": "system", "content": "You are a smart Payment Operations Assistant. Analyze the input and summarize any failed, duplicate, or suspicious transactions."},
             {"role": "user", "content": prompt}
@@ -32,19 +31,11 @@ def query_openrouter(prompt: str):
 
     try:
         print("🔍 Sending request to OpenRouter...")
-        response = requests.post(url, headers=headers, json=payload)
-        response.raise_for_status()
+        content = providers.call(providers.PROVIDERS["openrouter"], payload)
         print("✅ Response received")
-        return response.json()["choices"][0]["message"]["content"]
-    except requests.exceptions.HTTPError as http_err:
-        print(f"❌ HTTP error: {http_err}")
-        print("🔁 Response:", response.text)
-    except Exception as err:
-        print(f"❌ Unexpected error: {err}")
-        try:
-            print("🔁 Raw response:", response.json())
-        except:
-            print("⚠️ Unable to decode JSON.")
+        return content
+    except providers.UpstreamError as err:
+        print(f"❌ {err}")
 
     return ""
 
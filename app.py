@@ -1,184 +1,608 @@
+import contextvars
+import hmac
 import os
 import io
-import pytesseract
-import pdfplumber
-import speech_recognition as sr
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from dotenv import load_dotenv
-from flask import Flask, request, render_template
-import requests
-from werkzeug.utils import secure_filename
-from PIL import Image
+from flask import Flask, Response, abort, g, request, render_template, jsonify, make_response, stream_with_context
 from datetime import datetime
+from werkzeug.exceptions import RequestEntityTooLarge
+
+from dashboard import (agent_registry, audio, jobs, long_input, metrics, ocr, pdf_extract, profiler, providers, tabular,
+                       tracing, uploads)
+from dashboard.batch import clamp_concurrency, run_batch, to_jsonl
+from dashboard.extract_cache import extract_cache
+from dashboard.knowledge import knowledge_index
+from dashboard.prescreen import prescreen
+from dashboard.response_cache import make_key, response_cache
+from dashboard.sse import format_event
+from dashboard.timing import StageTimer
 
 # Load API key from .env
 load_dotenv()
 
 app = Flask(__name__)
-app.config["UPLOAD_FOLDER"] = "uploads"
-os.makedirs(app.config["UPLOAD_FOLDER"], exist_ok=True)
+# Size-checked, spooled uploads (see dashboard.uploads); oversized bodies get a 413 before they are read.
+app.request_class = uploads.UploadRequest
+app.config["MAX_CONTENT_LENGTH"] = uploads.MAX_BYTES
+app.config["MAX_FORM_MEMORY_SIZE"] = uploads.FORM_MEMORY_BYTES
+
+# Index knowledge/ up front so the first FAQ question doesn't pay for it.
+knowledge_index.refresh()
+
+# Agents whose prompts routinely outlast a web request; the page queues them as jobs.
+JOB_AGENTS = frozenset(a.strip() for a in os.getenv("JOB_AGENTS", "closer,reporter").split(",") if a.strip())
+
+# Most agents one input may be sent to at once (page, /fanout and /api/fanout).
+FANOUT_MAX_AGENTS = int(os.getenv("FANOUT_MAX_AGENTS", "5"))
+
+# Bearer token for the /admin endpoints; they 404 when it is unset.
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+# Paths not worth a trace (scrapes, polling).
+TRACE_SKIP_PATHS = frozenset(os.getenv("TRACE_SKIP_PATHS", "/metrics").split(","))
 
 
 # === Utilities ===
 def extract_text_from_pdf(file_stream):
-    with pdfplumber.open(file_stream) as pdf:
-        return "\n".join([page.extract_text() for page in pdf.pages if page.extract_text()])
+    return "\n".join(pdf_extract.iter_pdf_text(file_stream))
 
 
 def extract_text_from_image(image_file):
-    image = Image.open(image_file)
-    return pytesseract.image_to_string(image)
+    result = ocr.ocr_image(image_file)
+    print(f"🖼️ OCR {result.frames} frame(s): {result.timing_summary()}")
+    return result.text
 
 
 def transcribe_audio(audio_file):
-    recognizer = sr.Recognizer()
-    with sr.AudioFile(audio_file) as source:
-        audio = recognizer.record(source)
-    return recognizer.recognize_google(audio)
+    return audio.transcribe(audio_file)
 
 
-# === Main AI Agent Runner ===
-def run_agent(prompt, agent_type):
-    api_key = os.getenv("GROK_API_KEY")  # <- Using Grok key
-    if not api_key:
-        return "❌ ERROR: GROK_API_KEY not found in .env"
-
-    model_map = {
-        "fintech": "grok-4-0709",
-        "support": "grok-4-0709",
-        "payment": "grok-4-0709",
-        "credit": "grok-4-0709",
-        "faq": "grok-4-0709",
-        "sales": "grok-4-0709",
-        "hiring": "grok-4-0709",
-        "bpa": "grok-4-0709",
-        "regulatory": "grok-4-0709",
-        "portfolio": "grok-4-0709",
-        "onboarding": "grok-4-0709",
-        "monitor": "grok-4-0709",
-        "reporter": "grok-4-0709",
-        "leadgen": "grok-4-0709",
-        "fraud": "grok-4-0709",
-        "closer": "grok-4-0709"
-    }
+def extract_table(table_file, filename):
+    text = tabular.extract_table(table_file, filename)
+    print(f"📊 Table {filename}: {tabular.describe(text)}")
+    return text
 
-    role_map = {
-        "fintech": "You are a senior Fintech Data Analyst. Analyze market trends and give insights.",
-        "support": "You are a support ticket summarizer. Extract key points and sentiment.",
-        "payment": "You are a payments manager. Understand and respond to billing-related issues.",
-        "credit": "You are a credit advisor. Analyze applicant data and give lending advice.",
-        "faq": "You are a friendly Customer Support FAQ Bot. Answer user questions using known FAQ-style responses. Avoid making things up.",
-        "sales": "You are a sales conversion agent. Respond persuasively but politely. Convert leads. Handle discounts softly. Escalate if needed.",
-        "hiring": "You are a hiring screening agent. Score candidates against job descriptions as Strong Fit, Moderate Fit, or Poor Fit. Justify clearly in 2–3 bullet points.",
-        "bpa": "You are a business process automation expert. Analyze workflows, detect bottlenecks, and suggest automation opportunities.",
-        "regulatory": "You are a compliance officer. Review actions and flag any regulatory violations.",
-        "portfolio": "You are an investment advisor. Recommend portfolio strategies based on financial goals.",
-        "onboarding": "You are a customer onboarding specialist. Provide a step-by-step onboarding guide based on input.",
-        "monitor": "You are a transaction monitoring agent. Flag anomalies or unusual patterns from transaction data.",
-        "reporter": "You are a business reporter. Generate professional summaries based on company activity.",
-        "leadgen": "You are a lead generation specialist. Extract potential leads and classify them by interest.",
-        "fraud": "You are a fraud detection agent. Analyze behavior and data to flag potential fraud risk.",
-        "closer": "You are an account closure assistant. Assist users in safely and clearly closing accounts."
-    }
 
+# === Main AI Agent Runner ===
+def build_payload(prompt, agent_type, provider=None, max_tokens=None):
+    agent = agent_registry.get(agent_type)
+    messages = [{"role": "user", "content": prompt}]
+    if agent.system:
+        messages.insert(0, {"role": "system", "content": agent.system})
     payload = {
-        "model": model_map.get(agent_type, "grok-4-0709"),
-        "messages": [
-            {"role": "system", "content": role_map.get(agent_type)},
-            {"role": "user", "content": prompt}
-        ],
-        "temperature": 0.5,
-        "max_tokens": 500
+        "agent": agent.name,
+        "model": agent.model_for(providers.get_provider(provider)),
+        "messages": messages,
+        "temperature": agent.temperature,
+        "max_tokens": max_tokens or agent.max_tokens
     }
+    if agent.models:
+        payload["models"] = agent.models
+    return payload
+
+
+def response_cache_key(agent_type, payload):
+    if not agent_registry.get(agent_type).cache or not response_cache.enabled_for(agent_type):
+        return None
+    messages = payload["messages"]
+    system = messages[0]["content"] if len(messages) > 1 else None
+    return make_key(
+        agent_type, payload["model"], system, messages[-1]["content"],
+        payload["temperature"], payload["max_tokens"])
+
+
+def run_agent(prompt, agent_type, provider=None, max_tokens=None):
+    with tracing.span("run_agent", agent=agent_type, provider=provider):
+        return _run_agent(prompt, agent_type, provider, max_tokens)
 
-    headers = {
-        "Authorization": f"Bearer {api_key}",
-        "Content-Type": "application/json"
-    }
+
+def _run_agent(prompt, agent_type, provider=None, max_tokens=None):
+    payload = build_payload(prompt, agent_type, provider, max_tokens)
+
+    cache_key = response_cache_key(agent_type, payload)
+    if cache_key is not None:
+        cached = response_cache.get(cache_key)
+        if cached is not None:
+            print("⚡ Served from response cache")
+            tracing.set_attribute("cache.hit", True)
+            return cached
 
     try:
-        print("🔍 Sending request to Grok...")
-        response = requests.post(
-            "https://api.x.ai/v1/chat/completions", headers=headers, json=payload)
-        response.raise_for_status()
-        print("✅ Response received")
-        return response.json()["choices"][0]["message"]["content"]
-    except requests.exceptions.HTTPError as http_err:
-        return f"❌ HTTP error: {http_err}\n🔁 Response: {response.text}"
+        print(f"🔍 Sending request to {providers.get_provider(provider).label}...")
+        content, served_by = providers.complete(payload, provider)
+        print(f"✅ Response received from {served_by}")
+    except providers.UpstreamError as err:
+        return f"❌ {err}"
     except Exception as err:
         return f"❌ Unexpected error: {err}"
 
+    # Only cache answers from the model the key was built for.
+    if cache_key is not None and served_by == providers.get_provider(provider).name:
+        response_cache.set(cache_key, content)
+    return content
+
+
+def stream_agent(prompt, agent_type, provider=None, max_tokens=None):
+    """Yield the agent's answer in pieces as the provider generates it."""
+    payload = build_payload(prompt, agent_type, provider, max_tokens)
+
+    cache_key = response_cache_key(agent_type, payload)
+    if cache_key is not None:
+        cached = response_cache.get(cache_key)
+        if cached is not None:
+            print("⚡ Served from response cache")
+            yield cached
+            return
+
+    parts = []
+    try:
+        print(f"🔍 Streaming request to {providers.get_provider(provider).label}...")
+        deltas = providers.stream(payload, provider)
+        while True:
+            try:
+                delta = next(deltas)
+            except StopIteration as stop:
+                served_by = stop.value
+                break
+            parts.append(delta)
+            yield delta
+        print(f"✅ Stream finished from {served_by}")
+    except providers.UpstreamError as err:
+        yield f"❌ {err}"
+        return
+    except Exception as err:
+        yield f"❌ Unexpected error: {err}"
+        return
+
+    # Only cache answers from the model the key was built for.
+    if cache_key is not None and parts and served_by == providers.get_provider(provider).name:
+        response_cache.set(cache_key, "".join(parts))
+
+
+# === Request Helpers ===
+def pick_upload():
+    """Return ``(kind, file)`` for the upload to use, or ``(None, None)``."""
+    # Priority: Audio > Image > File > Text
+    for field, kind in (("audio_file", "audio"), ("image_file", "image"), ("text_file", "text")):
+        upload = request.files.get(field)
+        if upload and upload.filename:
+            if kind == "text" and upload.filename.lower().endswith(".pdf"):
+                kind = "pdf"
+            elif kind == "text" and tabular.is_table(upload.filename):
+                kind = "table"
+            return kind, upload
+    return None, None
+
+
+def extract_upload(kind, stream, filename=""):
+    extract = {
+        "audio": lambda: transcribe_audio(stream),
+        "image": lambda: extract_text_from_image(stream),
+        "pdf": lambda: extract_text_from_pdf(stream),
+        "table": lambda: extract_table(stream, filename),
+    }.get(kind)
+    if extract is None:
+        return stream.read().decode("utf-8")
+    version = {"audio": audio.CACHE_VERSION, "image": ocr.CACHE_VERSION,
+               "pdf": pdf_extract.CACHE_VERSION,
+               "table": f"{tabular.CACHE_VERSION}-{tabular.reader_for(filename)}"}[kind]
+
+    def timed():
+        with metrics.EXTRACT_SECONDS.labels(kind).time(), tracing.span(f"extract.{kind}", filename=filename):
+            return extract()
+
+    with tracing.span("extract_upload", kind=kind):
+        return extract_cache.get_or_extract(kind, version, stream, timed)
+
+
+def extract_user_input():
+    kind, upload = pick_upload()
+    if upload is None:
+        return request.form.get("user_input", "")
+    return extract_upload(kind, upload.stream, upload.filename)
+
+
+def build_prompt(agent, user_input):
+    spec = agent_registry.get(agent)
+    if spec.knowledge:
+        user_input = knowledge_index.with_context(user_input, spec.knowledge)
+    return spec.render(user_input)
+
+
+def prepare_input(agent, user_input):
+    """Swap tabular input for its pre-screen report on agents that ask for one."""
+    if agent_registry.get(agent).prescreen:
+        screened = prescreen(user_input)
+        if screened is not None:
+            print(f"🧮 Pre-screened {len(user_input)} chars of transactions down to {len(screened)}")
+            return screened
+    return user_input
+
+
+def direct_answer(agent, user_input):
+    """A stored FAQ answer when a knowledge-backed agent gets a known question."""
+    if not agent_registry.get(agent).knowledge:
+        return None
+    answer = knowledge_index.answer(user_input)
+    if answer is not None:
+        print("📚 Answered from the FAQ index")
+    return answer
+
+
+def long_input_steps(agent, user_input, provider=None):
+    """Map stage for an input too long for one call (see dashboard.long_input)."""
+    return long_input.collect_notes(
+        user_input, agent_registry.get(agent).render, lambda prompt: run_agent(prompt, agent, provider))
+
+
+def log_progress(update):
+    print(f"📚 {update['stage']} {update['done']}/{update['total']} (round {update['round']})")
+
+
+def run_long(agent, user_input, provider=None, progress=log_progress):
+    reduce_text = long_input.drain(long_input_steps(agent, user_input, provider), progress)
+    if reduce_text.startswith("❌"):
+        return reduce_text
+    return run_agent(build_prompt(agent, reduce_text), agent, provider, long_input.REDUCE_MAX_TOKENS)
+
+
+def run_prepared(agent, user_input, provider=None, progress=log_progress):
+    """The agent's answer for input that has already been through :func:`prepare_input`."""
+    if long_input.is_long(user_input):
+        return run_long(agent, user_input, provider, progress)
+    return direct_answer(agent, user_input) or run_agent(build_prompt(agent, user_input), agent, provider)
+
+
+def run_record(agent, user_input, provider=None, progress=log_progress):
+    return run_prepared(agent, prepare_input(agent, user_input), provider, progress)
+
+
+# === Multi-Agent Fan-out ===
+def fanout_agents(names):
+    """Known agents from ``names``, in order and without repeats; ValueError otherwise."""
+    agents = list(dict.fromkeys(name.strip() for name in names if name and name.strip()))
+    unknown = [name for name in agents if name not in agent_registry.AGENTS]
+    if unknown:
+        raise ValueError(f"Unknown agent(s): {', '.join(unknown)}")
+    if not agents:
+        raise ValueError("Choose at least one agent")
+    if len(agents) > FANOUT_MAX_AGENTS:
+        raise ValueError(f"Choose at most {FANOUT_MAX_AGENTS} agents")
+    return agents
+
+
+def prepare_fanout(agents, user_input):
+    """Each agent's input; the transaction pre-screen runs once for every agent that wants it."""
+    inputs, screened = {}, None
+    for agent in agents:
+        if agent_registry.get(agent).prescreen:
+            if screened is None:
+                screened = prepare_input(agent, user_input)
+            inputs[agent] = screened
+        else:
+            inputs[agent] = user_input
+    return inputs
+
+
+def _fanout_one(agent, user_input, provider):
+    start = time.perf_counter()
+    with tracing.span("fanout.agent", agent=agent):
+        try:
+            result = run_prepared(agent, user_input, provider)
+        except Exception as err:
+            result = f"❌ Unexpected error: {err}"
+    return agent, result, time.perf_counter() - start
+
+
+def run_fanout(agents, user_input, provider=None):
+    """Start every agent on ``user_input`` at once.
 
-# === Flask Route ===
+    Returns an iterator of ``(agent, result, seconds)`` in the order the
+    agents finish, so the whole run takes as long as the slowest agent.
+    """
+    inputs = prepare_fanout(agents, user_input)
+    pool = ThreadPoolExecutor(max_workers=len(agents), thread_name_prefix="fanout")
+    futures = [pool.submit(contextvars.copy_context().run, _fanout_one, agent, inputs[agent], provider)
+               for agent in agents]
+    return _completed(futures, pool)
+
+
+def _completed(futures, pool):
+    try:
+        for future in as_completed(futures):
+            yield future.result()
+    finally:
+        # A caller that stops listening (client gone) should not keep the models busy.
+        for future in futures:
+            future.cancel()
+        pool.shutdown(wait=False)
+
+
+def run_fanout_record(agents, user_input, provider=None, progress=None):
+    """Fan ``user_input`` out to ``agents``; return the combined answer.
+
+    ``progress`` gets the answers so far each time an agent finishes.
+    """
+    results = {}
+    for agent, result, seconds in run_fanout(agents, user_input, provider):
+        print(f"🔀 {agent} finished in {seconds:.2f}s ({len(results) + 1}/{len(agents)})")
+        results[agent] = result
+        if progress is not None:
+            progress({"stage": "fanout", "done": len(results), "total": len(agents), "results": results})
+    return combine(agents, results)
+
+
+def combine(agents, results):
+    """All answers in one document, one section per agent in the order they were chosen."""
+    return "\n\n".join(f"## {agent_registry.get(agent).label}\n\n{results[agent]}"
+                        for agent in agents if agent in results)
+
+
+# === Tracing and Profiling Hooks ===
+@app.before_request
+def start_trace():
+    if request.path in TRACE_SKIP_PATHS:
+        return
+    g.trace = tracing.begin(f"{request.method} {request.path}",
+                            request_id=request.headers.get("X-Request-ID"),
+                            traceparent=request.headers.get("traceparent"),
+                            **{"http.method": request.method, "http.route": request.path})
+    # Fetching or arming profiles must not use up the slots armed for the requests being studied.
+    g.profile = None if request.path.startswith("/admin/") else profiler.start()
+
+
+@app.after_request
+def tag_request_id(response):
+    if "trace" in g:
+        response.headers["X-Request-ID"] = g.trace[0].trace.request_id
+        if response.is_streamed:
+            # Streamed bodies are generated after teardown; finish once the server has sent them.
+            handle, sampler = g.pop("trace"), g.pop("profile", None)
+            response.call_on_close(lambda: end_trace(handle, sampler))
+    return response
+
+
+@app.teardown_request
+def finish_trace(error=None):
+    if "trace" in g:
+        end_trace(g.pop("trace"), g.pop("profile", None), error)
+
+
+def end_trace(handle, sampler, error=None):
+    if sampler is not None:
+        profiler.finish(sampler, f"{int(time.time())}-{handle[0].trace.trace_id}")
+    tracing.end(handle, error)
+
+
+def require_admin():
+    if not ADMIN_TOKEN:
+        abort(404)
+    supplied = request.headers.get("Authorization", "").removeprefix("Bearer ").strip()
+    if not hmac.compare_digest(supplied.encode(), ADMIN_TOKEN.encode()):
+        abort(403)
+
+
+@app.errorhandler(RequestEntityTooLarge)
+def upload_too_large(err):
+    message = err.description
+    if (request.content_length or 0) > uploads.MAX_BYTES:
+        message = f"Request is larger than the {uploads.MAX_BYTES // uploads.MB} MB upload limit"
+    return jsonify({"error": message}), 413
+
+
+# === Flask Routes ===
 @app.route("/", methods=["GET", "POST"])
 def index():
     result = ""
+    agent = None
+    timer = StageTimer(lambda stage, seconds: metrics.observe_stage(
+        stage, agent and agent_registry.get(agent).name, seconds))
     if request.method == "POST":
-        agent = request.form.get("agent")
-        user_input = request.form.get("user_input", "")
-
-        # Priority: Audio > Image > File > Text
-        if "audio_file" in request.files and request.files["audio_file"].filename:
-            audio_file = request.files["audio_file"]
-            filename = secure_filename(audio_file.filename)
-            path = os.path.join(app.config["UPLOAD_FOLDER"], filename)
-            audio_file.save(path)
-            user_input = transcribe_audio(path)
-        elif "image_file" in request.files and request.files["image_file"].filename:
-            image_file = request.files["image_file"]
-            user_input = extract_text_from_image(image_file)
-        elif "text_file" in request.files and request.files["text_file"].filename:
-            text_file = request.files["text_file"]
-            filename = text_file.filename
-            if filename.endswith(".pdf"):
-                user_input = extract_text_from_pdf(text_file)
-            else:
-                user_input = text_file.read().decode("utf-8")
-
-        # Prompt Generation
-        if agent == "fintech":
-            prompt = f"Analyze market trends and financial data related to: {user_input}. Provide 5 key insights."
-        elif agent == "support":
-            prompt = f"Summarize this customer support chat:\n{user_input}\nInclude issue, sentiment, action taken, and summary."
-        elif agent == "payment":
-            prompt = f"Analyze the following payment records and detect failed, duplicate or refund-needed transactions:\n{user_input}"
-        elif agent == "credit":
-            prompt = f"""Analyze the following credit applicant profile and provide:
-- Risk level (Low / Moderate / High)
-- Lending decision (Approve / Partial / Decline)
-- Recommended loan amount
-- Rationale considering financial inclusion\n\n{user_input}"""
-        elif agent == "faq":
-            prompt = user_input
-        elif agent == "sales":
-            prompt = f"""You're handling a potential customer conversation:\n\n{user_input}\n\nRespond persuasively, handle objections, and aim to close the deal. Mention discounts gently if requested."""
-        elif agent == "hiring":
-            prompt = f"""Evaluate the following candidate against the job requirements.\n\n{user_input}\n\nGive a short screening summary and rate as Strong Fit, Moderate Fit, or Poor Fit."""
-        elif agent == "bpa":
-            prompt = f"""Analyze the following workflow or business process and suggest how it can be optimized or automated:\n{user_input}\nInclude clear steps and tools to use."""
-        elif agent == "regulatory":
-            prompt = f"""Check for regulatory compliance issues in the following case:\n{user_input}\nList any concerns and violations."""
-        elif agent == "portfolio":
-            prompt = f"""Given the following client profile or scenario:\n{user_input}\nRecommend an optimal investment portfolio and rationale."""
-        elif agent == "onboarding":
-            prompt = f"""Design a customer onboarding journey for this input:\n{user_input}\nInclude email sequences, documentation, and success checkpoints."""
-        elif agent == "monitor":
-            prompt = f"""Analyze these transactions:\n{user_input}\nFlag any anomalies, suspicious activities, or irregular patterns."""
-        elif agent == "reporter":
-            prompt = f"""Write a business report summary for the following content:\n{user_input}\nUse clear, formal tone suitable for leadership review."""
-        elif agent == "leadgen":
-            prompt = f"""From the following text or data:\n{user_input}\nExtract qualified leads with name, interest level, and next follow-up step."""
-        elif agent == "fraud":
-            prompt = f"""Analyze the following behavior and flag if it's potentially fraudulent:\n{user_input}\nGive clear reasoning."""
-        elif agent == "closer":
-            prompt = f"""Assist this customer in closing their account safely and clearly:\n{user_input}\nList key steps and next actions."""
+        with timer.stage("upload"):
+            # Werkzeug parses the multipart body lazily; force it here so it is timed on its own.
+            agent = request.form.get("agent")
+            also = request.form.getlist("also")
+            request.files
+        provider = request.form.get("model")
+        with timer.stage("extract"):
+            user_input = extract_user_input()
+        if also:
+            with timer.stage("llm"):
+                try:
+                    result = run_fanout_record(fanout_agents([agent, *also]), user_input, provider)
+                except ValueError as err:
+                    result = f"❌ {err}"
         else:
-            prompt = user_input
+            with timer.stage("prescreen"):
+                user_input = prepare_input(agent, user_input)
+            if long_input.is_long(user_input):
+                with timer.stage("llm"):
+                    result = run_long(agent, user_input, provider)
+            else:
+                with timer.stage("prompt"):
+                    result = direct_answer(agent, user_input)
+                    prompt = build_prompt(agent, user_input) if result is None else None
+                if result is None:
+                    with timer.stage("llm"):
+                        result = run_agent(prompt, agent, provider)
+
+    with timer.stage("render"):
+        response = make_response(render_template("index.html", result=result, year=datetime.now().year,
+                                                 agents=agent_registry.choices(), job_agents=sorted(JOB_AGENTS),
+                                                 streaming=True,
+                                                 fanout_max=FANOUT_MAX_AGENTS))
+    response.headers["Server-Timing"] = timer.server_timing()
+    return response
+
+
+@app.route("/stream", methods=["POST"])
+def stream():
+    agent = request.form.get("agent")
+    provider = request.form.get("model")
+    user_input = prepare_input(agent, extract_user_input())
+
+    def events():
+        prompt_input, max_tokens = user_input, None
+        answer = direct_answer(agent, user_input)
+        if answer is not None:
+            yield format_event("done", answer)
+            return
+        if long_input.is_long(user_input):
+            steps = long_input_steps(agent, user_input, provider)
+            while True:
+                try:
+                    yield format_event("progress", next(steps))
+                except StopIteration as stop:
+                    prompt_input, max_tokens = stop.value, long_input.REDUCE_MAX_TOKENS
+                    break
+            if prompt_input.startswith("❌"):
+                yield format_event("done", prompt_input)
+                return
 
-        result = run_agent(prompt, agent)
+        parts = []
+        for delta in stream_agent(build_prompt(agent, prompt_input), agent, provider, max_tokens):
+            parts.append(delta)
+            yield format_event("token", delta)
+        yield format_event("done", "".join(parts))
 
-    return render_template("index.html", result=result, year=datetime.now().year)
+    return Response(stream_with_context(events()), mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+@app.route("/fanout", methods=["POST"])
+def fanout():
+    """Run one input through ``agent`` plus every ``also`` agent at once; stream each answer as it lands."""
+    try:
+        agents = fanout_agents([request.form.get("agent"), *request.form.getlist("also")])
+    except ValueError as err:
+        return jsonify({"error": str(err)}), 400
+    # Extracted once here; the agents are started before the first event is sent.
+    finished = run_fanout(agents, extract_user_input(), request.form.get("model"))
+
+    def events():
+        results = {}
+        for agent, result, seconds in finished:
+            results[agent] = result
+            yield format_event("result", {"agent": agent, "label": agent_registry.get(agent).label,
+                                          "result": result, "seconds": round(seconds, 3)})
+        yield format_event("done", combine(agents, results))
+
+    return Response(stream_with_context(events()), mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+@app.route("/batch", methods=["POST"])
+def batch():
+    """Run a JSONL body of {id, agent, input} records; stream JSONL results back."""
+    concurrency = clamp_concurrency(request.args.get("concurrency"))
+    results = run_batch(request.stream, run_record, concurrency)
+    return Response(stream_with_context(to_jsonl(results)), mimetype="application/x-ndjson")
+
+
+@app.route("/jobs", methods=["POST"])
+def submit_job():
+    """Queue the form submission as a background job; poll or stream its status."""
+    agent, also = request.form.get("agent"), request.form.getlist("also")
+    if also:
+        try:
+            agent = ",".join(fanout_agents([agent, *also]))
+        except ValueError as err:
+            return jsonify({"error": str(err)}), 400
+    kind, upload = pick_upload()
+    job_id = jobs.submit(
+        agent,
+        request.form.get("model"),
+        user_input=request.form.get("user_input", ""),
+        upload=upload,
+        kind=kind or "text",
+    )
+    return jsonify({"id": job_id, "status": jobs.QUEUED,
+                    "status_url": f"/jobs/{job_id}", "events_url": f"/jobs/{job_id}/events"}), 202
+
+
+@app.route("/jobs/<job_id>")
+def job_status(job_id):
+    job = jobs.get(job_id)
+    if job is None:
+        return jsonify({"id": job_id, "error": "Unknown job"}), 404
+    return jsonify(job)
+
+
+def job_event(job):
+    """One SSE message for a :func:`jobs.wait_events` update (None is a keepalive)."""
+    if job is None:
+        return ": keepalive\n\n"
+    if job["status"] == jobs.DONE:
+        return format_event("done", job["result"])
+    if job["status"] == jobs.FAILED:
+        return format_event("error", job["error"])
+    return format_event("status", job)
+
+
+UNKNOWN_JOB_EVENT = format_event("error", "Unknown job")
+
+
+@app.route("/jobs/<job_id>/events")
+def job_events(job_id):
+    """Job updates as SSE for the dev server; under asgi.py the async ``job_events_api`` serves this path."""
+    def events():
+        for job in jobs.wait_events(job_id):
+            yield job_event(job)
+        if jobs.get(job_id) is None:
+            yield UNKNOWN_JOB_EVENT
+
+    return Response(stream_with_context(events()), mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+@app.route("/cache/stats")
+def cache_stats():
+    return jsonify(response_cache.stats())
+
+
+@app.route("/cache/extract/stats")
+def extract_cache_stats():
+    return jsonify(extract_cache.stats())
+
+
+@app.route("/metrics")
+def metrics_endpoint():
+    body, content_type = metrics.render()
+    return Response(body, content_type=content_type)
+
+
+@app.route("/admin/profile", methods=["GET", "POST", "DELETE"])
+def admin_profile():
+    """POST ``{"requests": N}`` to profile the next N requests; GET the merged collapsed stacks.
+
+    The GET body feeds straight into ``flamegraph.pl`` or speedscope; DELETE disarms and clears.
+    Only Flask requests are profiled: ``/admin/*`` never takes a slot, and the async API in
+    asgi.py (``/api/agents/*``, ``/api/fanout``) is not profiled.
+    """
+    require_admin()
+    if request.method == "POST":
+        data = request.get_json(silent=True) or {}
+        try:
+            count = int(data.get("requests", request.args.get("requests", 10)))
+        except (TypeError, ValueError):
+            return jsonify({"error": "'requests' must be an integer"}), 400
+        return jsonify({"armed": profiler.arm(count), "profiles": profiler.profiles()})
+    if request.method == "DELETE":
+        profiler.arm(0)
+        profiler.collapsed(clear=True)
+        return jsonify({"armed": 0, "profiles": 0})
+    response = Response(profiler.collapsed(), mimetype="text/plain")
+    response.headers["X-Profiles"] = str(profiler.profiles())
+    response.headers["X-Profiler-Armed"] = str(profiler.remaining())
+    return response
 
 
 # === Run Local Dev Server ===
 if __name__ == "__main__":
+    # Only the reloader's child serves requests; start the job runner there.
+    if os.environ.get("WERKZEUG_RUN_MAIN") == "true":
+        jobs.start_embedded()
+    else:
+        metrics.reset()
     app.run(debug=True)
@@ -0,0 +1,238 @@
+"""ASGI entry point: async JSON agent API in front of the Flask dashboard.
+
+``POST /api/agents/<agent>`` is served directly on the event loop with an
+async HTTP client, so one process can hold hundreds of in-flight LLM calls.
+``POST /api/fanout`` sends one input to several agents at once, and
+``GET /jobs/<id>/events`` streams a background job's progress while it
+waits on the event loop, so slow jobs do not tie up the WSGI threads. Every
+other path is handed to the Flask app on a small thread pool.
+
+Run with: gunicorn asgi:app -k uvicorn.workers.UvicornWorker
+"""
+import asyncio
+import json
+import os
+import re
+import time
+
+from a2wsgi import WSGIMiddleware
+
+from app import (UNKNOWN_JOB_EVENT, app as flask_app, build_payload, build_prompt, combine, direct_answer,
+                 fanout_agents, job_event, prepare_fanout, prepare_input, response_cache_key, run_long)
+from dashboard import agent_registry, jobs, llm_client, long_input, providers, tracing
+from dashboard.response_cache import response_cache
+
+API_PREFIX = "/api/agents/"
+FANOUT_PATH = "/api/fanout"
+JOB_EVENTS_PATH = re.compile(r"^/jobs/([^/]+)/events$")
+API_MAX_BODY = int(os.getenv("API_MAX_BODY", str(1024 * 1024)))
+
+# Threads available to the synchronous Flask routes (form, streaming, stats).
+WSGI_THREADS = int(os.getenv("WSGI_THREADS", "10"))
+
+wsgi_app = WSGIMiddleware(flask_app, workers=WSGI_THREADS)
+
+
+class AgentError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+# === Async Agent Runner ===
+async def run_agent_async(prompt, agent_type, provider=None):
+    with tracing.span("run_agent", agent=agent_type, provider=provider):
+        return await _run_agent_async(prompt, agent_type, provider)
+
+
+async def _run_agent_async(prompt, agent_type, provider=None):
+    payload = build_payload(prompt, agent_type, provider)
+
+    cache_key = response_cache_key(agent_type, payload)
+    if cache_key is not None:
+        cached = response_cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+    try:
+        content, served_by = await providers.acomplete(payload, provider)
+    except providers.UpstreamTimeout as err:
+        raise AgentError(504, str(err))
+    except providers.UpstreamThrottled as err:
+        raise AgentError(503, str(err))
+    except providers.UpstreamError as err:
+        raise AgentError(502, str(err))
+
+    if cache_key is not None and served_by == providers.get_provider(provider).name:
+        response_cache.set(cache_key, content)
+    return content
+
+
+async def answer(agent, user_input, model):
+    """The agent's answer for input that has already been through ``prepare_input``."""
+    if long_input.is_long(user_input):
+        # Map-reduce fans out on its own thread pool; keep it off the event loop.
+        result = await asyncio.to_thread(run_long, agent, user_input, model)
+        if result.startswith("❌"):
+            raise AgentError(502, result[2:])
+        return result
+    return direct_answer(agent, user_input) or await run_agent_async(build_prompt(agent, user_input), agent, model)
+
+
+async def fanout_one(agent, user_input, model):
+    start = time.perf_counter()
+    with tracing.span("fanout.agent", agent=agent):
+        try:
+            item = {"agent": agent, "result": await answer(agent, user_input, model)}
+        except AgentError as err:
+            item = {"agent": agent, "error": err.message, "status": err.status}
+    item["seconds"] = round(time.perf_counter() - start, 3)
+    return item
+
+
+# === ASGI Plumbing ===
+async def read_body(receive, limit):
+    body = bytearray()
+    while True:
+        message = await receive()
+        body += message.get("body", b"")
+        if len(body) > limit:
+            raise AgentError(413, f"Request body exceeds {limit} bytes")
+        if not message.get("more_body"):
+            return bytes(body)
+
+
+def header(scope, name):
+    for key, value in scope.get("headers", []):
+        if key == name:
+            return value.decode("latin-1")
+    return None
+
+
+async def send_json(send, status, data):
+    body = json.dumps(data, ensure_ascii=False).encode("utf-8")
+    headers = [
+        (b"content-type", b"application/json"),
+        (b"content-length", str(len(body)).encode()),
+    ]
+    if tracing.request_id():
+        headers.append((b"x-request-id", tracing.request_id().encode()))
+    await send({"type": "http.response.start", "status": status, "headers": headers})
+    await send({"type": "http.response.body", "body": body})
+
+
+async def read_request(scope, receive):
+    """Validated ``(input, model, body)`` from a POSTed JSON body."""
+    if scope["method"] != "POST":
+        raise AgentError(405, "Use POST")
+    try:
+        data = json.loads(await read_body(receive, API_MAX_BODY) or b"{}")
+    except ValueError:
+        raise AgentError(400, "Body must be JSON")
+    if not isinstance(data, dict):
+        raise AgentError(400, "Body must be a JSON object")
+
+    user_input = data.get("input", "")
+    model = data.get("model", providers.DEFAULT_PROVIDER)
+    if not isinstance(user_input, str):
+        raise AgentError(400, "'input' must be a string")
+    if not user_input:
+        raise AgentError(400, "Missing 'input'")
+    if not isinstance(model, str):
+        raise AgentError(400, "'model' must be a string")
+    if model not in providers.PROVIDERS:
+        raise AgentError(400, f"Unsupported model '{model}'")
+    return user_input, model, data
+
+
+async def agent_api(scope, receive, send):
+    agent = scope["path"][len(API_PREFIX):].strip("/")
+    try:
+        user_input, model, _ = await read_request(scope, receive)
+        if agent not in agent_registry.AGENTS:
+            raise AgentError(404, f"Unknown agent '{agent}'")
+
+        user_input = await asyncio.to_thread(prepare_input, agent, user_input)
+        result = await answer(agent, user_input, model)
+    except AgentError as err:
+        await send_json(send, err.status, {"agent": agent, "error": err.message})
+        return
+
+    await send_json(send, 200, {"agent": agent, "model": model, "result": result})
+
+
+async def fanout_api(scope, receive, send):
+    """``{"input", "agents": [...], "model"}`` -> every agent's answer plus the combined text."""
+    try:
+        user_input, model, data = await read_request(scope, receive)
+        names = data.get("agents")
+        if not isinstance(names, list) or not all(isinstance(name, str) for name in names):
+            raise AgentError(400, "'agents' must be a list of agent names")
+        try:
+            agents = fanout_agents(names)
+        except ValueError as err:
+            raise AgentError(400, str(err))
+    except AgentError as err:
+        await send_json(send, err.status, {"error": err.message})
+        return
+
+    inputs = await asyncio.to_thread(prepare_fanout, agents, user_input)
+    results = await asyncio.gather(*(fanout_one(agent, inputs[agent], model) for agent in agents))
+    combined = combine(agents, {item["agent"]: item["result"] if "result" in item else f"❌ {item['error']}"
+                                for item in results})
+    await send_json(send, 200, {"model": model, "results": results, "combined": combined})
+
+
+async def job_events_api(scope, receive, send, job_id):
+    """Server-sent job updates until the job finishes or the client goes away."""
+    await send({"type": "http.response.start", "status": 200, "headers": [
+        (b"content-type", b"text/event-stream"), (b"cache-control", b"no-cache"), (b"x-accel-buffering", b"no")]})
+
+    async def disconnect():
+        while (await receive())["type"] != "http.disconnect":
+            pass
+
+    gone = asyncio.ensure_future(disconnect())
+    try:
+        async for job in jobs.await_events(job_id):
+            if gone.done():
+                return
+            await send({"type": "http.response.body", "body": job_event(job).encode("utf-8"), "more_body": True})
+        if await asyncio.to_thread(jobs.get, job_id) is None:
+            await send({"type": "http.response.body", "body": UNKNOWN_JOB_EVENT.encode("utf-8"), "more_body": True})
+        await send({"type": "http.response.body", "body": b""})
+    finally:
+        gone.cancel()
+
+
+async def lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            jobs.start_embedded()
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            await llm_client.aclose()
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+
+async def app(scope, receive, send):
+    if scope["type"] == "lifespan":
+        await lifespan(receive, send)
+    elif scope["type"] == "http" and (scope["path"].startswith(API_PREFIX) or scope["path"] == FANOUT_PATH):
+        fanout = scope["path"] == FANOUT_PATH
+        handle = tracing.begin(f"{scope['method']} {FANOUT_PATH if fanout else API_PREFIX + '<agent>'}",
+                               request_id=header(scope, b"x-request-id"), traceparent=header(scope, b"traceparent"),
+                               **{"http.method": scope["method"], "http.route": scope["path"]})
+        try:
+            await (fanout_api if fanout else agent_api)(scope, receive, send)
+        except BaseException as err:
+            tracing.end(handle, err)
+            raise
+        tracing.end(handle)
+    elif scope["type"] == "http" and scope["method"] == "GET" and JOB_EVENTS_PATH.match(scope["path"]):
+        await job_events_api(scope, receive, send, JOB_EVENTS_PATH.match(scope["path"])[1])
+    else:
+        await wsgi_app(scope, receive, send)
@@ -0,0 +1,203 @@
+"""Throughput and latency benchmark for the dashboard.
+
+Starts the stub LLM (bench/stub_llm.py) and the app under uvicorn with
+GROK_API_URL / OPENROUTER_API_URL pointed at the stub, then drives each
+route at fixed concurrency levels and reports p50/p95/p99 latency,
+requests per second and the per-stage timings the app returns in its
+``Server-Timing`` header:
+
+    python -m bench.loadtest --concurrency 1,8,32 --requests 200 --routes form,api,stream
+
+Pass ``--target http://host:port`` to benchmark an already-running app
+instead (it must itself be configured to call the stub). The ``agents``
+route calls the agents/*.py clients in-process against the stub.
+"""
+import argparse
+import importlib
+import json
+import os
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from bench.stub_llm import add_stub_arguments, config_from_args, start_in_thread
+
+ROUTES = ("form", "stream", "api", "agents")
+AGENT_SCRIPTS = ("fintech_data_analyst", "support_bot", "payment_manager", "credit_advisor", "faq_bot")
+
+
+# === Single requests ===
+def parse_server_timing(header):
+    stages = {}
+    for part in filter(None, (p.strip() for p in (header or "").split(","))):
+        name, _, params = part.partition(";")
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "dur":
+                stages[name] = float(value) / 1000
+    return stages
+
+
+def hit_form(session, target, agent, i):
+    response = session.post(f"{target}/", data={"agent": agent, "model": "grok", "user_input": f"benchmark request {i}"})
+    # Upstream failures are rendered into the page rather than surfaced as a status.
+    ok = response.ok and 'class="output-box">❌' not in response.text
+    return ok, parse_server_timing(response.headers.get("Server-Timing")), None
+
+
+def hit_stream(session, target, agent, i):
+    start = time.perf_counter()
+    ttfb = None
+    with session.post(f"{target}/stream", data={"agent": agent, "user_input": f"benchmark request {i}"},
+                      stream=True) as response:
+        ok = response.ok
+        for line in response.iter_lines():
+            if ttfb is None and line.startswith(b"event: token"):
+                ttfb = time.perf_counter() - start
+            elif "❌".encode() in line:
+                ok = False
+    return ok, {}, ttfb
+
+
+def hit_api(session, target, agent, i):
+    response = session.post(f"{target}/api/agents/{agent}", json={"input": f"benchmark request {i}", "model": "grok"})
+    return response.ok, {}, None
+
+
+def hit_agents(session, target, agent, i):
+    module = importlib.import_module(f"agents.{AGENT_SCRIPTS[i % len(AGENT_SCRIPTS)]}")
+    return bool(module.query_openrouter(f"benchmark request {i}")), {}, None
+
+
+HITTERS = {"form": hit_form, "stream": hit_stream, "api": hit_api, "agents": hit_agents}
+
+
+# === Load generation ===
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def run_level(route, target, agent, concurrency, total):
+    hitter = HITTERS[route]
+    sessions = defaultdict(requests.Session)
+
+    def one(i):
+        start = time.perf_counter()
+        try:
+            ok, stages, ttfb = hitter(sessions[i % concurrency], target, agent, i)
+        except Exception:
+            ok, stages, ttfb = False, {}, None
+        return time.perf_counter() - start, ok, stages, ttfb
+
+    wall_start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        samples = list(pool.map(one, range(total)))
+    wall = time.perf_counter() - wall_start
+
+    latencies = sorted(s[0] for s in samples)
+    ttfbs = sorted(s[3] for s in samples if s[3] is not None)
+    stage_totals = defaultdict(float)
+    for _, _, stages, _ in samples:
+        for name, seconds in stages.items():
+            stage_totals[name] += seconds
+    return {
+        "route": route,
+        "concurrency": concurrency,
+        "requests": total,
+        "errors": sum(1 for s in samples if not s[1]),
+        "rps": total / wall if wall else 0.0,
+        "p50": percentile(latencies, 50),
+        "p95": percentile(latencies, 95),
+        "p99": percentile(latencies, 99),
+        "ttfb_p50": percentile(ttfbs, 50) if ttfbs else None,
+        "stages": {name: seconds / total for name, seconds in stage_totals.items()},
+    }
+
+
+def format_row(row):
+    stages = " ".join(f"{name}={seconds * 1000:.0f}ms" for name, seconds in row["stages"].items())
+    ttfb = f" ttfb50={row['ttfb_p50'] * 1000:.0f}ms" if row["ttfb_p50"] is not None else ""
+    return (
+        f"{row['route']:<7} c={row['concurrency']:<4} n={row['requests']:<5} err={row['errors']:<4} "
+        f"rps={row['rps']:7.1f}  p50={row['p50'] * 1000:6.0f}ms p95={row['p95'] * 1000:6.0f}ms "
+        f"p99={row['p99'] * 1000:6.0f}ms{ttfb}  {stages}"
+    )
+
+
+# === App process ===
+def start_app(port, workers, env):
+    cmd = [sys.executable, "-m", "uvicorn", "asgi:app", "--port", str(port),
+           "--workers", str(workers), "--log-level", "warning"]
+    process = subprocess.Popen(cmd, env=env, stdout=subprocess.DEVNULL)
+    target = f"http://127.0.0.1:{port}"
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            if requests.get(f"{target}/", timeout=1).ok:
+                return process, target
+        except requests.ConnectionError:
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError("App did not start within 30s")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the dashboard against a stub LLM.")
+    parser.add_argument("--target", help="Base URL of an already-running app")
+    parser.add_argument("--routes", default="form,api", help=f"Comma-separated subset of {','.join(ROUTES)}")
+    parser.add_argument("--concurrency", default="1,8,32", help="Comma-separated concurrency levels")
+    parser.add_argument("--requests", type=int, default=100, help="Requests per route and level")
+    parser.add_argument("--agent", default="support")
+    parser.add_argument("--port", type=int, default=8800)
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes for the local app")
+    parser.add_argument("--cache", action="store_true", help="Leave the response cache enabled")
+    parser.add_argument("--json", help="Also write results to this file")
+    add_stub_arguments(parser)
+    args = parser.parse_args(argv)
+
+    routes = [r for r in args.routes.split(",") if r]
+    unknown = set(routes) - set(ROUTES)
+    if unknown:
+        parser.error(f"unknown routes: {', '.join(sorted(unknown))}")
+
+    stub, stub_url = start_in_thread(config_from_args(args))
+    env = dict(os.environ, GROK_API_URL=stub_url, OPENROUTER_API_URL=stub_url,
+               GROK_API_KEY="bench", OPENROUTER_API_KEY="bench")
+    if not args.cache:
+        env["RESPONSE_CACHE_TTL"] = "0"
+    # The in-process agents route reads the same variables.
+    os.environ.update(env)
+
+    app_process = None
+    target = args.target
+    if target is None and set(routes) - {"agents"}:
+        app_process, target = start_app(args.port, args.workers, env)
+
+    results = []
+    try:
+        print(f"🧪 Stub: {stub_url}  latency={args.latency}s tps={args.tokens_per_sec} errors={args.error_rate}")
+        for route in routes:
+            for level in (int(c) for c in args.concurrency.split(",")):
+                row = run_level(route, target, args.agent, level, args.requests)
+                results.append(row)
+                print(format_row(row))
+    finally:
+        if app_process is not None:
+            app_process.terminate()
+            app_process.wait()
+        stub.shutdown()
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as fh:
+            json.dump(results, fh, indent=2)
+
+
+if __name__ == "__main__":
+    main()
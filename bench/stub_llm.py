@@ -0,0 +1,181 @@
+"""Fake OpenAI-compatible chat-completions server for load testing.
+
+Answers ``POST .../chat/completions`` (streaming and non-streaming) with
+configurable latency, token rate, error injection and a requests/min limit
+(answered with 429 and ``Retry-After``), so the dashboard can be benchmarked
+without spending API credits:
+
+    python -m bench.stub_llm --port 8765 --latency 0.5 --tokens-per-sec 80 --error-rate 0.02 --rpm 120
+"""
+import argparse
+import json
+import math
+import random
+import sys
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+@dataclass
+class StubConfig:
+    latency: float = 0.5           # seconds before the first token
+    jitter: float = 0.1            # +/- uniform noise added to latency
+    tokens_per_sec: float = 80.0   # generation speed after the first token
+    completion_tokens: int = 120   # tokens per answer (capped by max_tokens)
+    error_rate: float = 0.0        # fraction of requests answered with error_status
+    error_status: int = 503
+    rpm: float = 0.0               # requests per minute before answering 429 (0 = unlimited)
+
+
+def make_handler(config):
+    window, window_lock = deque(), threading.Lock()
+
+    def retry_after():
+        """Seconds until another request fits under ``config.rpm``, or 0 if it fits now."""
+        if config.rpm <= 0:
+            return 0
+        now = time.monotonic()
+        with window_lock:
+            while window and now - window[0] >= 60:
+                window.popleft()
+            if len(window) >= config.rpm:
+                return max(1, math.ceil(60 - (now - window[0])))
+            window.append(now)
+        return 0
+
+    class Handler(BaseHTTPRequestHandler):
+        # Keep-alive, so pooled clients are exercised the way they are in production.
+        protocol_version = "HTTP/1.1"
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length", 0))
+            body = json.loads(self.rfile.read(length) or b"{}")
+            if not self.path.endswith("/chat/completions"):
+                return self._send_json(404, {"error": {"message": "not found"}})
+            if random.random() < config.error_rate:
+                return self._send_json(config.error_status, {"error": {"message": "injected failure"}})
+            wait = retry_after()
+            if wait:
+                return self._send_json(429, {"error": {"message": "rate limit exceeded"}},
+                                       {"Retry-After": str(wait)})
+
+            time.sleep(max(0.0, config.latency + random.uniform(-config.jitter, config.jitter)))
+            n_tokens = min(config.completion_tokens, int(body.get("max_tokens") or config.completion_tokens))
+            tokens = [f" tok{i}" for i in range(n_tokens)]
+            prompt_chars = sum(len(m.get("content") or "") for m in body.get("messages", []))
+            usage = {
+                "prompt_tokens": prompt_chars // 4,
+                "completion_tokens": n_tokens,
+                "total_tokens": prompt_chars // 4 + n_tokens,
+            }
+            if body.get("stream"):
+                self._stream(body, tokens)
+            else:
+                time.sleep(n_tokens / config.tokens_per_sec)
+                self._send_json(200, {
+                    "id": "stub",
+                    "object": "chat.completion",
+                    "model": body.get("model"),
+                    "choices": [{
+                        "index": 0,
+                        "message": {"role": "assistant", "content": "".join(tokens).strip()},
+                        "finish_reason": "stop",
+                    }],
+                    "usage": usage,
+                })
+
+        def _stream(self, body, tokens):
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            for i, token in enumerate(tokens):
+                if i:
+                    time.sleep(1 / config.tokens_per_sec)
+                chunk = {"model": body.get("model"), "choices": [{"index": 0, "delta": {"content": token}}]}
+                self._write_chunk(f"data: {json.dumps(chunk)}\n\n")
+            self._write_chunk("data: [DONE]\n\n")
+            self.wfile.write(b"0\r\n\r\n")
+
+        def _write_chunk(self, text):
+            data = text.encode("utf-8")
+            self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+            self.wfile.flush()
+
+        def _send_json(self, status, data, headers=None):
+            payload = json.dumps(data).encode("utf-8")
+            self.send_response(status)
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # The default listen backlog (5) refuses connections long before the load levels we drive.
+    request_queue_size = 1024
+
+    def handle_error(self, request, client_address):
+        # Clients dropping keep-alive connections at shutdown is expected.
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+
+def start_in_thread(config, host="127.0.0.1", port=0):
+    """Start the stub on a daemon thread; return ``(server, base_url)``."""
+    server = StubServer((host, port), make_handler(config))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}/v1/chat/completions"
+
+
+def add_stub_arguments(parser):
+    defaults = StubConfig()
+    parser.add_argument("--latency", type=float, default=defaults.latency)
+    parser.add_argument("--jitter", type=float, default=defaults.jitter)
+    parser.add_argument("--tokens-per-sec", type=float, default=defaults.tokens_per_sec)
+    parser.add_argument("--completion-tokens", type=int, default=defaults.completion_tokens)
+    parser.add_argument("--error-rate", type=float, default=defaults.error_rate)
+    parser.add_argument("--error-status", type=int, default=defaults.error_status)
+    parser.add_argument("--rpm", type=float, default=defaults.rpm, help="Requests/min before answering 429")
+
+
+def config_from_args(args):
+    return StubConfig(
+        latency=args.latency,
+        jitter=args.jitter,
+        tokens_per_sec=args.tokens_per_sec,
+        completion_tokens=args.completion_tokens,
+        error_rate=args.error_rate,
+        error_status=args.error_status,
+        rpm=args.rpm,
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run a fake chat-completions server.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    add_stub_arguments(parser)
+    args = parser.parse_args(argv)
+
+    server = StubServer((args.host, args.port), make_handler(config_from_args(args)))
+    print(f"🧪 Stub LLM listening on http://{args.host}:{args.port}/v1/chat/completions")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""Dashboard agents, loaded and validated once from ``agents.yaml``.
+
+Every agent's user template is parsed at load time into literal and
+``{input}`` pieces, so serving a request is a dict lookup and a join. Set
+``AGENTS_FILE`` to load a different registry; adding an agent is a YAML
+change only.
+"""
+import os
+from dataclasses import dataclass, field
+from string import Formatter
+
+import yaml
+
+AGENTS_FILE = os.getenv("AGENTS_FILE", os.path.join(os.path.dirname(os.path.abspath(__file__)), "agents.yaml"))
+
+_FIELDS = {"label", "system", "template", "model", "temperature", "max_tokens", "cache", "knowledge", "prescreen"}
+
+
+class RegistryError(ValueError):
+    pass
+
+
+@dataclass(frozen=True)
+class Agent:
+    name: str
+    label: str
+    system: str
+    template: tuple
+    temperature: float
+    max_tokens: int
+    cache: bool = True
+    knowledge: int = 0
+    prescreen: bool = False
+    models: dict = field(default_factory=dict)
+
+    def render(self, user_input):
+        return "".join(user_input if piece is None else piece for piece in self.template)
+
+    def model_for(self, provider):
+        return self.models.get(provider.name, provider.model)
+
+
+def compile_template(name, template):
+    """Split ``template`` into literal strings and ``None`` where the input goes."""
+    try:
+        parsed = list(Formatter().parse(template))
+    except ValueError as err:
+        raise RegistryError(f"Agent '{name}': bad template: {err}") from None
+    pieces = []
+    for literal, field_name, spec, conversion in parsed:
+        if literal:
+            pieces.append(literal)
+        if field_name is None:
+            continue
+        if field_name != "input" or spec or conversion:
+            raise RegistryError(f"Agent '{name}': template may only use {{input}}, found {{{field_name}}}")
+        pieces.append(None)
+    return tuple(pieces)
+
+
+def _build(name, entry, defaults):
+    if not isinstance(entry, dict):
+        raise RegistryError(f"Agent '{name}' must be a mapping")
+    unknown = set(entry) - _FIELDS
+    if unknown:
+        raise RegistryError(f"Agent '{name}': unknown keys {sorted(unknown)}")
+    spec = dict(defaults, **entry)
+    for key in ("system", "template"):
+        if not isinstance(spec.get(key), str) or not spec[key].strip():
+            raise RegistryError(f"Agent '{name}': '{key}' is required")
+    models = spec.get("model") or {}
+    if not isinstance(models, dict):
+        raise RegistryError(f"Agent '{name}': 'model' maps provider names to model ids")
+    template = compile_template(name, spec["template"])
+    try:
+        temperature = float(spec.get("temperature", 0.5))
+        max_tokens = int(spec.get("max_tokens", 500))
+        knowledge = int(spec.get("knowledge", 0))
+    except (TypeError, ValueError) as err:
+        raise RegistryError(f"Agent '{name}': {err}") from None
+    return Agent(
+        name=name,
+        label=str(spec.get("label") or name),
+        system=spec["system"].strip(),
+        template=template,
+        temperature=temperature,
+        max_tokens=max_tokens,
+        cache=bool(spec.get("cache", True)),
+        knowledge=knowledge,
+        prescreen=bool(spec.get("prescreen", False)),
+        models={str(k): str(v) for k, v in models.items()},
+    )
+
+
+def load(path=AGENTS_FILE):
+    """Return ``{name: Agent}`` in file order; raises :class:`RegistryError`."""
+    with open(path, encoding="utf-8") as f:
+        data = yaml.safe_load(f) or {}
+    defaults = data.get("defaults") or {}
+    entries = data.get("agents") or {}
+    if not entries:
+        raise RegistryError(f"{path}: no agents defined")
+    return {str(name): _build(str(name), entry, defaults) for name, entry in entries.items()}
+
+
+AGENTS = load()
+
+# Stand-in for names missing from the registry: the input is sent as-is.
+FALLBACK = Agent(name="", label="", system="", template=(None,), temperature=0.5, max_tokens=500, cache=False)
+
+
+def get(name):
+    return AGENTS.get(name, FALLBACK)
+
+
+def choices():
+    """``[(name, label)]`` for the dashboard's agent picker."""
+    return [(agent.name, agent.label) for agent in AGENTS.values()]
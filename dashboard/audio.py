@@ -0,0 +1,105 @@
+"""Speech-to-text for uploaded audio.
+
+Audio is read straight from the upload's in-memory/spooled buffer (nothing
+is written to ``uploads/``), split on silence into chunks of at most
+``AUDIO_CHUNK_MAX_SECONDS``, transcribed concurrently and stitched back in
+order. The recognizer backend is pluggable (``SPEECH_BACKEND``); ``sphinx``,
+``vosk``, ``whisper`` and ``faster_whisper`` run locally without network
+access.
+"""
+import audioop
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import speech_recognition as sr
+
+BACKEND = os.getenv("SPEECH_BACKEND", "google")
+WORKERS = int(os.getenv("AUDIO_WORKERS", "4"))
+
+CHUNK_MIN_SECONDS = float(os.getenv("AUDIO_CHUNK_MIN_SECONDS", "5"))
+CHUNK_MAX_SECONDS = float(os.getenv("AUDIO_CHUNK_MAX_SECONDS", "30"))
+MIN_SILENCE_SECONDS = float(os.getenv("AUDIO_MIN_SILENCE_SECONDS", "0.4"))
+# RMS energy below which a window counts as silence (speech_recognition's default).
+SILENCE_ENERGY = int(os.getenv("AUDIO_SILENCE_ENERGY", "300"))
+WINDOW_SECONDS = 0.03
+
+# Bump when output changes; keys the extraction cache together with the backend.
+CACHE_VERSION = f"1-{BACKEND}-{CHUNK_MAX_SECONDS:g}s"
+
+
+# === Recognizer backends ===
+# name -> (transcribe(recognizer, audio_data) -> str, safe to run concurrently)
+BACKENDS = {
+    "google": (lambda r, audio: r.recognize_google(audio), True),
+    "sphinx": (lambda r, audio: r.recognize_sphinx(audio), False),
+    "vosk": (lambda r, audio: r.recognize_vosk(audio), False),
+    "whisper": (lambda r, audio: r.recognize_whisper(audio, model=os.getenv("WHISPER_MODEL", "base")), False),
+    "faster_whisper": (
+        lambda r, audio: r.recognize_faster_whisper(audio, model=os.getenv("WHISPER_MODEL", "base")), False),
+}
+
+
+def register_backend(name, transcribe, concurrent=False):
+    """Plug in another recognizer: ``transcribe(recognizer, audio_data) -> str``."""
+    BACKENDS[name] = (transcribe, concurrent)
+
+
+# === Silence splitting ===
+def split_on_silence(audio):
+    """Split an ``sr.AudioData`` into chunks, cutting inside pauses where possible."""
+    width = audio.sample_width
+    rate = audio.sample_rate
+    data = audio.frame_data
+    window = max(width, int(rate * WINDOW_SECONDS) * width)
+    energies = [audioop.rms(data[i:i + window], width) for i in range(0, len(data), window)]
+
+    min_windows = int(CHUNK_MIN_SECONDS / WINDOW_SECONDS)
+    max_windows = int(CHUNK_MAX_SECONDS / WINDOW_SECONDS)
+    silence_windows = max(1, int(MIN_SILENCE_SECONDS / WINDOW_SECONDS))
+
+    cuts = [0]
+    silent_run = 0
+    for i, energy in enumerate(energies):
+        silent_run = silent_run + 1 if energy < SILENCE_ENERGY else 0
+        length = i - cuts[-1]
+        if length >= min_windows and silent_run >= silence_windows:
+            cuts.append(i - silent_run // 2)
+            silent_run = 0
+        elif length >= max_windows:
+            # No usable pause: cut at the quietest window in the last few seconds.
+            tail = range(max(cuts[-1] + 1, i - min_windows), i + 1)
+            cuts.append(min(tail, key=energies.__getitem__))
+            silent_run = 0
+    cuts.append(len(energies))
+
+    chunks = []
+    for start, stop in zip(cuts, cuts[1:]):
+        if stop <= start or max(energies[start:stop]) < SILENCE_ENERGY:
+            continue
+        chunks.append(sr.AudioData(data[start * window:stop * window], rate, width))
+    return chunks
+
+
+# === Transcription ===
+def _transcribe_chunk(transcribe, chunk):
+    try:
+        return transcribe(sr.Recognizer(), chunk).strip()
+    except sr.UnknownValueError:
+        return ""
+
+
+def transcribe(audio_stream, backend=None):
+    """Transcribe a WAV/AIFF/FLAC file-like object and return the text."""
+    transcribe_fn, concurrent = BACKENDS[backend or BACKEND]
+    recognizer = sr.Recognizer()
+    with sr.AudioFile(audio_stream) as source:
+        audio = recognizer.record(source)
+
+    chunks = split_on_silence(audio)
+    workers = min(WORKERS, len(chunks)) if concurrent else 1
+    if workers <= 1:
+        texts = [_transcribe_chunk(transcribe_fn, chunk) for chunk in chunks]
+    else:
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="speech") as pool:
+            texts = list(pool.map(lambda chunk: _transcribe_chunk(transcribe_fn, chunk), chunks))
+    return " ".join(t for t in texts if t)
@@ -0,0 +1,127 @@
+"""Bulk agent runs over JSONL with bounded concurrency.
+
+Each input line is ``{"id": ..., "agent": ..., "input": ...}`` with an
+optional ``"model"`` naming the provider. Results are
+emitted as JSONL in completion order with the caller's ``id`` preserved, so
+a slow record never holds back the ones behind it.
+
+CLI usage (from the repo root):
+
+    python -m dashboard.batch records.jsonl --concurrency 8 > results.jsonl
+"""
+import argparse
+import contextlib
+import json
+import os
+import sys
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+DEFAULT_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "8"))
+MAX_CONCURRENCY = int(os.getenv("BATCH_MAX_CONCURRENCY", "32"))
+
+
+def clamp_concurrency(value):
+    try:
+        value = int(value)
+    except (TypeError, ValueError):
+        return DEFAULT_CONCURRENCY
+    return max(1, min(value, MAX_CONCURRENCY))
+
+
+def _parse(line, lineno):
+    """Return ``(record, error_result)`` for one JSONL line."""
+    if isinstance(line, bytes):
+        line = line.decode("utf-8")
+    line = line.strip()
+    if not line:
+        return None, None
+    try:
+        record = json.loads(line)
+    except ValueError as err:
+        return None, {"id": None, "line": lineno, "ok": False, "error": f"Invalid JSON: {err}"}
+    if not isinstance(record, dict) or not record.get("agent"):
+        return None, {"id": None, "line": lineno, "ok": False, "error": "Record needs an 'agent'"}
+    record.setdefault("id", lineno)
+    return record, None
+
+
+def _result(record, future):
+    out = {"id": record["id"], "agent": record["agent"]}
+    try:
+        result = future.result()
+    except Exception as err:
+        out.update(ok=False, error=f"{type(err).__name__}: {err}")
+    else:
+        out.update(ok=not result.startswith("❌"), result=result)
+    return out
+
+
+def run_batch(lines, runner, concurrency=DEFAULT_CONCURRENCY):
+    """Run ``runner(agent, user_input, model)`` for every record in ``lines``.
+
+    Input is consumed lazily: at most ``concurrency`` records are in flight
+    (and in memory) at once. Yields one result dict per record as it
+    finishes.
+    """
+    concurrency = clamp_concurrency(concurrency)
+    pool = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="batch")
+    pending = {}
+    try:
+        for lineno, line in enumerate(lines, 1):
+            record, error = _parse(line, lineno)
+            if error is not None:
+                yield error
+            if record is None:
+                continue
+            if len(pending) >= concurrency:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield _result(pending.pop(future), future)
+            future = pool.submit(runner, record["agent"], record.get("input", ""), record.get("model"))
+            pending[future] = record
+
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield _result(pending.pop(future), future)
+    finally:
+        for future in pending:
+            future.cancel()
+        pool.shutdown(wait=False)
+
+
+def to_jsonl(results):
+    for result in results:
+        yield json.dumps(result, ensure_ascii=False) + "\n"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run agent requests from a JSONL file.")
+    parser.add_argument("input", nargs="?", help="JSONL file of {id, agent, input} records (default: stdin)")
+    parser.add_argument("-o", "--output", help="Write results here instead of stdout")
+    parser.add_argument("-c", "--concurrency", type=int, default=DEFAULT_CONCURRENCY)
+    args = parser.parse_args(argv)
+
+    # Imported here so the Flask app can import this module without a cycle.
+    from app import run_record
+
+    source = open(args.input, encoding="utf-8") if args.input else sys.stdin
+    sink = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+    failures = 0
+    try:
+        # run_agent logs progress with print(); keep stdout clean for JSONL.
+        with contextlib.redirect_stdout(sys.stderr):
+            for result in run_batch(source, run_record, args.concurrency):
+                failures += not result["ok"]
+                sink.write(json.dumps(result, ensure_ascii=False) + "\n")
+                sink.flush()
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if sink is not sys.stdout:
+            sink.close()
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
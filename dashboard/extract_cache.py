@@ -0,0 +1,135 @@
+"""Content-addressed cache for text extracted from uploads.
+
+Entries are keyed on the SHA-256 of the uploaded bytes plus the extractor's
+version string, so re-uploading the same statement to a different agent
+skips pdfplumber/Tesseract/speech recognition entirely, and changing an
+extractor (or its limits) naturally misses. Options that change the output
+for the same bytes (how a table is parsed, from its extension) belong in the
+version string. Storage is a SQLite file shared
+by every worker on the host; once it holds more than ``EXTRACT_CACHE_MAX_BYTES``
+of text the least recently used entries are evicted.
+"""
+import hashlib
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+
+from dashboard import metrics
+from dashboard.local_db import ThreadLocalConnection
+
+DB_PATH = os.getenv("EXTRACT_CACHE_DB", os.path.join(tempfile.gettempdir(), "dashboard-extract-cache.sqlite3"))
+MAX_BYTES = int(os.getenv("EXTRACT_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+ENABLED = os.getenv("EXTRACT_CACHE", "1") != "0"
+
+HASH_CHUNK = 1024 * 1024
+
+
+def digest(stream):
+    """SHA-256 of a seekable upload stream; leaves it rewound for the extractor.
+
+    Uploads hashed while they were received (``dashboard.uploads``) are not read again.
+    """
+    if hasattr(stream, "sha256"):
+        stream.seek(0)
+        return stream.sha256()
+    stream.seek(0)
+    sha = hashlib.sha256()
+    for chunk in iter(lambda: stream.read(HASH_CHUNK), b""):
+        sha.update(chunk)
+    stream.seek(0)
+    return sha.hexdigest()
+
+
+class ExtractCache:
+    def __init__(self, db_path=DB_PATH, max_bytes=MAX_BYTES, enabled=ENABLED):
+        self.db_path = db_path
+        self.max_bytes = max_bytes
+        self.enabled = enabled and bool(db_path) and max_bytes > 0
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._db = ThreadLocalConnection(
+            db_path, "CREATE TABLE IF NOT EXISTS extractions (key TEXT PRIMARY KEY, text TEXT NOT NULL, "
+                     "size INTEGER NOT NULL, used_at REAL NOT NULL);"
+                     "CREATE INDEX IF NOT EXISTS extractions_used_at ON extractions (used_at);", timeout=5)
+
+    @staticmethod
+    def make_key(kind, version, content_hash):
+        return f"{kind}:{version}:{content_hash}"
+
+    def get(self, key):
+        try:
+            conn = self._db()
+            with conn:
+                row = conn.execute("SELECT text FROM extractions WHERE key = ?", (key,)).fetchone()
+                if row is not None:
+                    conn.execute("UPDATE extractions SET used_at = ? WHERE key = ?", (time.time(), key))
+        except sqlite3.Error as err:
+            print(f"⚠️ Extraction cache read failed: {err}")
+            row = None
+        with self._lock:
+            if row is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        metrics.cache_lookup("extract", row is not None)
+        return None if row is None else row[0]
+
+    def set(self, key, text):
+        size = len(text.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+        try:
+            conn = self._db()
+            with conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO extractions (key, text, size, used_at) VALUES (?, ?, ?, ?)",
+                    (key, text, size, time.time()),
+                )
+                self._evict(conn)
+        except sqlite3.Error as err:
+            print(f"⚠️ Extraction cache write failed: {err}")
+
+    def _evict(self, conn):
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM extractions").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        excess = total - self.max_bytes
+        freed = 0
+        doomed = []
+        for key, size in conn.execute("SELECT key, size FROM extractions ORDER BY used_at"):
+            doomed.append((key,))
+            freed += size
+            if freed >= excess:
+                break
+        conn.executemany("DELETE FROM extractions WHERE key = ?", doomed)
+
+    def get_or_extract(self, kind, version, stream, extract):
+        """Return cached text for ``stream``'s bytes, or run ``extract()`` and store it."""
+        if not self.enabled:
+            return extract()
+        key = self.make_key(kind, version, digest(stream))
+        text = self.get(key)
+        if text is not None:
+            print(f"⚡ {kind} extraction served from cache")
+            return text
+        text = extract()
+        self.set(key, text)
+        return text
+
+    def stats(self):
+        with self._lock:
+            stats = {"hits": self.hits, "misses": self.misses}
+        if self.enabled:
+            try:
+                entries, size = self._db().execute(
+                    "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM extractions").fetchone()
+                stats.update(entries=entries, bytes=size, max_bytes=self.max_bytes)
+            except sqlite3.Error as err:
+                print(f"⚠️ Extraction cache read failed: {err}")
+        return stats
+
+
+extract_cache = ExtractCache()
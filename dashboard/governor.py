@@ -0,0 +1,273 @@
+"""Shared rate limiter, concurrency cap and circuit breaker for LLM calls.
+
+Every upstream call takes a lease from the governor first. The state lives
+in a local SQLite file (``GOVERNOR_DB``) so all gunicorn workers, the job
+runner and the ASGI app on a host draw from the same budget:
+
+* token buckets per provider and model for requests/min and tokens/min
+  (``LLM_RATE_LIMITS``, e.g. ``grok=60/200000,grok:grok-3-mini=300/0``;
+  ``0`` means unlimited),
+* optionally, at most ``LLM_MAX_INFLIGHT`` calls in flight per provider
+  (``0``, the default, means no cap; waiting callers back off up to
+  ``LLM_INFLIGHT_BACKOFF_MAX`` seconds and only re-check it with a read),
+* a provider-wide pause when it answers 429, for as long as its
+  ``Retry-After`` asks, so workers stop hammering it together,
+* a circuit breaker: after ``LLM_BREAKER_FAILURES`` consecutive failures
+  (5xx, timeouts, connection errors) calls fail fast for
+  ``LLM_BREAKER_COOLDOWN`` seconds, then one probe call is let through.
+
+A caller that cannot get a lease within ``LLM_MAX_QUEUE_WAIT`` seconds gets
+:class:`Throttled`, so it can fall back to another provider instead of
+queueing forever.
+"""
+import asyncio
+import email.utils
+import os
+import random
+import tempfile
+import time
+import uuid
+
+from dashboard.local_db import ThreadLocalConnection
+
+DB_PATH = os.getenv("GOVERNOR_DB", os.path.join(tempfile.gettempdir(), "dashboard-governor.sqlite3"))
+ENABLED = os.getenv("LLM_GOVERNOR", "1") != "0"
+RATE_LIMITS = os.getenv("LLM_RATE_LIMITS", "")
+MAX_INFLIGHT = int(os.getenv("LLM_MAX_INFLIGHT", "0"))
+INFLIGHT_BACKOFF_MAX = float(os.getenv("LLM_INFLIGHT_BACKOFF_MAX", "0.5"))
+MAX_QUEUE_WAIT = float(os.getenv("LLM_MAX_QUEUE_WAIT", "30"))
+RETRIES = int(os.getenv("LLM_RETRIES", "3"))
+BACKOFF_BASE = float(os.getenv("LLM_BACKOFF_BASE", "0.5"))
+BACKOFF_MAX = float(os.getenv("LLM_BACKOFF_MAX", "20"))
+BREAKER_FAILURES = int(os.getenv("LLM_BREAKER_FAILURES", "5"))
+BREAKER_COOLDOWN = float(os.getenv("LLM_BREAKER_COOLDOWN", "30"))
+# A lease not released within this long belongs to a dead worker and stops counting.
+LEASE_TTL = float(os.getenv("LLM_LEASE_TTL", "300"))
+
+# Outcomes reported back on release.
+OK, FAILED, RATE_LIMITED = "ok", "failed", "rate_limited"
+
+
+class Throttled(Exception):
+    """No lease available: the provider's circuit is open or its limits are exhausted."""
+
+    def __init__(self, provider, message, wait=0.0):
+        super().__init__(message)
+        self.provider = provider
+        self.wait = wait
+
+
+def parse_limits(spec):
+    """``"grok=60/200000,grok:mini=300/0"`` -> ``{("grok", None): (60, 200000), ("grok", "mini"): (300, 0)}``."""
+    limits = {}
+    for entry in filter(None, (part.strip() for part in spec.split(","))):
+        target, _, values = entry.partition("=")
+        provider, _, model = target.strip().partition(":")
+        rpm, _, tpm = values.partition("/")
+        limits[(provider, model or None)] = (float(rpm or 0), float(tpm or 0))
+    return limits
+
+
+def retry_after_seconds(value):
+    """Seconds from a ``Retry-After`` header (delta-seconds or HTTP date), or None."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, email.utils.parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def backoff(attempt, retry_after=None):
+    """Delay before retry ``attempt`` (0-based): ``Retry-After`` if given, else full-jitter exponential."""
+    if retry_after is not None:
+        return retry_after + random.uniform(0, BACKOFF_BASE)
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt))
+
+
+def _pause(provider, wait, busy, deadline, max_wait):
+    """``(seconds to sleep, busy count)`` before the next try, or Throttled past the deadline.
+
+    ``wait`` is None while the in-flight cap is full: nothing says when a slot
+    frees up, so back off exponentially (up to ``INFLIGHT_BACKOFF_MAX``).
+    """
+    if wait is None:
+        wait, busy = min(INFLIGHT_BACKOFF_MAX, 0.05 * 2 ** busy), busy + 1
+    if time.monotonic() + wait > deadline:
+        raise Throttled(provider, f"{provider} rate limit: no capacity within {max_wait:g}s", wait)
+    return wait + random.uniform(0, 0.05), busy
+
+
+SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS buckets (key TEXT PRIMARY KEY, level REAL, updated REAL);"
+    "CREATE TABLE IF NOT EXISTS leases (id TEXT PRIMARY KEY, provider TEXT, bucket TEXT, tokens REAL, expires REAL);"
+    "CREATE TABLE IF NOT EXISTS providers (name TEXT PRIMARY KEY, failures INTEGER DEFAULT 0, "
+    "open_until REAL DEFAULT 0, paused_until REAL DEFAULT 0);"
+)
+
+
+class Governor:
+    def __init__(self, path=DB_PATH, limits=RATE_LIMITS, max_inflight=MAX_INFLIGHT):
+        self.path = path
+        self.limits = parse_limits(limits)
+        self.max_inflight = max_inflight
+        self._db = ThreadLocalConnection(path, SCHEMA, timeout=10, isolation_level=None)
+
+    def limits_for(self, provider, model):
+        """``(rpm, tpm, bucket)`` for a call: a model's own entry, else the provider-wide one.
+
+        Provider-wide limits are one budget shared by all of its models, so their bucket is the provider.
+        """
+        if (provider, model) in self.limits:
+            return (*self.limits[(provider, model)], f"{provider}:{model}")
+        return (*self.limits.get((provider, None), (0.0, 0.0)), provider)
+
+    @staticmethod
+    def _take(conn, key, per_minute, cost, now):
+        """Refill bucket ``key`` and return ``(level, seconds until cost fits)``."""
+        row = conn.execute("SELECT level, updated FROM buckets WHERE key = ?", (key,)).fetchone()
+        level = per_minute if row is None else min(per_minute, row[0] + (now - row[1]) * per_minute / 60)
+        cost = min(cost, per_minute)  # a single oversized request waits for a full bucket, not forever
+        return level, max(0.0, (cost - level) * 60 / per_minute)
+
+    def _inflight(self, conn, provider, now):
+        return conn.execute("SELECT COUNT(*) FROM leases WHERE provider = ? AND expires >= ?",
+                            (provider, now)).fetchone()[0]
+
+    def _reserve(self, provider, model, tokens):
+        """Take a lease or return how long to wait (None: in-flight cap full, back off).
+
+        Raises Throttled while the circuit is open.
+        """
+        rpm, tpm, bucket = self.limits_for(provider, model)
+        conn = self._db()
+        # A full cap is seen with a plain read, so waiting callers do not queue for the write lock.
+        if self.max_inflight > 0 and self._inflight(conn, provider, time.time()) >= self.max_inflight:
+            return None, None
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            now = time.time()
+            row = conn.execute("SELECT failures, open_until, paused_until FROM providers WHERE name = ?",
+                               (provider,)).fetchone()
+            failures, open_until, paused_until = row or (0, 0.0, 0.0)
+            probe = failures >= BREAKER_FAILURES
+            if probe and open_until > now:
+                raise Throttled(provider, f"{provider} circuit open after {failures} failures", open_until - now)
+            if paused_until > now:
+                conn.execute("COMMIT")
+                return None, paused_until - now
+
+            conn.execute("DELETE FROM leases WHERE expires < ?", (now,))
+            if self.max_inflight > 0 and self._inflight(conn, provider, now) >= self.max_inflight:
+                conn.execute("COMMIT")
+                return None, None
+
+            levels, wait = {}, 0.0
+            for suffix, per_minute, cost in (("rpm", rpm, 1), ("tpm", tpm, tokens)):
+                if per_minute > 0:
+                    level, need = self._take(conn, f"{bucket}:{suffix}", per_minute, cost, now)
+                    levels[f"{bucket}:{suffix}"] = level - min(cost, per_minute)
+                    wait = max(wait, need)
+            if wait > 0:
+                conn.execute("COMMIT")
+                return None, wait
+            conn.executemany("INSERT OR REPLACE INTO buckets (key, level, updated) VALUES (?, ?, ?)",
+                             [(key, level, now) for key, level in levels.items()])
+            if probe:
+                # Half-open: this lease is the probe, everyone else keeps failing fast until it reports back.
+                # Claimed only here, with the lease, so a caller that ends up waiting does not hold the slot.
+                conn.execute("UPDATE providers SET open_until = ? WHERE name = ?", (now + BREAKER_COOLDOWN, provider))
+            lease = uuid.uuid4().hex
+            conn.execute("INSERT INTO leases (id, provider, bucket, tokens, expires) VALUES (?, ?, ?, ?, ?)",
+                         (lease, provider, f"{bucket}:tpm" if tpm > 0 else None, tokens, now + LEASE_TTL))
+            conn.execute("COMMIT")
+            return lease, 0.0
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def acquire(self, provider, model, tokens, max_wait=MAX_QUEUE_WAIT):
+        """Block until a lease is available and return its id."""
+        if not ENABLED:
+            return None
+        deadline = time.monotonic() + max_wait
+        busy = 0
+        while True:
+            lease, wait = self._reserve(provider, model, tokens)
+            if lease is not None:
+                return lease
+            wait, busy = _pause(provider, wait, busy, deadline, max_wait)
+            time.sleep(wait)
+
+    async def aacquire(self, provider, model, tokens, max_wait=MAX_QUEUE_WAIT):
+        """Async counterpart of :meth:`acquire`."""
+        if not ENABLED:
+            return None
+        deadline = time.monotonic() + max_wait
+        busy = 0
+        while True:
+            # SQLite blocks (BEGIN IMMEDIATE waits for other workers), so keep it off the event loop.
+            lease, wait = await asyncio.to_thread(self._reserve, provider, model, tokens)
+            if lease is not None:
+                return lease
+            wait, busy = _pause(provider, wait, busy, deadline, max_wait)
+            await asyncio.sleep(wait)
+
+    def release(self, lease, provider, outcome=OK, used_tokens=None, retry_after=None):
+        """Return a lease and record how the call went."""
+        if not ENABLED:
+            return
+        conn = self._db()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            now = time.time()
+            row = conn.execute("SELECT bucket, tokens FROM leases WHERE id = ?", (lease,)).fetchone()
+            conn.execute("DELETE FROM leases WHERE id = ?", (lease,))
+            if row and row[0] and used_tokens is not None:
+                # Refund (or charge) the difference between the estimate and what the provider billed.
+                conn.execute("UPDATE buckets SET level = level + ? WHERE key = ?", (row[1] - used_tokens, row[0]))
+            conn.execute("INSERT OR IGNORE INTO providers (name) VALUES (?)", (provider,))
+            if outcome == OK:
+                conn.execute("UPDATE providers SET failures = 0, open_until = 0 WHERE name = ?", (provider,))
+            elif outcome == FAILED:
+                conn.execute("UPDATE providers SET failures = failures + 1, open_until = CASE "
+                             "WHEN failures + 1 >= ? THEN ? ELSE open_until END WHERE name = ?",
+                             (BREAKER_FAILURES, now + BREAKER_COOLDOWN, provider))
+            elif outcome == RATE_LIMITED:
+                pause = retry_after if retry_after is not None else BACKOFF_BASE
+                conn.execute("UPDATE providers SET paused_until = MAX(paused_until, ?) WHERE name = ?",
+                             (now + pause, provider))
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    async def arelease(self, lease, provider, outcome=OK, used_tokens=None, retry_after=None):
+        """Async counterpart of :meth:`release`; it completes even if the caller is cancelled."""
+        if not ENABLED:
+            return
+        await asyncio.shield(asyncio.to_thread(self.release, lease, provider, outcome, used_tokens, retry_after))
+
+    def stats(self):
+        conn = self._db()
+        now = time.time()
+        out = {}
+        for name, failures, open_until, paused_until in conn.execute(
+                "SELECT name, failures, open_until, paused_until FROM providers"):
+            out[name] = {
+                "failures": failures,
+                "circuit": "open" if failures >= BREAKER_FAILURES and open_until > now else
+                           "half-open" if failures >= BREAKER_FAILURES else "closed",
+                "paused_for": round(max(0.0, paused_until - now), 1),
+            }
+        for provider, inflight in conn.execute(
+                "SELECT provider, COUNT(*) FROM leases WHERE expires >= ? GROUP BY provider", (now,)):
+            out.setdefault(provider, {})["inflight"] = inflight
+        return out
+
+
+governor = Governor()
@@ -0,0 +1,345 @@
+"""Background jobs for agent requests that outlive a web request.
+
+Submissions are rows in a local SQLite queue (``JOBS_DB``); uploads are
+saved under ``JOBS_DIR`` so extraction happens in the job runner rather
+than the web worker. A runner process claims queued jobs, extracts the
+input, calls the agent and stores the result, which the page or API polls
+(``GET /jobs/<id>``) or streams (``GET /jobs/<id>/events``, served on the
+event loop by asgi.py so a waiting client does not hold a WSGI thread).
+
+A runner records itself on the jobs it claims and checks in every
+``JOBS_HEARTBEAT`` seconds. Jobs whose runner stopped checking in (killed,
+host restart) are put back on the queue, up to ``JOBS_MAX_ATTEMPTS`` runs
+in total; a job that is still running after ``JOBS_TIMEOUT`` is failed, not
+retried. Only the run that claimed a job can finish it, so a run that was
+given up on cannot overwrite the result of the one that replaced it.
+
+The web server starts one runner per host on its own (see
+:func:`start_embedded`); to run them separately instead, set
+``JOBS_EMBEDDED=0`` and start:
+
+    python -m dashboard.jobs --threads 4
+"""
+import argparse
+import asyncio
+import atexit
+import fcntl
+import json
+import os
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+
+from dashboard import tracing
+from dashboard.local_db import ThreadLocalConnection
+
+DB_PATH = os.getenv("JOBS_DB", os.path.join(tempfile.gettempdir(), "dashboard-jobs.sqlite3"))
+JOBS_DIR = os.getenv("JOBS_DIR", os.path.join(tempfile.gettempdir(), "dashboard-jobs"))
+THREADS = int(os.getenv("JOBS_THREADS", "4"))
+EMBEDDED = os.getenv("JOBS_EMBEDDED", "1") != "0"
+POLL_INTERVAL = float(os.getenv("JOBS_POLL_INTERVAL", "0.5"))
+TIMEOUT = float(os.getenv("JOBS_TIMEOUT", "900"))
+HEARTBEAT = float(os.getenv("JOBS_HEARTBEAT", "10"))
+# Missed check-ins before a runner counts as dead.
+HEARTBEAT_MISSES = 3
+MAX_ATTEMPTS = int(os.getenv("JOBS_MAX_ATTEMPTS", "2"))
+# Finished jobs (and their results) are kept this long for polling clients.
+RETENTION = float(os.getenv("JOBS_RETENTION", "86400"))
+
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+FINISHED = (DONE, FAILED)
+
+SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS jobs ("
+    "id TEXT PRIMARY KEY, status TEXT NOT NULL, agent TEXT, provider TEXT, "
+    "input_kind TEXT NOT NULL, input_text TEXT, input_path TEXT, "
+    "result TEXT, error TEXT, progress TEXT, attempts INTEGER NOT NULL DEFAULT 0, "
+    "created_at REAL NOT NULL, started_at REAL, finished_at REAL, runner TEXT, heartbeat REAL);"
+    "CREATE INDEX IF NOT EXISTS jobs_status_created ON jobs (status, created_at);"
+)
+
+
+def _setup(conn):
+    conn.row_factory = sqlite3.Row
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(jobs)")}
+    for column, kind in (("progress", "TEXT"), ("runner", "TEXT"), ("heartbeat", "REAL")):
+        if column not in columns:
+            conn.execute(f"ALTER TABLE jobs ADD COLUMN {column} {kind}")
+
+
+_db = ThreadLocalConnection(DB_PATH, SCHEMA, _setup, timeout=10, isolation_level=None)
+
+
+# === Submitting and polling ===
+def submit(agent, provider, user_input="", upload=None, kind="text"):
+    """Queue a job and return its id.
+
+    ``upload`` is a werkzeug ``FileStorage`` (saved to ``JOBS_DIR``) whose
+    text is extracted by the runner according to ``kind``. A comma-separated
+    ``agent`` fans the input out to each of those agents.
+    """
+    job_id = uuid.uuid4().hex
+    path = None
+    if upload is not None:
+        os.makedirs(JOBS_DIR, exist_ok=True)
+        path = os.path.join(JOBS_DIR, job_id + os.path.splitext(upload.filename or "")[1].lower())
+        upload.save(path)
+    _db().execute(
+        "INSERT INTO jobs (id, status, agent, provider, input_kind, input_text, input_path, created_at) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+        (job_id, QUEUED, agent, provider, kind, user_input, path, time.time()),
+    )
+    return job_id
+
+
+def get(job_id):
+    """Return the job as a dict, or None if it is unknown (or expired)."""
+    row = _db().execute(
+        "SELECT id, status, agent, provider, result, error, progress, attempts, created_at, started_at, finished_at "
+        "FROM jobs WHERE id = ?", (job_id,)
+    ).fetchone()
+    if row is None:
+        return None
+    job = dict(row)
+    job["progress"] = json.loads(job["progress"]) if job["progress"] else None
+    if job["status"] == QUEUED:
+        job["position"] = _db().execute(
+            "SELECT COUNT(*) FROM jobs WHERE status = ? AND created_at < ?", (QUEUED, job["created_at"])
+        ).fetchone()[0]
+    return job
+
+
+def wait_events(job_id, interval=POLL_INTERVAL, keepalive=15.0):
+    """Yield the job dict whenever its status or progress changes until it finishes.
+
+    Yields ``None`` every ``keepalive`` seconds without a change so callers
+    can keep idle connections open.
+    """
+    last_state, last_sent = None, time.monotonic()
+    while True:
+        job = get(job_id)
+        state = None if job is None else (job["status"], job["progress"])
+        if job is None or state != last_state:
+            yield job
+            if job is None or job["status"] in FINISHED:
+                return
+            last_state, last_sent = state, time.monotonic()
+        elif time.monotonic() - last_sent >= keepalive:
+            yield None
+            last_sent = time.monotonic()
+        time.sleep(interval)
+
+
+async def await_events(job_id, interval=POLL_INTERVAL, keepalive=15.0):
+    """Async counterpart of :func:`wait_events`: waits on the event loop, not in a thread."""
+    last_state, last_sent = None, time.monotonic()
+    while True:
+        job = await asyncio.to_thread(get, job_id)
+        state = None if job is None else (job["status"], job["progress"])
+        if job is None or state != last_state:
+            yield job
+            if job is None or job["status"] in FINISHED:
+                return
+            last_state, last_sent = state, time.monotonic()
+        elif time.monotonic() - last_sent >= keepalive:
+            yield None
+            last_sent = time.monotonic()
+        await asyncio.sleep(interval)
+
+
+def stats():
+    rows = _db().execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+    return {status: count for status, count in rows}
+
+
+# === Runner ===
+def _runner_id():
+    return str(os.getpid())
+
+
+def _claim():
+    """Atomically move the oldest queued job to ``running`` and return it (with its attempt number)."""
+    conn = _db()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        row = conn.execute(
+            "SELECT * FROM jobs WHERE status = ? ORDER BY created_at LIMIT 1", (QUEUED,)
+        ).fetchone()
+        if row is not None:
+            now = time.time()
+            conn.execute(
+                "UPDATE jobs SET status = ?, started_at = ?, attempts = attempts + 1, runner = ?, heartbeat = ? "
+                "WHERE id = ?", (RUNNING, now, _runner_id(), now, row["id"]),
+            )
+            row = dict(row, status=RUNNING, attempts=row["attempts"] + 1)
+        conn.execute("COMMIT")
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    return row
+
+
+def _finish(job, status, result=None, error=None):
+    """Store the outcome of ``job``'s run; False if that run no longer owns the job."""
+    return _db().execute(
+        "UPDATE jobs SET status = ?, result = ?, error = ?, finished_at = ? "
+        "WHERE id = ? AND attempts = ? AND status = ?",
+        (status, result, error, time.time(), job["id"], job["attempts"], RUNNING),
+    ).rowcount > 0
+
+
+def _set_progress(job, update):
+    _db().execute("UPDATE jobs SET progress = ? WHERE id = ? AND attempts = ? AND status = ?",
+                  (json.dumps(update), job["id"], job["attempts"], RUNNING))
+
+
+def _heartbeat():
+    """Mark this runner's jobs as still being worked on."""
+    _db().execute("UPDATE jobs SET heartbeat = ? WHERE status = ? AND runner = ?",
+                  (time.time(), RUNNING, _runner_id()))
+
+
+def _sweep():
+    """Requeue or fail jobs whose runner died, fail overdue ones and drop expired ones."""
+    conn = _db()
+    now = time.time()
+    dead = now - HEARTBEAT * HEARTBEAT_MISSES
+    conn.execute(
+        "UPDATE jobs SET status = ?, runner = NULL "
+        "WHERE status = ? AND COALESCE(heartbeat, started_at) < ? AND attempts < ?",
+        (QUEUED, RUNNING, dead, MAX_ATTEMPTS),
+    )
+    conn.execute(
+        "UPDATE jobs SET status = ?, error = ?, finished_at = ? WHERE status = ? AND COALESCE(heartbeat, started_at) < ?",
+        (FAILED, "Job runner stopped", now, RUNNING, dead),
+    )
+    # A live runner keeps going, but its late result is dropped by _finish.
+    conn.execute(
+        "UPDATE jobs SET status = ?, error = ?, finished_at = ? WHERE status = ? AND started_at < ?",
+        (FAILED, "Job timed out", now, RUNNING, now - TIMEOUT),
+    )
+    expired = conn.execute(
+        "SELECT id, input_path FROM jobs WHERE status IN (?, ?) AND finished_at < ?",
+        (*FINISHED, now - RETENTION),
+    ).fetchall()
+    for job_id, path in expired:
+        _remove(path)
+        conn.execute("DELETE FROM jobs WHERE id = ?", (job_id,))
+
+
+def _remove(path):
+    if path:
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
+
+
+def _run(job):
+    with tracing.trace("job", **{"job.id": job["id"], "agent": job["agent"], "input.kind": job["input_kind"]}):
+        return _run_job(job)
+
+
+def _run_job(job):
+    # Imported here so the Flask app can import this module without a cycle.
+    from app import extract_upload, log_progress, run_fanout_record, run_record
+
+    user_input = job["input_text"] or ""
+    if job["input_path"]:
+        with open(job["input_path"], "rb") as upload:
+            user_input = extract_upload(job["input_kind"], upload, job["input_path"])
+
+    def progress(update):
+        log_progress(update)
+        _set_progress(job, update)
+
+    agents = (job["agent"] or "").split(",")
+    if len(agents) > 1:
+        return run_fanout_record(agents, user_input, job["provider"], lambda update: _set_progress(job, update))
+    return run_record(job["agent"], user_input, job["provider"], progress)
+
+
+def _work(stop):
+    while not stop.is_set():
+        job = _claim()
+        if job is None:
+            stop.wait(POLL_INTERVAL)
+            continue
+        print(f"🧵 Job {job['id']} started ({job['agent']}, {job['input_kind']})")
+        try:
+            result = _run(job)
+        except Exception as err:
+            print(f"❌ Job {job['id']} failed: {err}")
+            owned = _finish(job, FAILED, error=f"{type(err).__name__}: {err}")
+        else:
+            print(f"✅ Job {job['id']} finished")
+            owned = _finish(job, DONE, result=result)
+        if owned:
+            _remove(job["input_path"])
+        else:
+            # Requeued or timed out meanwhile: the job (and its upload) belong to whatever replaced this run.
+            print(f"⚠️ Job {job['id']} attempt {job['attempts']} was given up on; result discarded")
+
+
+def run_forever(threads=THREADS, parent_pid=None):
+    """Process jobs on ``threads`` threads until interrupted (or the parent exits)."""
+    stop = threading.Event()
+    workers = [threading.Thread(target=_work, args=(stop,), name=f"job-{i}", daemon=True)
+               for i in range(max(1, threads))]
+    for worker in workers:
+        worker.start()
+    print(f"🧵 Job runner started with {len(workers)} thread(s), queue at {DB_PATH}")
+    try:
+        while not stop.is_set():
+            _heartbeat()
+            _sweep()
+            if parent_pid and os.getppid() != parent_pid:
+                break
+            stop.wait(HEARTBEAT)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stop.set()
+
+
+_embedded = None
+
+
+def start_embedded():
+    """Start a runner subprocess unless this host already has one.
+
+    Every web worker calls this; an exclusive lock on ``JOBS_DB.lock`` makes
+    sure only one of them owns the runner. If that worker exits the runner
+    goes with it, and the next worker to start takes over the queue.
+    """
+    global _embedded
+    if not EMBEDDED or _embedded is not None:
+        return
+    lock = open(DB_PATH + ".lock", "w")
+    try:
+        fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        lock.close()
+        return
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    process = subprocess.Popen(
+        [sys.executable, "-m", "dashboard.jobs", "--parent-pid", str(os.getpid())], cwd=root)
+    _embedded = (process, lock)
+    atexit.register(process.terminate)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run queued dashboard jobs.")
+    parser.add_argument("-t", "--threads", type=int, default=THREADS)
+    parser.add_argument("--parent-pid", type=int, help="Exit when this process goes away")
+    args = parser.parse_args(argv)
+    run_forever(args.threads, args.parent_pid)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,226 @@
+"""BM25 retrieval over the documents in ``knowledge/``.
+
+Text and Markdown files are split into passages at blank lines; a passage
+of the form ``Q: ...`` / ``A: ...`` is also an FAQ entry. YAML files hold a
+list of ``{question, answer}`` entries. Parsed passages and their term
+counts are kept in a SQLite index (``KNOWLEDGE_INDEX``) so a restart only
+re-reads files whose size or mtime changed; the directory is re-checked at
+most every ``KNOWLEDGE_REFRESH_SECONDS``.
+
+``answer`` returns a stored FAQ answer when a question closely matches an
+entry, so repeated questions skip the LLM; ``with_context`` prepends the
+top passages to a question for the model.
+"""
+import difflib
+import math
+import os
+import re
+import sqlite3
+import tempfile
+import threading
+import time
+from collections import Counter, defaultdict
+
+import yaml
+
+from dashboard.local_db import ThreadLocalConnection
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+KNOWLEDGE_DIR = os.getenv("KNOWLEDGE_DIR", os.path.join(ROOT, "knowledge"))
+INDEX_PATH = os.getenv("KNOWLEDGE_INDEX", os.path.join(tempfile.gettempdir(), "dashboard-knowledge.sqlite3"))
+REFRESH_SECONDS = float(os.getenv("KNOWLEDGE_REFRESH_SECONDS", "5"))
+# How similar (0-1) a question must be to an FAQ entry to be answered from it.
+DIRECT_THRESHOLD = float(os.getenv("KNOWLEDGE_DIRECT_THRESHOLD", "0.9"))
+MAX_PASSAGE_CHARS = int(os.getenv("KNOWLEDGE_MAX_PASSAGE_CHARS", "1200"))
+
+EXTENSIONS = (".txt", ".md", ".yaml", ".yml")
+BM25_K1, BM25_B = 1.5, 0.75
+
+STOPWORDS = frozenset(
+    "a an and are as at be but by can do does for from how i if in is it my of on or our so that the "
+    "this to was we what when where which who why will with you your".split()
+)
+_WORD = re.compile(r"\w+")
+_FAQ = re.compile(r"^\s*Q:\s*(?P<q>.+?)\s*\n\s*A:\s*(?P<a>.+)$", re.S)
+
+
+def tokenize(text):
+    return [t for t in _WORD.findall(text.lower()) if t not in STOPWORDS]
+
+
+def normalize(question):
+    return " ".join(_WORD.findall(question.lower()))
+
+
+# === Parsing ===
+def _parse(path):
+    """Return ``[(text, question, answer)]`` for one knowledge file."""
+    with open(path, encoding="utf-8") as f:
+        raw = f.read()
+    if path.endswith((".yaml", ".yml")):
+        entries = yaml.safe_load(raw) or []
+        return [(f"Q: {e['question']}\nA: {e['answer']}", str(e["question"]), str(e["answer"]))
+                for e in entries if isinstance(e, dict) and e.get("question") and e.get("answer")]
+
+    passages = []
+    for block in re.split(r"\n\s*\n", raw):
+        block = block.strip()
+        if not block or block.startswith("<!--"):
+            continue
+        match = _FAQ.match(block)
+        if match:
+            passages.append((block, match["q"], match["a"].strip()))
+        else:
+            passages.append((block[:MAX_PASSAGE_CHARS], None, None))
+    return passages
+
+
+# === Index ===
+SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS files (path TEXT PRIMARY KEY, mtime REAL, size INTEGER);"
+    "CREATE TABLE IF NOT EXISTS passages (id INTEGER PRIMARY KEY, path TEXT, text TEXT, "
+    "question TEXT, answer TEXT, length INTEGER);"
+    "CREATE TABLE IF NOT EXISTS postings (term TEXT, passage_id INTEGER, tf INTEGER);"
+    "CREATE INDEX IF NOT EXISTS postings_passage ON postings (passage_id);"
+    "CREATE INDEX IF NOT EXISTS passages_path ON passages (path);"
+)
+
+
+class KnowledgeIndex:
+    def __init__(self, directory=KNOWLEDGE_DIR, index_path=INDEX_PATH):
+        self.directory = directory
+        self.index_path = index_path
+        self._lock = threading.Lock()
+        self._db = ThreadLocalConnection(index_path, SCHEMA, timeout=5)
+        self._checked_at = 0.0
+        self._loaded = False
+        self._files = {}
+        # (passages, postings, faq, avg_length), swapped as a whole on reload.
+        self._state = ({}, {}, {}, 0.0)
+
+    def _scan(self):
+        found = {}
+        for dirpath, _, filenames in os.walk(self.directory):
+            for name in filenames:
+                if name.endswith(EXTENSIONS):
+                    path = os.path.join(dirpath, name)
+                    stat = os.stat(path)
+                    found[os.path.relpath(path, self.directory)] = (stat.st_mtime, stat.st_size)
+        return found
+
+    @staticmethod
+    def _diff(conn, on_disk):
+        indexed = {path: (mtime, size) for path, mtime, size in conn.execute("SELECT path, mtime, size FROM files")}
+        stale = [path for path in indexed if on_disk.get(path) != indexed[path]]
+        fresh = [path for path in on_disk if on_disk[path] != indexed.get(path)]
+        return bool(stale or fresh), stale, fresh
+
+    def _sync(self, on_disk):
+        """Bring the shared index in line with ``on_disk``."""
+        conn = self._db()
+        if not self._diff(conn, on_disk)[0]:
+            return
+
+        with conn:
+            # Another worker may be indexing the same change; decide under the write lock.
+            conn.execute("BEGIN IMMEDIATE")
+            changed, stale, fresh = self._diff(conn, on_disk)
+            if not changed:
+                return
+            for path in stale:
+                conn.execute("DELETE FROM postings WHERE passage_id IN (SELECT id FROM passages WHERE path = ?)",
+                             (path,))
+                conn.execute("DELETE FROM passages WHERE path = ?", (path,))
+                conn.execute("DELETE FROM files WHERE path = ?", (path,))
+            for path in fresh:
+                try:
+                    passages = _parse(os.path.join(self.directory, path))
+                except (OSError, UnicodeDecodeError, yaml.YAMLError) as err:
+                    print(f"⚠️ Skipping knowledge file {path}: {err}")
+                    passages = []
+                for text, question, answer in passages:
+                    terms = Counter(tokenize(text))
+                    cursor = conn.execute(
+                        "INSERT INTO passages (path, text, question, answer, length) VALUES (?, ?, ?, ?, ?)",
+                        (path, text, question, answer, sum(terms.values())),
+                    )
+                    conn.executemany("INSERT INTO postings (term, passage_id, tf) VALUES (?, ?, ?)",
+                                     [(term, cursor.lastrowid, tf) for term, tf in terms.items()])
+                conn.execute("INSERT OR REPLACE INTO files (path, mtime, size) VALUES (?, ?, ?)",
+                             (path, *on_disk[path]))
+        print(f"📚 Knowledge index updated: {len(fresh)} file(s) indexed, {len(stale)} dropped")
+
+    def _load(self):
+        conn = self._db()
+        passages = {pid: (path, text, question, answer, length) for pid, path, text, question, answer, length
+                    in conn.execute("SELECT id, path, text, question, answer, length FROM passages")}
+        postings = defaultdict(list)
+        for term, pid, tf in conn.execute("SELECT term, passage_id, tf FROM postings"):
+            postings[term].append((pid, tf))
+        faq = {normalize(p[2]): pid for pid, p in passages.items() if p[2]}
+        avg_length = sum(p[4] for p in passages.values()) / len(passages) if passages else 0.0
+        self._state = (passages, dict(postings), faq, avg_length)
+
+    def refresh(self, force=False):
+        now = time.monotonic()
+        if not force and self._loaded and now - self._checked_at < REFRESH_SECONDS:
+            return
+        with self._lock:
+            if not force and self._loaded and now - self._checked_at < REFRESH_SECONDS:
+                return
+            try:
+                on_disk = self._scan() if os.path.isdir(self.directory) else {}
+                if not self._loaded or on_disk != self._files:
+                    self._sync(on_disk)
+                    self._load()
+                    self._files = on_disk
+            except sqlite3.Error as err:
+                print(f"⚠️ Knowledge index unavailable: {err}")
+            self._loaded = True
+            self._checked_at = now
+
+    # --- queries ---
+    def search(self, query, k=3):
+        """Return the ``k`` best passages as ``[(score, path, text, question, answer)]``."""
+        self.refresh()
+        passages, index, _, avg_length = self._state
+        n = len(passages)
+        if not n:
+            return []
+        scores = defaultdict(float)
+        for term in set(tokenize(query)):
+            postings = index.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (n - len(postings) + 0.5) / (len(postings) + 0.5))
+            for pid, tf in postings:
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * passages[pid][4] / avg_length)
+                scores[pid] += idf * tf * (BM25_K1 + 1) / (tf + norm)
+        best = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:k]
+        return [(score, *passages[pid][:4]) for pid, score in best]
+
+    def answer(self, question):
+        """Return a stored FAQ answer if ``question`` closely matches an entry, else None."""
+        self.refresh()
+        passages, _, faq, _ = self._state
+        key = normalize(question)
+        if not key:
+            return None
+        pid = faq.get(key)
+        if pid is None:
+            hits = {normalize(hit[3]): hit[4] for hit in self.search(question, k=5) if hit[3]}
+            close = difflib.get_close_matches(key, list(hits), n=1, cutoff=DIRECT_THRESHOLD)
+            return hits[close[0]] if close else None
+        return passages[pid][3]
+
+    def with_context(self, question, k=3):
+        """``question`` preceded by the ``k`` most relevant passages, if any."""
+        hits = self.search(question, k)
+        if not hits:
+            return question
+        passages = "\n\n".join(f"[{i}] ({path})\n{text}" for i, (_, path, text, _, _) in enumerate(hits, 1))
+        return (f"Relevant passages from our knowledge base (use them when they apply):\n\n{passages}"
+                f"\n\nQuestion: {question}")
+
+
+knowledge_index = KnowledgeIndex()
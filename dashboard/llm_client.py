@@ -0,0 +1,196 @@
+"""Shared HTTP client for upstream LLM chat-completion calls.
+
+Every agent (the dashboard's ``run_agent`` and the ``agents/*.py`` scripts)
+posts through one pooled ``requests.Session`` per worker process, so repeat
+calls to api.x.ai / openrouter.ai reuse keep-alive connections instead of
+paying for a fresh TCP + TLS handshake on every submission.
+
+Callers that pass ``labels={"agent": ..., "provider": ...}`` get latency,
+time to first byte and token usage recorded in :mod:`dashboard.metrics`.
+Every call is a client span of the current trace and carries its request id
+upstream (see :mod:`dashboard.tracing`).
+"""
+import asyncio
+import json as jsonlib
+import os
+import threading
+import time
+from urllib.parse import urlsplit
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+
+from dashboard import metrics, tracing
+
+# Upstream endpoints; override to point the app at a local stub server
+# (see bench/stub_llm.py).
+GROK_URL = os.getenv("GROK_API_URL", "https://api.x.ai/v1/chat/completions")
+OPENROUTER_URL = os.getenv("OPENROUTER_API_URL", "https://openrouter.ai/api/v1/chat/completions")
+
+# Seconds to wait for the TCP/TLS connection and for each read from the socket.
+CONNECT_TIMEOUT = float(os.getenv("LLM_CONNECT_TIMEOUT", "5"))
+READ_TIMEOUT = float(os.getenv("LLM_READ_TIMEOUT", "60"))
+
+# Number of distinct hosts to keep pools for, and the maximum number of open
+# connections per host in one worker process. Callers beyond the limit wait
+# for a free connection rather than opening more sockets.
+POOL_HOSTS = int(os.getenv("LLM_POOL_HOSTS", "4"))
+POOL_MAXSIZE = int(os.getenv("LLM_POOL_MAXSIZE", "8"))
+
+# The async client multiplexes many in-flight calls on one event loop, so it
+# gets a much larger connection ceiling than the per-thread sync pool.
+ASYNC_MAX_CONNECTIONS = int(os.getenv("LLM_ASYNC_MAX_CONNECTIONS", "200"))
+
+_session = None
+_session_pid = None
+_session_lock = threading.Lock()
+_async_clients = {}
+
+
+def _build_session():
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=POOL_HOSTS,
+        pool_maxsize=POOL_MAXSIZE,
+        pool_block=True,
+    )
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def get_session():
+    """Return this process's pooled session, creating it on first use.
+
+    The session is rebuilt after a fork so gunicorn workers never share
+    sockets inherited from the master process.
+    """
+    global _session, _session_pid
+    pid = os.getpid()
+    if _session is None or _session_pid != pid:
+        with _session_lock:
+            if _session is None or _session_pid != pid:
+                _session = _build_session()
+                _session_pid = pid
+    return _session
+
+
+def _usage(response):
+    try:
+        return response.json().get("usage")
+    except (ValueError, AttributeError):
+        return None
+
+
+def _traced(headers, span):
+    return dict(headers or {}, **tracing.headers(span))
+
+
+def post(url, headers=None, json=None, timeout=None, labels=None, **kwargs):
+    """POST through the pooled session with connect/read timeouts applied."""
+    if timeout is None:
+        timeout = (CONNECT_TIMEOUT, READ_TIMEOUT)
+    with tracing.span(f"POST {urlsplit(url).netloc}", tracing.CLIENT, **(labels or {})) as span:
+        start = time.perf_counter()
+        try:
+            response = get_session().post(url, headers=_traced(headers, span), json=json, timeout=timeout, **kwargs)
+        except requests.exceptions.RequestException as err:
+            if labels:
+                metrics.observe_llm(labels, time.perf_counter() - start, metrics.outcome_of(error=err))
+            raise
+        if span is not None:
+            span.set("http.status_code", response.status_code)
+    if labels and not kwargs.get("stream"):
+        # ``elapsed`` stops when the response headers arrive, i.e. time to first byte.
+        metrics.observe_llm(labels, time.perf_counter() - start, metrics.outcome_of(response.status_code),
+                            ttfb=response.elapsed.total_seconds(),
+                            usage=_usage(response) if response.ok else None)
+    return response
+
+
+def stream_post(url, headers=None, json=None, timeout=None, labels=None):
+    """POST a ``"stream": true`` chat completion and yield each content delta.
+
+    Raises ``requests.HTTPError`` before the first delta if the provider
+    rejects the request.
+    """
+    start = time.perf_counter()
+    ttfb, outcome, error = None, "error", None
+    span = tracing.start_span(f"POST {urlsplit(url).netloc} (stream)", tracing.CLIENT, **(labels or {}))
+    try:
+        response = get_session().post(url, headers=_traced(headers, span), json=json,
+                                      timeout=timeout or (CONNECT_TIMEOUT, READ_TIMEOUT), stream=True)
+        outcome = metrics.outcome_of(response.status_code)
+        if span is not None:
+            span.set("http.status_code", response.status_code)
+        with response:
+            if response.status_code >= 400:
+                response.content  # keep the error body readable after release
+            response.raise_for_status()
+            for line in response.iter_lines():
+                if not line.startswith(b"data:"):
+                    continue
+                data = line[5:].strip()
+                if data == b"[DONE]":
+                    break
+                choices = jsonlib.loads(data).get("choices") or []
+                if not choices:
+                    continue
+                delta = choices[0].get("delta", {}).get("content")
+                if delta:
+                    if ttfb is None:
+                        ttfb = time.perf_counter() - start
+                    yield delta
+    except requests.exceptions.RequestException as err:
+        error = err
+        if not isinstance(err, requests.exceptions.HTTPError):
+            outcome = metrics.outcome_of(error=err)
+        raise
+    finally:
+        if labels:
+            metrics.observe_llm(labels, time.perf_counter() - start, outcome, ttfb=ttfb)
+        if span is not None:
+            span.set("ttfb_ms", None if ttfb is None else round(ttfb * 1000, 1))
+            span.finish(error)
+
+
+def get_async_client():
+    """Return the ``httpx.AsyncClient`` bound to the running event loop."""
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None:
+        client = httpx.AsyncClient(
+            timeout=httpx.Timeout(READ_TIMEOUT, connect=CONNECT_TIMEOUT),
+            limits=httpx.Limits(
+                max_connections=ASYNC_MAX_CONNECTIONS,
+                max_keepalive_connections=POOL_MAXSIZE,
+            ),
+        )
+        _async_clients[loop] = client
+    return client
+
+
+async def async_post(url, headers=None, json=None, timeout=None, labels=None):
+    """Async counterpart of :func:`post` for the ASGI API."""
+    kwargs = {} if timeout is None else {"timeout": timeout}
+    with tracing.span(f"POST {urlsplit(url).netloc}", tracing.CLIENT, **(labels or {})) as span:
+        start = time.perf_counter()
+        try:
+            response = await get_async_client().post(url, headers=_traced(headers, span), json=json, **kwargs)
+        except httpx.HTTPError as err:
+            if labels:
+                metrics.observe_llm(labels, time.perf_counter() - start, metrics.outcome_of(error=err))
+            raise
+        if span is not None:
+            span.set("http.status_code", response.status_code)
+    if labels:
+        metrics.observe_llm(labels, time.perf_counter() - start, metrics.outcome_of(response.status_code),
+                            usage=_usage(response) if response.is_success else None)
+    return response
+
+
+async def aclose():
+    client = _async_clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.aclose()
@@ -0,0 +1,40 @@
+"""Per-thread SQLite connections for the state kept in local database files.
+
+The caches, the job queue, the knowledge index and the governor each keep
+a SQLite file shared by every worker on the host. A connection must not
+be used from two threads or carried across a fork, so each thread of each
+process opens its own on first use.
+"""
+import os
+import sqlite3
+import threading
+
+
+class ThreadLocalConnection:
+    """Callable returning the calling thread's connection to ``path``.
+
+    A new connection switches the file to WAL, so readers do not block the
+    writer, then runs the ``schema`` script and ``setup(conn)``. Other
+    keyword arguments (``timeout``, ``isolation_level``) go to
+    ``sqlite3.connect``.
+    """
+
+    def __init__(self, path, schema="", setup=None, **options):
+        self.path = path
+        self.schema = schema
+        self.setup = setup
+        self.options = options
+        self._local = threading.local()
+
+    def __call__(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, **self.options)
+            conn.execute("PRAGMA journal_mode=WAL")
+            if self.schema:
+                conn.executescript(self.schema)
+            if self.setup is not None:
+                self.setup(conn)
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
@@ -0,0 +1,136 @@
+"""Map-reduce for inputs that do not fit in one model call.
+
+Inputs estimated above ``LONG_INPUT_THRESHOLD_TOKENS`` are split into
+overlapping chunks at line boundaries. The agent's own template runs over
+every chunk concurrently (map), then a final call combines the per-chunk
+notes (reduce). If the notes are still too long, they are mapped again
+before the final call, for at most ``MAX_ROUNDS`` rounds; notes that are
+still too long after that are an error rather than an over-long prompt.
+Only the first ``LONG_INPUT_MAX_CHUNKS`` chunks of an input are read, which
+caps the calls one request can make; the final call is told how much of
+the document was left out. Token counts are estimated at
+``LONG_INPUT_CHARS_PER_TOKEN`` characters per token, which errs on the
+safe side for English text and numbers.
+
+``collect_notes`` is a generator that yields progress updates as chunks
+finish and returns the input for the final call, so callers can stream or
+store progress; ``drain`` runs it to the end with an optional callback.
+"""
+import contextvars
+import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+CHARS_PER_TOKEN = float(os.getenv("LONG_INPUT_CHARS_PER_TOKEN", "4"))
+THRESHOLD_TOKENS = int(os.getenv("LONG_INPUT_THRESHOLD_TOKENS", "6000"))
+CHUNK_TOKENS = int(os.getenv("LONG_INPUT_CHUNK_TOKENS", "3000"))
+OVERLAP_TOKENS = int(os.getenv("LONG_INPUT_OVERLAP_TOKENS", "200"))
+CONCURRENCY = int(os.getenv("LONG_INPUT_CONCURRENCY", "4"))
+# Response budget for the combining call, which has more to say than one chunk.
+REDUCE_MAX_TOKENS = int(os.getenv("LONG_INPUT_REDUCE_MAX_TOKENS", "1500"))
+# Chunks read from one input (map calls in the first round); later rounds only see the far shorter notes.
+MAX_CHUNKS = int(os.getenv("LONG_INPUT_MAX_CHUNKS", "40"))
+MAX_ROUNDS = 3
+
+MAP_NOTE = ("This is part {part} of {parts} of a longer document. Work only from this part; "
+            "the results for all parts will be combined afterwards.\n\n")
+REDUCE_NOTE = ("The document was too long to read at once, so it was analysed in {parts} overlapping parts. "
+               "Below are the findings for each part, in order. Combine them into one answer and drop "
+               "duplicates caused by the overlap.\n\n")
+UNREAD_NOTE = ("Only the first {read} of {parts} parts of the document could be read; say that the rest "
+               "was not analysed.\n\n")
+
+
+def estimate_tokens(text):
+    return int(len(text) / CHARS_PER_TOKEN) + 1
+
+
+def is_long(text, threshold=THRESHOLD_TOKENS):
+    return estimate_tokens(text) > threshold
+
+
+def split(text, chunk_tokens=CHUNK_TOKENS, overlap_tokens=OVERLAP_TOKENS):
+    """Split ``text`` into chunks of about ``chunk_tokens``, overlapping by ``overlap_tokens``."""
+    size = max(1, int(chunk_tokens * CHARS_PER_TOKEN))
+    overlap = min(int(overlap_tokens * CHARS_PER_TOKEN), size // 2)
+    chunks = []
+    start = 0
+    while start < len(text):
+        end = min(start + size, len(text))
+        if end < len(text):
+            # Prefer to cut at a line break (or at least a space) in the back half.
+            cut = text.rfind("\n", start + size // 2, end)
+            if cut == -1:
+                cut = text.rfind(" ", start + size // 2, end)
+            if cut != -1:
+                end = cut + 1
+        chunks.append(text[start:end])
+        if end >= len(text):
+            break
+        start = max(end - overlap, start + 1)
+    return chunks
+
+
+def _map(chunks, render, runner, concurrency, round_no):
+    """Yield progress as chunks finish; return their results in order."""
+    results = [None] * len(chunks)
+    pool = ThreadPoolExecutor(max_workers=max(1, min(concurrency, len(chunks))), thread_name_prefix="map")
+    futures = {
+        pool.submit(contextvars.copy_context().run, runner,
+                    MAP_NOTE.format(part=i + 1, parts=len(chunks)) + render(chunk)): i
+        for i, chunk in enumerate(chunks)
+    }
+    try:
+        for done, future in enumerate(as_completed(futures), 1):
+            results[futures[future]] = future.result()
+            yield {"stage": "map", "round": round_no, "done": done, "total": len(chunks)}
+    finally:
+        # A caller that stops listening (client gone) should not keep the model busy.
+        for future in futures:
+            future.cancel()
+        pool.shutdown(wait=False)
+    return results
+
+
+def reduce_input(notes):
+    """The text to hand the agent's template for the combining call."""
+    parts = "\n\n".join(f"--- Part {i} ---\n{note.strip()}" for i, note in enumerate(notes, 1))
+    return REDUCE_NOTE.format(parts=len(notes)) + parts
+
+
+def collect_notes(text, render, runner, concurrency=CONCURRENCY, max_chunks=MAX_CHUNKS):
+    """Map ``text`` until the combined notes fit in one call.
+
+    ``render(chunk)`` builds the agent prompt for a chunk and ``runner(prompt)``
+    returns the model's answer (``"❌ ..."`` on failure). Yields progress
+    dicts and returns the reduce input, or an error string starting with ❌.
+    """
+    unread = ""
+    for round_no in range(1, MAX_ROUNDS + 1):
+        chunks = split(text)
+        if round_no == 1 and len(chunks) > max_chunks:
+            print(f"✂️ Long input has {len(chunks)} parts; reading the first {max_chunks}")
+            unread = UNREAD_NOTE.format(read=max_chunks, parts=len(chunks))
+            chunks = chunks[:max_chunks]
+        yield {"stage": "map", "round": round_no, "done": 0, "total": len(chunks)}
+        notes = yield from _map(chunks, render, runner, concurrency, round_no)
+        failed = next((note for note in notes if note.startswith("❌")), None)
+        if failed is not None:
+            return failed
+        text = reduce_input(notes)
+        if not is_long(text):
+            break
+    else:
+        return f"❌ Input is still too long to combine after {MAX_ROUNDS} rounds of notes"
+    yield {"stage": "reduce", "round": round_no, "done": 0, "total": 1}
+    return unread + text
+
+
+def drain(steps, on_progress=None):
+    """Run a :func:`collect_notes` generator to completion and return its result."""
+    while True:
+        try:
+            update = next(steps)
+        except StopIteration as stop:
+            return stop.value
+        if on_progress is not None:
+            on_progress(update)
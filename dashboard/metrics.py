@@ -0,0 +1,88 @@
+"""Prometheus metrics for the dashboard, the job runner and the agent clients.
+
+Counters and histograms are kept in prometheus_client's multiprocess mode:
+every process (gunicorn workers, the job runner, ``agents/*.py`` scripts)
+writes its samples to files in ``PROMETHEUS_MULTIPROC_DIR`` and ``/metrics``
+adds them up, so a scrape sees the whole host rather than whichever worker
+answered. gunicorn.conf.py empties the directory when the server starts.
+
+What is measured:
+
+* ``dashboard_stage_seconds{stage, agent}`` - upload, extract, prescreen,
+  prompt, llm and render in the page handler,
+* ``dashboard_extract_seconds{kind}`` - PDF, OCR, audio and table
+  extraction on a cache miss,
+* ``dashboard_llm_request_seconds{agent, provider, outcome}`` and
+  ``dashboard_llm_ttfb_seconds{agent, provider}`` - upstream calls,
+* ``dashboard_llm_tokens_total{agent, provider, kind}`` - prompt and
+  completion tokens from the provider's ``usage`` field,
+* ``dashboard_cache_lookups_total{cache, result}`` - response and
+  extraction cache hits and misses.
+"""
+import os
+import shutil
+import tempfile
+
+# Must be set before prometheus_client is imported for multiprocess mode to apply.
+MULTIPROC_DIR = os.environ.setdefault(
+    "PROMETHEUS_MULTIPROC_DIR", os.path.join(tempfile.gettempdir(), "dashboard-metrics"))
+os.makedirs(MULTIPROC_DIR, exist_ok=True)
+
+from prometheus_client import (CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Histogram,  # noqa: E402
+                               generate_latest, multiprocess)
+
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120, 300)
+
+STAGE_SECONDS = Histogram("dashboard_stage_seconds", "Time spent in each stage of a page request",
+                          ["stage", "agent"], buckets=BUCKETS)
+EXTRACT_SECONDS = Histogram("dashboard_extract_seconds", "Upload text extraction time on a cache miss",
+                            ["kind"], buckets=BUCKETS)
+LLM_SECONDS = Histogram("dashboard_llm_request_seconds", "Upstream LLM call latency",
+                        ["agent", "provider", "outcome"], buckets=BUCKETS)
+LLM_TTFB = Histogram("dashboard_llm_ttfb_seconds", "Time to the first byte (or streamed token) of an LLM answer",
+                     ["agent", "provider"], buckets=BUCKETS)
+LLM_TOKENS = Counter("dashboard_llm_tokens_total", "Tokens reported by the provider's usage field",
+                     ["agent", "provider", "kind"])
+CACHE_LOOKUPS = Counter("dashboard_cache_lookups_total", "Cache lookups by result", ["cache", "result"])
+
+
+def observe_stage(stage, agent, seconds):
+    STAGE_SECONDS.labels(stage, agent or "none").observe(seconds)
+
+
+def cache_lookup(cache, hit):
+    CACHE_LOOKUPS.labels(cache, "hit" if hit else "miss").inc()
+
+
+def observe_llm(labels, seconds, outcome, ttfb=None, usage=None):
+    """Record one upstream call; ``labels`` is ``{"agent": ..., "provider": ...}``."""
+    agent, provider = labels.get("agent") or "none", labels.get("provider") or "unknown"
+    LLM_SECONDS.labels(agent, provider, outcome).observe(seconds)
+    if ttfb is not None:
+        LLM_TTFB.labels(agent, provider).observe(ttfb)
+    for kind in ("prompt", "completion"):
+        count = (usage or {}).get(f"{kind}_tokens")
+        if count:
+            LLM_TOKENS.labels(agent, provider, kind).inc(count)
+
+
+def outcome_of(status=None, error=None):
+    """Short label for how a call ended: ``ok``, ``429``, ``5xx``, ``4xx``, ``timeout`` or ``error``."""
+    if error is not None:
+        return "timeout" if "timeout" in type(error).__name__.lower() else "error"
+    if status is None or status < 400:
+        return "ok"
+    return "429" if status == 429 else f"{status // 100}xx"
+
+
+def render():
+    """Return ``(body, content_type)`` for a scrape, summed over every process."""
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry, path=MULTIPROC_DIR)
+    return generate_latest(registry), CONTENT_TYPE_LATEST
+
+
+def reset():
+    """Drop samples from previous runs; call once, before any worker starts."""
+    shutil.rmtree(MULTIPROC_DIR, ignore_errors=True)
+    os.makedirs(MULTIPROC_DIR, exist_ok=True)
@@ -0,0 +1,166 @@
+"""OCR for uploaded images.
+
+Each frame is normalised (EXIF orientation, grayscale, DPI-aware downscale,
+optional deskew) and run through Tesseract in a bounded process pool, so
+web workers only wait on the result instead of burning CPU themselves.
+Multi-frame TIFFs are split into one task per frame, each carrying only its
+own frame, with at most ``OCR_MAX_PENDING`` frames queued at a time; the
+texts are re-joined in order.
+"""
+import io
+import math
+import os
+import time
+from collections import deque
+from dataclasses import dataclass, field
+
+import pytesseract
+from PIL import Image, ImageOps
+
+from dashboard.workers import process_pool
+
+# Tesseract is most accurate around 300 DPI; anything finer only costs time.
+TARGET_DPI = int(os.getenv("OCR_TARGET_DPI", "300"))
+# Hard ceiling for images without DPI metadata (phone photos): ~A4 at 250 DPI.
+MAX_PIXELS = int(os.getenv("OCR_MAX_PIXELS", str(6_000_000)))
+DESKEW = os.getenv("OCR_DESKEW", "0") == "1"
+DESKEW_MAX_ANGLE = float(os.getenv("OCR_DESKEW_MAX_ANGLE", "5"))
+WORKERS = int(os.getenv("OCR_WORKERS", "2"))
+# Frames of one upload encoded and queued ahead of the OCR workers.
+MAX_PENDING = int(os.getenv("OCR_MAX_PENDING", "8"))
+TESSERACT_CMD = os.getenv("TESSERACT_PATH")
+
+# Bump when output changes; keys the extraction cache together with the settings.
+CACHE_VERSION = f"1-dpi{TARGET_DPI}-px{MAX_PIXELS}-deskew{int(DESKEW)}"
+
+
+@dataclass
+class OcrResult:
+    text: str
+    frames: int = 1
+    timings: dict = field(default_factory=dict)
+
+    def timing_summary(self):
+        return " ".join(f"{name}={seconds * 1000:.0f}ms" for name, seconds in self.timings.items())
+
+
+def _init_worker():
+    if TESSERACT_CMD:
+        pytesseract.pytesseract.tesseract_cmd = TESSERACT_CMD
+
+
+# === Preprocessing ===
+def _scale_for(image):
+    width, height = image.size
+    scale = 1.0
+    dpi = (image.info.get("dpi") or (0, 0))[0]
+    if dpi and dpi > TARGET_DPI:
+        scale = TARGET_DPI / dpi
+    if width * height * scale * scale > MAX_PIXELS:
+        scale = math.sqrt(MAX_PIXELS / (width * height))
+    return scale
+
+
+def _skew_angle(gray):
+    """Estimate page skew by maximising the variance of row darkness."""
+    thumb = ImageOps.invert(gray)
+    thumb.thumbnail((600, 600))
+    best_angle, best_score = 0.0, -1.0
+    steps = int(DESKEW_MAX_ANGLE * 4)
+    for i in range(-steps, steps + 1):
+        angle = i / 4
+        rows = list(thumb.rotate(angle, expand=False).resize((1, thumb.height), Image.BOX).getdata())
+        mean = sum(rows) / len(rows)
+        score = sum((r - mean) ** 2 for r in rows)
+        if score > best_score:
+            best_angle, best_score = angle, score
+    return best_angle
+
+
+def preprocess(image):
+    """Return a grayscale, OCR-sized copy of ``image``."""
+    scale = _scale_for(image)
+    target_pixels = image.width * image.height * scale * scale
+    if scale < 1 and image.format == "JPEG":
+        # Let the JPEG decoder skip detail we are about to throw away; it
+        # only reduces by powers of two and never below the requested size.
+        image.draft("L", (round(image.width * scale), round(image.height * scale)))
+    image = ImageOps.exif_transpose(image)
+    gray = ImageOps.grayscale(image)
+
+    ratio = math.sqrt(target_pixels / (gray.width * gray.height))
+    if ratio < 1:
+        gray = gray.resize((max(1, round(gray.width * ratio)), max(1, round(gray.height * ratio))),
+                           Image.LANCZOS)
+    if DESKEW:
+        angle = _skew_angle(gray)
+        if angle:
+            gray = gray.rotate(angle, resample=Image.BICUBIC, expand=True, fillcolor=255)
+    return gray
+
+
+# === Worker tasks ===
+def ocr_frame(data):
+    """Worker task: OCR one encoded single-frame image; returns (text, timings)."""
+    timings = {}
+    start = time.perf_counter()
+    image = Image.open(io.BytesIO(data))
+    gray = preprocess(image)
+    timings["preprocess"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    text = pytesseract.image_to_string(gray)
+    timings["tesseract"] = time.perf_counter() - start
+    return text, timings
+
+
+def submit_ocr(data):
+    """Queue OCR of one encoded single-frame image; the future yields (text, timings)."""
+    return process_pool("ocr", WORKERS, _init_worker).submit(ocr_frame, data)
+
+
+def _frames(data):
+    """Yield each frame of an encoded image as its own single-frame image."""
+    with Image.open(io.BytesIO(data)) as image:
+        if getattr(image, "n_frames", 1) == 1:
+            yield data
+            return
+        for frame in range(image.n_frames):
+            image.seek(frame)
+            # Turned upright here, since the orientation tag does not survive the re-encode.
+            upright = ImageOps.exif_transpose(image)
+            out = io.BytesIO()
+            # Uncompressed TIFF keeps every mode and the DPI that preprocess() scales by.
+            extra = {"dpi": image.info["dpi"]} if image.info.get("dpi") else {}
+            upright.save(out, format="TIFF", **extra)
+            yield out.getvalue()
+
+
+def ocr_image(image_file):
+    """OCR every frame of an uploaded image and return an :class:`OcrResult`."""
+    start = time.perf_counter()
+    image_file.seek(0)
+    data = image_file.read()
+
+    texts = []
+    timings = {"preprocess": 0.0, "tesseract": 0.0}
+
+    def collect(future):
+        text, frame_timings = future.result()
+        texts.append(text.strip())
+        for name, seconds in frame_timings.items():
+            timings[name] += seconds
+
+    window = deque()
+    try:
+        for frame in _frames(data):
+            window.append(submit_ocr(frame))
+            while window and (window[0].done() or len(window) >= MAX_PENDING):
+                collect(window.popleft())
+        while window:
+            collect(window.popleft())
+    finally:
+        for future in window:
+            future.cancel()
+    timings["total"] = time.perf_counter() - start
+    return OcrResult(text="\n\n".join(t for t in texts if t), frames=len(texts), timings=timings)
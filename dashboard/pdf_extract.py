@@ -0,0 +1,150 @@
+"""Single-pass, page-parallel PDF text extraction.
+
+``iter_pdf_text`` yields page text as it becomes available, extracting each
+page exactly once. Small documents are read in-process; larger ones are
+spooled to a temp file once and split into page ranges across a process
+pool, with results still yielded in page order. ``PDF_MAX_PAGES`` and
+``PDF_MAX_CHARS`` bound the work done for any one upload.
+
+Scanned pages (no text layer, but an embedded image) are rasterised at
+``PDF_OCR_DPI`` and sent to the shared OCR pool; pages that already have
+text are never OCR'd.
+"""
+import io
+import os
+import shutil
+import tempfile
+from collections import deque
+
+import pdfplumber
+
+from dashboard.ocr import submit_ocr
+from dashboard.workers import process_pool
+
+MAX_PAGES = int(os.getenv("PDF_MAX_PAGES", "500"))
+MAX_CHARS = int(os.getenv("PDF_MAX_CHARS", "2000000"))
+
+# Below this many pages the process pool costs more than it saves.
+PARALLEL_MIN_PAGES = int(os.getenv("PDF_PARALLEL_MIN_PAGES", "16"))
+PAGES_PER_TASK = int(os.getenv("PDF_PAGES_PER_TASK", "8"))
+WORKERS = int(os.getenv("PDF_WORKERS", str(min(4, os.cpu_count() or 1))))
+
+OCR_ENABLED = os.getenv("PDF_OCR", "1") != "0"
+OCR_DPI = int(os.getenv("PDF_OCR_DPI", "200"))
+# Scanned pages allowed to be rasterised and waiting on OCR at once.
+OCR_MAX_PENDING = int(os.getenv("PDF_OCR_MAX_PENDING", "8"))
+
+TRUNCATED_NOTE = "[... document truncated ...]"
+
+# Bump when output changes; keys the extraction cache together with the limits.
+CACHE_VERSION = f"1-p{MAX_PAGES}-c{MAX_CHARS}-ocr{OCR_DPI if OCR_ENABLED else 0}"
+
+
+def _page_text(page):
+    """Return the page's text, or PNG bytes of the page if it needs OCR."""
+    text = page.extract_text() or ""
+    if not text.strip() and OCR_ENABLED and page.images:
+        buffer = io.BytesIO()
+        page.to_image(resolution=OCR_DPI).original.save(buffer, format="PNG", dpi=(OCR_DPI, OCR_DPI))
+        text = buffer.getvalue()
+    page.close()  # drop pdfminer's cached layout objects for this page
+    return text
+
+
+def _with_ocr(pages):
+    """Turn rasterised pages into OCR jobs and yield every page's text in order.
+
+    Text-layer pages stream straight through; up to ``OCR_MAX_PENDING``
+    scanned pages are OCR'd concurrently while extraction carries on.
+    """
+    window = deque()
+    try:
+        for item in pages:
+            window.append(submit_ocr(item) if isinstance(item, bytes) else item)
+            while window and (isinstance(window[0], str) or window[0].done()
+                              or len(window) > OCR_MAX_PENDING):
+                yield _resolve(window.popleft())
+        while window:
+            yield _resolve(window.popleft())
+    finally:
+        for item in window:
+            if not isinstance(item, str):
+                item.cancel()
+
+
+def _resolve(item):
+    return item if isinstance(item, str) else item.result()[0].strip()
+
+
+def _extract_range(path, start, stop):
+    """Worker task: text (or page PNGs) for pages ``start``..``stop - 1`` (0-based)."""
+    with pdfplumber.open(path, pages=list(range(start + 1, stop + 1))) as pdf:
+        return [_page_text(page) for page in pdf.pages]
+
+
+def _serial_pages(pdf, n_pages):
+    for page in pdf.pages[:n_pages]:
+        yield _page_text(page)
+
+
+def _parallel_pages(path, n_pages):
+    pool = process_pool("pdf", WORKERS)
+    ranges = deque((start, min(start + PAGES_PER_TASK, n_pages))
+                   for start in range(0, n_pages, PAGES_PER_TASK))
+    in_flight = deque()
+    try:
+        while ranges or in_flight:
+            # Keep a bounded window of tasks queued so an early stop
+            # (character limit, client gone) leaves little work behind.
+            while ranges and len(in_flight) < WORKERS * 2:
+                in_flight.append(pool.submit(_extract_range, path, *ranges.popleft()))
+            yield from in_flight.popleft().result()
+    finally:
+        for future in in_flight:
+            future.cancel()
+
+
+def _spool(file_stream):
+    """Return a filesystem path for ``file_stream`` and whether we created it."""
+    name = getattr(file_stream, "name", None)
+    if isinstance(name, str) and os.path.isfile(name):
+        return name, False
+    file_stream.seek(0)
+    with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as tmp:
+        shutil.copyfileobj(file_stream, tmp)
+    return tmp.name, True
+
+
+def iter_pdf_text(file_stream, max_pages=MAX_PAGES, max_chars=MAX_CHARS):
+    """Yield the text of each non-empty page, in order, within the limits."""
+    with pdfplumber.open(file_stream) as pdf:
+        total_pages = len(pdf.pages)
+        n_pages = min(total_pages, max_pages)
+        if n_pages < PARALLEL_MIN_PAGES or WORKERS < 2:
+            truncated = yield from _limit_chars(_with_ocr(_serial_pages(pdf, n_pages)), max_chars)
+            if not truncated and total_pages > n_pages:
+                yield TRUNCATED_NOTE
+            return
+
+    path, owned = _spool(file_stream)
+    try:
+        truncated = yield from _limit_chars(_with_ocr(_parallel_pages(path, n_pages)), max_chars)
+        if not truncated and total_pages > n_pages:
+            yield TRUNCATED_NOTE
+    finally:
+        if owned:
+            os.unlink(path)
+
+
+def _limit_chars(pages, max_chars):
+    """Pass non-empty pages through until ``max_chars``; return True if cut short."""
+    remaining = max_chars
+    for text in pages:
+        if not text:
+            continue
+        if len(text) >= remaining:
+            yield text[:remaining] + "\n" + TRUNCATED_NOTE
+            return True
+        remaining -= len(text)
+        yield text
+    return False
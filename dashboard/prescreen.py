@@ -0,0 +1,225 @@
+"""Deterministic pre-screen for tabular transaction data.
+
+Agents marked ``prescreen: true`` in agents.yaml (monitor, fraud, payment)
+run CSV/TSV input through pandas before the LLM sees it. Rows are flagged
+for exact duplicates (hash of every column except the id), near duplicates
+(same account, amount and description within ``PRESCREEN_NEAR_DUP_MINUTES``),
+failed/refund statuses, per-account amount z-scores and per-account velocity
+(more than ``PRESCREEN_VELOCITY_MAX`` transactions in ``PRESCREEN_VELOCITY_WINDOW``).
+Only summary statistics and the flagged rows are sent to the model, so the
+prompt stays small however large the file is, and the flags are reproducible;
+a table the report would not shrink is sent as it is.
+
+Columns are found by name (``amount``, ``status``, ``account``...), so any
+check whose column is missing is simply skipped.
+"""
+import csv
+import io
+import os
+
+import numpy as np
+import pandas as pd
+
+from dashboard.tabular import TRUNCATED_NOTE
+
+MIN_ROWS = int(os.getenv("PRESCREEN_MIN_ROWS", "20"))
+MAX_FLAGGED_ROWS = int(os.getenv("PRESCREEN_MAX_FLAGGED_ROWS", "200"))
+NEAR_DUP_MINUTES = float(os.getenv("PRESCREEN_NEAR_DUP_MINUTES", "10"))
+ZSCORE_THRESHOLD = float(os.getenv("PRESCREEN_ZSCORE", "3"))
+ZSCORE_MIN_HISTORY = int(os.getenv("PRESCREEN_ZSCORE_MIN_HISTORY", "5"))
+VELOCITY_WINDOW = os.getenv("PRESCREEN_VELOCITY_WINDOW", "1h")
+VELOCITY_MAX = int(os.getenv("PRESCREEN_VELOCITY_MAX", "5"))
+
+FAILED_STATUSES = frozenset({"failed", "failure", "declined", "error", "rejected", "reversed", "chargeback",
+                             "cancelled", "canceled", "timeout", "insufficient_funds"})
+REFUND_STATUSES = frozenset({"refund", "refunded", "refund_pending", "refund_requested", "partially_refunded"})
+
+# Header keywords for each role, most specific first.
+COLUMN_HINTS = {
+    "id": ("transaction_id", "txn_id", "reference", "ref", "id"),
+    "account": ("account_id", "account", "customer_id", "customer", "user_id", "user", "card", "payer", "sender"),
+    "amount": ("amount", "value", "total", "sum", "price"),
+    "timestamp": ("timestamp", "datetime", "created_at", "date", "time"),
+    "status": ("status", "state", "result", "outcome"),
+    "description": ("merchant", "description", "payee", "recipient", "narration", "memo"),
+}
+
+
+def _normalise_header(name):
+    return str(name).strip().lower().replace(" ", "_").replace("-", "_")
+
+
+def find_columns(columns):
+    """Map each role in ``COLUMN_HINTS`` to the best matching column name, if any."""
+    headers = {_normalise_header(c): c for c in columns}
+    found = {}
+    # Exact header names win over partial ones ("account_id" is an account, not an id).
+    for exact in (True, False):
+        for role, hints in COLUMN_HINTS.items():
+            if role in found:
+                continue
+            for hint in hints:
+                match = headers.get(hint) if exact else next(
+                    (c for h, c in headers.items() if hint in h.split("_") and c not in found.values()), None)
+                if match is not None and match not in found.values():
+                    found[role] = match
+                    break
+    return found
+
+
+def parse_table(text):
+    """Return a DataFrame if ``text`` looks like a delimited table, else None."""
+    sample = text[:20000]
+    if sample.count("\n") < MIN_ROWS:
+        return None
+    try:
+        dialect = csv.Sniffer().sniff(sample, delimiters=",;\t|")
+    except csv.Error:
+        return None
+    try:
+        frame = pd.read_csv(io.StringIO(text), sep=dialect.delimiter, skipinitialspace=True,
+                            dtype=str, keep_default_na=False)
+    except (ValueError, pd.errors.ParserError):
+        return None
+    if frame.shape[1] < 2 or len(frame) < MIN_ROWS:
+        return None
+    return frame
+
+
+def _amounts(series):
+    cleaned = series.str.replace(r"[^\d.\-]", "", regex=True)
+    return pd.to_numeric(cleaned, errors="coerce")
+
+
+def _velocity(account, when):
+    """Per row, how many of the account's transactions fall in the window ending at it."""
+    valid = when.notna().to_numpy()
+    counts = np.zeros(len(when), dtype=np.int64)
+    if not valid.any():
+        return pd.Series(counts, index=when.index)
+    window = pd.Timedelta(VELOCITY_WINDOW).value
+    ns = when[valid].dt.as_unit("ns").astype("int64").to_numpy()
+    ns = ns - ns.min()
+    codes = pd.factorize(account[valid])[0].astype(np.int64)
+    # One sorted key per (account, time); accounts are spaced further apart than
+    # the window so a single searchsorted never crosses from one into the next.
+    key = codes * (ns.max() + window + 1) + ns
+    order = np.argsort(key, kind="stable")
+    sorted_key = key[order]
+    start = np.searchsorted(sorted_key, sorted_key - window, side="left")
+    in_window = np.empty_like(order)
+    in_window[order] = np.arange(len(order)) - start + 1
+    counts[valid] = in_window
+    return pd.Series(counts, index=when.index)
+
+
+def screen(frame):
+    """Return ``(flags, stats)``: ``{check: boolean array}`` and summary numbers."""
+    cols = find_columns(frame.columns)
+    flags = {}
+    stats = {"rows": len(frame), "columns": list(frame.columns), "detected": cols}
+
+    def flag(mask, reason):
+        flags[reason] = mask.fillna(False).to_numpy(dtype=bool)
+        stats[reason] = int(flags[reason].sum())
+
+    content = [c for c in frame.columns if c != cols.get("id")]
+    hashes = pd.util.hash_pandas_object(frame[content], index=False)
+    flag(hashes.duplicated(keep=False), "exact_duplicate")
+
+    amount = _amounts(frame[cols["amount"]]) if "amount" in cols else None
+    when = pd.to_datetime(frame[cols["timestamp"]], errors="coerce", format="mixed") if "timestamp" in cols else None
+    account = frame[cols["account"]].str.strip().str.lower() if "account" in cols else None
+
+    if amount is not None:
+        stats.update(total_amount=round(float(amount.sum()), 2), mean_amount=round(float(amount.mean()), 2),
+                     max_amount=round(float(amount.max()), 2) if amount.notna().any() else None)
+        flag(amount < 0, "negative_amount")
+    if when is not None and when.notna().any():
+        stats.update(first=str(when.min()), last=str(when.max()))
+
+    if "status" in cols:
+        status = frame[cols["status"]].str.strip().str.lower().str.replace(" ", "_")
+        flag(status.isin(FAILED_STATUSES), "failed_status")
+        flag(status.isin(REFUND_STATUSES), "refund_status")
+        stats["statuses"] = status.value_counts().head(10).to_dict()
+
+    if account is not None and amount is not None:
+        stats["accounts"] = int(account.nunique())
+        by_account = amount.groupby(account)
+        mean, std, count = by_account.transform("mean"), by_account.transform("std"), by_account.transform("count")
+        z = (amount - mean) / std.replace(0, np.nan)
+        flag((z.abs() >= ZSCORE_THRESHOLD) & (count >= ZSCORE_MIN_HISTORY), "amount_outlier")
+
+        if when is not None:
+            # Near duplicates: same account, amount and payee close together in time.
+            key_cols = [account, amount.round(2)]
+            if "description" in cols:
+                key_cols.append(frame[cols["description"]].str.strip().str.lower())
+            near_key = pd.util.hash_pandas_object(pd.concat(key_cols, axis=1), index=False)
+            order = pd.DataFrame({"key": near_key, "when": when}).sort_values(["key", "when"])
+            gap = order.groupby("key")["when"].diff()
+            close = gap <= pd.Timedelta(minutes=NEAR_DUP_MINUTES)
+            # Mark both the later row and the one it follows.
+            close = close | close.groupby(order["key"]).shift(-1, fill_value=False)
+            flag(close.reindex(frame.index) & ~hashes.duplicated(keep=False), "near_duplicate")
+
+            flag(_velocity(account, when) > VELOCITY_MAX, "high_velocity")
+
+    return flags, stats
+
+
+def report(frame, flags, stats):
+    """Text for the LLM: summary statistics and the flagged rows as CSV."""
+    names = list(flags)
+    matrix = np.column_stack([flags[name] for name in names]) if names else np.zeros((len(frame), 0), bool)
+    counts = matrix.sum(axis=1)
+    # Most-flagged rows first, file order within a tie.
+    picked = np.flatnonzero(counts)[np.argsort(-counts[counts > 0], kind="stable")]
+    shown = frame.iloc[picked[:MAX_FLAGGED_ROWS]].assign(
+        flags=[", ".join(n for n, hit in zip(names, matrix[i]) if hit) for i in picked[:MAX_FLAGGED_ROWS]])
+
+    lines = [
+        "Automated pre-screen of the uploaded transactions (deterministic checks; the full file was analysed).",
+        f"Rows: {stats['rows']}, columns: {', '.join(map(str, stats['columns']))}",
+    ]
+    for key in ("accounts", "total_amount", "mean_amount", "max_amount", "first", "last", "statuses"):
+        if stats.get(key) is not None:
+            lines.append(f"{key.replace('_', ' ').capitalize()}: {stats[key]}")
+    checks = ("exact_duplicate", "near_duplicate", "failed_status", "refund_status",
+              "negative_amount", "amount_outlier", "high_velocity")
+    lines.append("Flag counts: " + ", ".join(f"{c}={stats[c]}" for c in checks if c in stats))
+    lines.append(f"Flagged rows: {len(picked)} of {stats['rows']}"
+                 + (f" (showing the {len(shown)} with the most flags)" if len(shown) < len(picked) else ""))
+    if len(shown):
+        lines += ["", shown.to_csv(index=False).strip()]
+    return "\n".join(lines)
+
+
+def _split_note(text):
+    """Separate the truncation note dashboard.tabular appends to oversized tables."""
+    body, _, last = text.rstrip("\n").rpartition("\n")
+    if last.startswith(TRUNCATED_NOTE.split("{")[0]):
+        return body, last
+    return text, None
+
+
+def prescreen(text):
+    """Return the pre-screen report for tabular ``text``.
+
+    None if it is not a table, or if the report is no shorter than the table
+    itself (small or heavily flagged files), so the model gets the raw rows.
+    """
+    raw = text
+    text, note = _split_note(text)
+    frame = parse_table(text)
+    if frame is None:
+        return None
+    flags, stats = screen(frame)
+    screened = report(frame, flags, stats)
+    if note:
+        screened = screened.replace("the full file was analysed", "the file was cut at the upload limit, so only its first rows were analysed")
+        screened += "\n" + note
+    if len(screened) >= len(raw):
+        return None
+    return screened
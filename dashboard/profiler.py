@@ -0,0 +1,151 @@
+"""On-demand sampling profiler for live workers.
+
+``arm(n)`` (the ``POST /admin/profile`` hook) asks the next ``n`` requests,
+whichever worker serves them, to be profiled. A profiled request gets a
+background thread that samples the request thread's stack every
+``PROFILE_INTERVAL`` seconds; when the request ends the samples are saved
+under ``PROFILE_DIR``. ``collapsed()`` merges every saved profile into
+collapsed-stack text (``frame;frame;frame count`` per line), the input
+format of flamegraph.pl and speedscope.
+
+The arming state is a small file guarded by ``flock``, so an idle profiler
+costs each request a single ``stat``. Only the thread handling the request
+is sampled; OCR worker processes and helper thread pools are not.
+
+Only requests served by the Flask app are profiled, and ``/admin/*``
+requests never take a slot. The async routes in asgi.py (``/api/agents/*``,
+``/api/fanout``) are not profiled: they share the event loop thread with
+every other in-flight request, so its samples could not be attributed to
+one of them.
+"""
+import fcntl
+import os
+import sys
+import tempfile
+import threading
+from collections import Counter
+
+PROFILE_DIR = os.getenv("PROFILE_DIR", os.path.join(tempfile.gettempdir(), "dashboard-profiles"))
+INTERVAL = float(os.getenv("PROFILE_INTERVAL", "0.005"))
+MAX_REQUESTS = int(os.getenv("PROFILE_MAX_REQUESTS", "100"))
+ARMED_FILE = os.path.join(PROFILE_DIR, "armed")
+LOCK_FILE = os.path.join(PROFILE_DIR, "armed.lock")
+
+
+def _update_armed(change):
+    """Apply ``change(remaining) -> remaining`` under the lock; return ``(before, after)``."""
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    with open(LOCK_FILE, "a") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            with open(ARMED_FILE) as armed:
+                before = int(armed.read().strip() or 0)
+        except (OSError, ValueError):
+            before = 0
+        after = max(0, change(before))
+        if after:
+            with open(ARMED_FILE + ".tmp", "w") as tmp:
+                tmp.write(str(after))
+            os.replace(ARMED_FILE + ".tmp", ARMED_FILE)
+        elif os.path.exists(ARMED_FILE):
+            os.unlink(ARMED_FILE)
+    return before, after
+
+
+def arm(requests):
+    """Profile the next ``requests`` requests (capped at ``PROFILE_MAX_REQUESTS``)."""
+    return _update_armed(lambda _: min(requests, MAX_REQUESTS))[1]
+
+
+def remaining():
+    try:
+        with open(ARMED_FILE) as f:
+            return int(f.read().strip() or 0)
+    except (OSError, ValueError):
+        return 0
+
+
+def claim():
+    """True if this request should be profiled (takes one from the armed count)."""
+    if not os.path.exists(ARMED_FILE):
+        return False
+    before, _ = _update_armed(lambda n: n - 1)
+    return before > 0
+
+
+# === Sampling ===
+class Sampler:
+    """Samples one thread's stack on a background thread until stopped."""
+
+    def __init__(self, thread_id=None, interval=INTERVAL):
+        self.thread_id = thread_id or threading.get_ident()
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            self.stacks[";".join(reversed(stack))] += 1
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        return self.stacks
+
+
+def save(name, stacks):
+    """Write one request's samples to ``PROFILE_DIR/<name>.folded``."""
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    path = os.path.join(PROFILE_DIR, f"{name}.folded")
+    with open(path, "w", encoding="utf-8") as f:
+        f.writelines(f"{stack} {count}\n" for stack, count in stacks.items())
+    return path
+
+
+def collapsed(clear=False):
+    """All saved samples merged into collapsed-stack text; ``clear`` deletes them afterwards."""
+    total = Counter()
+    if os.path.isdir(PROFILE_DIR):
+        for name in os.listdir(PROFILE_DIR):
+            if not name.endswith(".folded"):
+                continue
+            path = os.path.join(PROFILE_DIR, name)
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    stack, _, count = line.rstrip("\n").rpartition(" ")
+                    if stack and count.isdigit():
+                        total[stack] += int(count)
+            if clear:
+                os.unlink(path)
+    return "".join(f"{stack} {count}\n" for stack, count in total.most_common())
+
+
+def profiles():
+    if not os.path.isdir(PROFILE_DIR):
+        return 0
+    return sum(name.endswith(".folded") for name in os.listdir(PROFILE_DIR))
+
+
+def start():
+    """A running :class:`Sampler` for the current thread if the profiler is armed, else None."""
+    return Sampler().start() if claim() else None
+
+
+def finish(sampler, name):
+    """Stop ``sampler`` and save its samples as ``name``."""
+    stacks = sampler.stop()
+    save(name, stacks)
+    print(f"🔬 Profiled {name}: {sum(stacks.values())} samples")
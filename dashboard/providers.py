@@ -0,0 +1,423 @@
+"""LLM provider registry with fallback and hedged requests.
+
+Each provider knows its endpoint, API key variable, default model id and
+how to read an answer out of its response. ``complete`` sends a request to
+the provider the user picked and, when that provider times out or returns
+a 5xx/429, retries on the next configured provider. With ``LLM_HEDGE_AFTER``
+set, a duplicate request is fired at the backup if the primary has not
+answered within that many seconds, and whichever finishes first wins.
+
+Every call goes through :mod:`dashboard.governor`, which paces requests to
+each provider's rate limits, caps calls in flight, retries 429/5xx answers
+with backoff (honouring ``Retry-After``) and stops calling a provider that
+keeps failing, so the fallback chain moves on to the next one.
+"""
+import asyncio
+import contextvars
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+
+import httpx
+import requests
+
+from dashboard import llm_client, tracing
+from dashboard.governor import (FAILED, MAX_QUEUE_WAIT, OK, RATE_LIMITED, RETRIES, Throttled, backoff, governor,
+                                retry_after_seconds)
+from dashboard.long_input import estimate_tokens
+
+DEFAULT_PROVIDER = os.getenv("LLM_DEFAULT_PROVIDER", "grok")
+FALLBACK_ENABLED = os.getenv("LLM_FALLBACK", "1") != "0"
+HEDGE_AFTER = float(os.getenv("LLM_HEDGE_AFTER", "0"))
+
+# Order in which backups are tried after the selected provider.
+FALLBACK_ORDER = [p.strip() for p in os.getenv("LLM_FALLBACK_ORDER", "grok,openrouter,gemini").split(",") if p.strip()]
+
+
+class UpstreamError(Exception):
+    """A provider call failed; ``retryable`` errors may be sent elsewhere."""
+
+    def __init__(self, provider, message, retryable=True, status=None, retry_after=None):
+        super().__init__(message)
+        self.provider = provider
+        self.retryable = retryable
+        self.status = status
+        self.retry_after = retry_after
+
+
+class UpstreamTimeout(UpstreamError):
+    pass
+
+
+class UpstreamThrottled(UpstreamError):
+    """The governor refused the call: circuit open or rate limits exhausted."""
+
+
+@dataclass(frozen=True)
+class Provider:
+    name: str
+    label: str
+    url: str
+    api_key_env: str
+    model: str
+
+    def api_key(self):
+        return os.getenv(self.api_key_env)
+
+    def headers(self):
+        return {
+            "Authorization": f"Bearer {self.api_key()}",
+            "Content-Type": "application/json"
+        }
+
+    def payload(self, payload):
+        """Retarget ``payload`` at this provider, honouring a per-agent ``models`` map.
+
+        ``models`` and ``agent`` are our own metadata and are not sent upstream.
+        """
+        body = {k: v for k, v in payload.items() if k not in ("models", "agent")}
+        body["model"] = payload.get("models", {}).get(self.name, self.model)
+        return body
+
+    def labels(self, payload):
+        """Metric labels for a call made with ``payload``."""
+        return {"agent": payload.get("agent"), "provider": self.name}
+
+    def parse(self, data):
+        return data["choices"][0]["message"]["content"]
+
+
+PROVIDERS = {
+    "grok": Provider(
+        name="grok",
+        label="Grok",
+        url=llm_client.GROK_URL,
+        api_key_env="GROK_API_KEY",
+        model=os.getenv("GROK_MODEL", "grok-4-0709"),
+    ),
+    "openrouter": Provider(
+        name="openrouter",
+        label="OpenRouter",
+        url=llm_client.OPENROUTER_URL,
+        api_key_env="OPENROUTER_API_KEY",
+        model=os.getenv("OPENROUTER_MODEL", "openai/gpt-4"),
+    ),
+    # Gemini's OpenAI-compatible endpoint, so requests and parsing match the others.
+    "gemini": Provider(
+        name="gemini",
+        label="Gemini",
+        url=os.getenv("GEMINI_API_URL", "https://generativelanguage.googleapis.com/v1beta/openai/chat/completions"),
+        api_key_env="GEMINI_API_KEY",
+        model=os.getenv("GEMINI_MODEL", "gemini-2.5-flash"),
+    ),
+}
+
+
+def get_provider(name):
+    return PROVIDERS.get(name or DEFAULT_PROVIDER) or PROVIDERS[DEFAULT_PROVIDER]
+
+
+def fallback_chain(name):
+    """The selected provider followed by any backups that have an API key."""
+    primary = get_provider(name)
+    chain = [primary]
+    if FALLBACK_ENABLED:
+        chain += [PROVIDERS[n] for n in FALLBACK_ORDER
+                  if n in PROVIDERS and n != primary.name and PROVIDERS[n].api_key()]
+    return chain
+
+
+def _retryable_status(status):
+    return status == 429 or status >= 500
+
+
+def _http_error(provider, status, text, headers, err):
+    return UpstreamError(
+        provider.name,
+        f"HTTP error: {err}\n🔁 Response: {text}",
+        retryable=_retryable_status(status),
+        status=status,
+        retry_after=retry_after_seconds(headers.get("Retry-After")) if status == 429 else None,
+    )
+
+
+def _outcome(err):
+    """How a failed call counts for the governor: a 429 pauses, other transient errors trip the breaker."""
+    if err.status == 429:
+        return RATE_LIMITED
+    return FAILED if err.retryable else OK
+
+
+def _usage(data):
+    return (data.get("usage") or {}).get("total_tokens")
+
+
+def _request_tokens(body):
+    """Tokens a request may use: its prompt plus the completion budget."""
+    prompt = sum(estimate_tokens(str(m.get("content") or "")) for m in body.get("messages", []))
+    return prompt + int(body.get("max_tokens") or 0)
+
+
+def _throttled(provider, err):
+    return UpstreamThrottled(provider.name, f"{provider.label} unavailable: {err}")
+
+
+def _retry_delay(provider, err, attempt):
+    """Seconds to wait before retrying ``err`` on the same provider, or None to give up on it.
+
+    Timeouts and waits longer than ``LLM_MAX_QUEUE_WAIT`` go straight to the
+    next provider instead.
+    """
+    if not err.retryable or isinstance(err, UpstreamTimeout) or attempt >= RETRIES:
+        return None
+    delay = backoff(attempt, err.retry_after)
+    if delay > MAX_QUEUE_WAIT:
+        return None
+    print(f"🔁 {provider.label} {err.status or 'error'}, retrying in {delay:.1f}s (attempt {attempt + 1})")
+    return delay
+
+
+# === Sync calls (Flask routes, batch, agents) ===
+def _send(provider, body, labels):
+    try:
+        response = llm_client.post(provider.url, headers=provider.headers(), json=body, labels=labels)
+        response.raise_for_status()
+        data = response.json()
+        return provider.parse(data), _usage(data)
+    except requests.exceptions.HTTPError as http_err:
+        response = http_err.response
+        raise _http_error(provider, response.status_code, response.text, response.headers, http_err)
+    except requests.exceptions.Timeout as timeout_err:
+        raise UpstreamTimeout(provider.name, f"Timed out waiting for {provider.label}: {timeout_err}")
+    except requests.exceptions.RequestException as err:
+        raise UpstreamError(provider.name, f"Unexpected error: {err}")
+    except (KeyError, IndexError, ValueError) as err:
+        raise UpstreamError(provider.name, f"Unexpected response from {provider.label}: {err!r}", retryable=False)
+
+
+def call(provider, payload):
+    """Send ``payload`` to one provider and return the answer text, retrying transient failures."""
+    if not provider.api_key():
+        raise UpstreamError(provider.name, f"ERROR: {provider.api_key_env} not found in .env")
+    body = provider.payload(payload)
+    tokens = _request_tokens(body)
+    attempt = 0
+    while True:
+        try:
+            with tracing.span("governor.acquire", provider=provider.name, attempt=attempt):
+                lease = governor.acquire(provider.name, body["model"], tokens)
+        except Throttled as err:
+            raise _throttled(provider, err)
+        outcome, used, error = OK, None, None
+        try:
+            text, used = _send(provider, body, provider.labels(payload))
+            return text
+        except UpstreamError as err:
+            outcome, error = _outcome(err), err
+        finally:
+            # Whatever happened (including errors that are not UpstreamError), the lease is returned once.
+            governor.release(lease, provider.name, outcome, used_tokens=used, retry_after=error and error.retry_after)
+        delay = _retry_delay(provider, error, attempt)
+        if delay is None:
+            raise error
+        time.sleep(delay)
+        attempt += 1
+
+
+_hedge_pool = ThreadPoolExecutor(max_workers=int(os.getenv("LLM_HEDGE_THREADS", "16")),
+                                 thread_name_prefix="hedge")
+
+
+def _hedged(primary, backup, payload, hedge_after):
+    first = _hedge_pool.submit(contextvars.copy_context().run, call, primary, payload)
+    done, _ = wait([first], timeout=hedge_after)
+    if done:
+        try:
+            return first.result(), primary.name
+        except UpstreamError as err:
+            if not err.retryable:
+                raise
+            return call(backup, payload), backup.name
+
+    print(f"⏱️ {primary.label} slower than {hedge_after}s, hedging to {backup.label}")
+    second = _hedge_pool.submit(contextvars.copy_context().run, call, backup, payload)
+    owners = {first: primary.name, second: backup.name}
+    pending = set(owners)
+    error = None
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            try:
+                return future.result(), owners[future]
+            except UpstreamError as err:
+                error = error or err
+    raise error
+
+
+def complete(payload, provider_name=None, hedge_after=HEDGE_AFTER):
+    """Return ``(answer, provider_name)`` using fallback and optional hedging."""
+    chain = fallback_chain(provider_name)
+    if hedge_after > 0 and len(chain) > 1:
+        return _hedged(chain[0], chain[1], payload, hedge_after)
+
+    error = None
+    for provider in chain:
+        try:
+            return call(provider, payload), provider.name
+        except UpstreamError as err:
+            error = err
+            if not err.retryable:
+                break
+            print(f"⚠️ {provider.label} failed, trying next provider: {err}")
+    raise error
+
+
+def _stream_one(provider, body, labels):
+    """Stream from one provider, retrying only while nothing has been yielded."""
+    tokens = _request_tokens(body)
+    attempt = 0
+    while True:
+        try:
+            lease = governor.acquire(provider.name, body["model"], tokens)
+        except Throttled as err:
+            raise _throttled(provider, err)
+        started, outcome, error = False, OK, None
+        try:
+            for delta in llm_client.stream_post(provider.url, headers=provider.headers(), json=body, labels=labels):
+                started = True
+                yield delta
+            return
+        except requests.exceptions.HTTPError as http_err:
+            response = http_err.response
+            error = _http_error(provider, response.status_code, response.text, response.headers, http_err)
+        except requests.exceptions.Timeout as timeout_err:
+            error = UpstreamTimeout(provider.name, f"Timed out waiting for {provider.label}: {timeout_err}")
+        except requests.exceptions.RequestException as err:
+            error = UpstreamError(provider.name, f"Unexpected error: {err}")
+        finally:
+            # Also runs when the client disconnects mid-stream (GeneratorExit).
+            if error is not None:
+                outcome = _outcome(error)
+            governor.release(lease, provider.name, outcome, retry_after=error and error.retry_after)
+        delay = None if started else _retry_delay(provider, error, attempt)
+        if delay is None:
+            raise error
+        time.sleep(delay)
+        attempt += 1
+
+
+def stream(payload, provider_name=None):
+    """Yield answer deltas and return the name of the provider that served them.
+
+    Falls back only if a provider fails before its first token.
+    """
+    error = None
+    for provider in fallback_chain(provider_name):
+        if not provider.api_key():
+            error = UpstreamError(provider.name, f"ERROR: {provider.api_key_env} not found in .env")
+            continue
+        started = False
+        try:
+            for delta in _stream_one(provider, dict(provider.payload(payload), stream=True), provider.labels(payload)):
+                started = True
+                yield delta
+            return provider.name
+        except UpstreamError as err:
+            error = err
+        if started or not error.retryable:
+            break
+    raise error
+
+
+# === Async calls (ASGI API) ===
+async def _asend(provider, body, labels):
+    try:
+        response = await llm_client.async_post(provider.url, headers=provider.headers(), json=body, labels=labels)
+        response.raise_for_status()
+        data = response.json()
+        return provider.parse(data), _usage(data)
+    except httpx.HTTPStatusError as err:
+        raise _http_error(provider, err.response.status_code, err.response.text, err.response.headers, err)
+    except httpx.TimeoutException as err:
+        raise UpstreamTimeout(provider.name, f"Timed out waiting for {provider.label}: {err!r}")
+    except httpx.HTTPError as err:
+        raise UpstreamError(provider.name, f"Unexpected error: {err!r}")
+    except (KeyError, IndexError, ValueError) as err:
+        raise UpstreamError(provider.name, f"Unexpected response from {provider.label}: {err!r}", retryable=False)
+
+
+async def acall(provider, payload):
+    if not provider.api_key():
+        raise UpstreamError(provider.name, f"ERROR: {provider.api_key_env} not found in .env")
+    body = provider.payload(payload)
+    tokens = _request_tokens(body)
+    attempt = 0
+    while True:
+        try:
+            with tracing.span("governor.acquire", provider=provider.name, attempt=attempt):
+                lease = await governor.aacquire(provider.name, body["model"], tokens)
+        except Throttled as err:
+            raise _throttled(provider, err)
+        outcome, used, error = OK, None, None
+        try:
+            text, used = await _asend(provider, body, provider.labels(payload))
+            return text
+        except UpstreamError as err:
+            outcome, error = _outcome(err), err
+        finally:
+            # Also runs for the losing side of a hedge (CancelledError); its lease must not count as in flight.
+            await governor.arelease(lease, provider.name, outcome, used_tokens=used,
+                                    retry_after=error and error.retry_after)
+        delay = _retry_delay(provider, error, attempt)
+        if delay is None:
+            raise error
+        await asyncio.sleep(delay)
+        attempt += 1
+
+
+async def _ahedged(primary, backup, payload, hedge_after):
+    first = asyncio.ensure_future(acall(primary, payload))
+    done, _ = await asyncio.wait([first], timeout=hedge_after)
+    if done:
+        try:
+            return first.result(), primary.name
+        except UpstreamError as err:
+            if not err.retryable:
+                raise
+            return await acall(backup, payload), backup.name
+
+    second = asyncio.ensure_future(acall(backup, payload))
+    owners = {first: primary.name, second: backup.name}
+    pending = set(owners)
+    error = None
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                try:
+                    return task.result(), owners[task]
+                except UpstreamError as err:
+                    error = error or err
+        raise error
+    finally:
+        # Unlike threads, the losing request can actually be abandoned here.
+        for task in pending:
+            task.cancel()
+
+
+async def acomplete(payload, provider_name=None, hedge_after=HEDGE_AFTER):
+    """Async counterpart of :func:`complete`."""
+    chain = fallback_chain(provider_name)
+    if hedge_after > 0 and len(chain) > 1:
+        return await _ahedged(chain[0], chain[1], payload, hedge_after)
+
+    error = None
+    for provider in chain:
+        try:
+            return await acall(provider, payload), provider.name
+        except UpstreamError as err:
+            error = err
+            if not err.retryable:
+                break
+    raise error
@@ -0,0 +1,131 @@
+"""Two-tier cache for completed agent responses.
+
+Tier 1 is an in-process LRU with a TTL. Tier 2 is an optional SQLite file
+(``RESPONSE_CACHE_DB``) shared by every gunicorn worker on the host, so a
+question answered by one worker is a hit for all of them.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from dashboard import metrics
+from dashboard.local_db import ThreadLocalConnection
+
+MEMORY_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "512"))
+TTL_SECONDS = float(os.getenv("RESPONSE_CACHE_TTL", "3600"))
+DB_PATH = os.getenv("RESPONSE_CACHE_DB", "")
+
+# Extra agents to skip on top of those marked ``cache: false`` in agents.yaml.
+UNCACHED_AGENTS = frozenset(
+    a.strip() for a in os.getenv("RESPONSE_CACHE_SKIP", "").split(",") if a.strip()
+)
+
+
+def make_key(agent_type, model, system_prompt, prompt, temperature, max_tokens):
+    raw = json.dumps(
+        [agent_type, model, system_prompt, prompt, temperature, max_tokens],
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    def __init__(self, max_size=MEMORY_SIZE, ttl=TTL_SECONDS, db_path=DB_PATH,
+                 skip_agents=UNCACHED_AGENTS):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.db_path = db_path
+        self.skip_agents = frozenset(skip_agents)
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = ThreadLocalConnection(
+            db_path, "CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+                     "expires_at REAL NOT NULL);", timeout=5)
+
+    def enabled_for(self, agent_type):
+        return self.ttl > 0 and agent_type not in self.skip_agents
+
+    # --- shared SQLite tier ---
+    def _disk_get(self, key, now):
+        row = self._db().execute(
+            "SELECT value, expires_at FROM responses WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None or row[1] <= now:
+            return None
+        return row[0], row[1]
+
+    def _disk_set(self, key, value, expires_at):
+        conn = self._db()
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO responses (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, value, expires_at),
+            )
+            conn.execute("DELETE FROM responses WHERE expires_at <= ?", (time.time(),))
+
+    # --- public API ---
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[1] > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    metrics.cache_lookup("response", True)
+                    return entry[0]
+                del self._entries[key]
+
+        if self.db_path:
+            try:
+                found = self._disk_get(key, now)
+            except sqlite3.Error as err:
+                print(f"⚠️ Response cache read failed: {err}")
+                found = None
+            if found is not None:
+                with self._lock:
+                    self._remember(key, found[0], found[1])
+                    self.hits += 1
+                    self.disk_hits += 1
+                metrics.cache_lookup("response", True)
+                return found[0]
+
+        with self._lock:
+            self.misses += 1
+        metrics.cache_lookup("response", False)
+        return None
+
+    def set(self, key, value):
+        expires_at = time.time() + self.ttl
+        with self._lock:
+            self._remember(key, value, expires_at)
+        if self.db_path:
+            try:
+                self._disk_set(key, value, expires_at)
+            except sqlite3.Error as err:
+                print(f"⚠️ Response cache write failed: {err}")
+
+    def _remember(self, key, value, expires_at):
+        self._entries[key] = (value, expires_at)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "entries": len(self._entries),
+            }
+
+
+response_cache = ResponseCache()
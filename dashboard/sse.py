@@ -0,0 +1,7 @@
+"""Server-Sent Events framing shared by the streaming routes."""
+import json
+
+
+def format_event(event, data):
+    """Encode one SSE message; ``data`` is JSON so newlines survive framing."""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
@@ -0,0 +1,213 @@
+"""Streaming ingestion for CSV, TSV and XLSX uploads.
+
+Rows are read one at a time (``csv`` over the upload stream, openpyxl in
+read-only mode for XLSX), so memory is bounded by the output rather than
+by the upload. Column types are inferred from the first
+``TABULAR_SAMPLE_ROWS`` rows and every row is re-serialised compactly:
+snake_case headers made unique (long ones shortened), repeated header rows
+from concatenated exports dropped, numbers stripped of currency symbols,
+thousands separators and excess precision, dates in one ISO form. Values
+that only look numeric (leading zeros, more than 15 significant digits:
+account numbers, zip codes) are codes and are kept exactly as written.
+Output stops at ``TABULAR_MAX_CHARS``; the rest of the file is only counted.
+
+The result is plain comma-separated text, so the pre-screen and the
+long-input path can consume it like any other table.
+"""
+import csv
+import io
+import os
+import re
+from datetime import date, datetime, time
+from decimal import Decimal
+from itertools import chain, islice
+
+MAX_CHARS = int(os.getenv("TABULAR_MAX_CHARS", str(16_000_000)))
+SAMPLE_ROWS = int(os.getenv("TABULAR_SAMPLE_ROWS", "200"))
+DECIMALS = int(os.getenv("TABULAR_DECIMALS", "2"))
+MAX_COLUMN_NAME = 24
+
+EXTENSIONS = (".csv", ".tsv", ".xlsx")
+TRUNCATED_NOTE = "[... table truncated: {rows} more rows not shown ...]"
+
+# Bump when output changes; keys the extraction cache together with the limits.
+CACHE_VERSION = f"2-c{MAX_CHARS}-d{DECIMALS}"
+
+_NUMBER = re.compile(r"^\(?[-+]?[$€£¥₦]?\s*[\d,]*\.?\d+\)?$")
+_DATE_FORMATS = ("%Y-%m-%d", "%Y-%m-%d %H:%M:%S", "%Y-%m-%dT%H:%M:%S", "%Y-%m-%d %H:%M", "%d/%m/%Y",
+                 "%m/%d/%Y", "%d/%m/%Y %H:%M", "%m/%d/%Y %H:%M", "%Y/%m/%d")
+
+
+def is_table(filename):
+    return (filename or "").lower().endswith(EXTENSIONS)
+
+
+# === Readers ===
+def _iter_csv(stream, delimiter=None):
+    stream.seek(0)
+    text = io.TextIOWrapper(stream, encoding="utf-8-sig", errors="replace", newline="")
+    try:
+        if delimiter is None:
+            sample = text.read(65536)
+            text.seek(0)
+            try:
+                delimiter = csv.Sniffer().sniff(sample, delimiters=",;\t|").delimiter
+            except csv.Error:
+                delimiter = ","
+        yield from csv.reader(text, delimiter=delimiter)
+    finally:
+        text.detach()  # leave the upload stream open for the caller
+
+
+def _iter_xlsx(stream):
+    from openpyxl import load_workbook
+
+    stream.seek(0)
+    workbook = load_workbook(stream, read_only=True, data_only=True)
+    try:
+        for row in workbook.active.iter_rows(values_only=True):
+            yield ["" if value is None else value for value in row]
+    finally:
+        workbook.close()
+
+
+def reader_for(filename):
+    """How the upload is parsed: ``"xlsx"``, ``"tsv"`` (always tab) or ``"csv"`` (delimiter sniffed).
+
+    The same bytes parse differently under each, so extraction caches key on it too.
+    """
+    name = (filename or "").lower()
+    return "xlsx" if name.endswith(".xlsx") else "tsv" if name.endswith(".tsv") else "csv"
+
+
+def iter_rows(stream, filename):
+    """Yield every row of the upload (header first) as a list of cells."""
+    reader = reader_for(filename)
+    if reader == "xlsx":
+        return _iter_xlsx(stream)
+    return _iter_csv(stream, "\t" if reader == "tsv" else None)
+
+
+# === Columns and types ===
+def column_names(header):
+    names = []
+    seen = set()
+    for i, raw in enumerate(header, 1):
+        name = re.sub(r"[^0-9a-z]+", "_", str(raw).strip().lower()).strip("_") or f"col{i}"
+        if len(name) > MAX_COLUMN_NAME:
+            # "customer_reference_number_for_settlement" -> "cust_refe_numb_for_sett"
+            name = "_".join(word[:4] for word in name.split("_"))[:MAX_COLUMN_NAME].strip("_")
+        unique, n = name, 2
+        while unique in seen:
+            unique, n = f"{name}_{n}", n + 1
+        seen.add(unique)
+        names.append(unique)
+    return names
+
+
+def _is_code(digits):
+    """True for digit strings that are identifiers rather than amounts: ``00123``, 16+ digit numbers."""
+    whole = digits.partition(".")[0]
+    return (len(whole) > 1 and whole.startswith("0")) or len(digits.replace(".", "").lstrip("0")) > 15
+
+
+def _to_number(value):
+    """The value as a number, or None; text is parsed with ``Decimal`` so no digits are lost."""
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return value
+    text = str(value).strip()
+    if not text or not _NUMBER.match(text) or _is_code(re.sub(r"[^\d.]", "", text)):
+        return None
+    negative = text.startswith("(") and text.endswith(")")  # accounting style (12.50)
+    number = Decimal(re.sub(r"[^\d.\-+]", "", text))
+    return -number if negative else number
+
+
+def _to_datetime(value):
+    if isinstance(value, datetime):
+        return value
+    if isinstance(value, date):
+        return datetime.combine(value, time())
+    text = str(value).strip()
+    if not text or text[0] not in "0123456789":
+        return None
+    try:
+        return datetime.fromisoformat(text)
+    except ValueError:
+        pass
+    for fmt in _DATE_FORMATS:
+        try:
+            return datetime.strptime(text, fmt)
+        except ValueError:
+            continue
+    return None
+
+
+def infer_types(sample, width):
+    """Per column ``"number"``, ``"datetime"`` or ``"text"`` from a sample of rows."""
+    types = []
+    for i in range(width):
+        values = [row[i] for row in sample if i < len(row) and str(row[i]).strip() != ""]
+        if values and all(_to_number(v) is not None for v in values):
+            types.append("number")
+        elif values and all(_to_datetime(v) is not None for v in values):
+            types.append("datetime")
+        else:
+            types.append("text")
+    return types
+
+
+def _format(value, kind):
+    if kind == "number":
+        number = _to_number(value)
+        if number is not None:
+            if number == int(number):
+                return str(int(number))
+            return f"{round(number, DECIMALS):.{DECIMALS}f}".rstrip("0").rstrip(".")
+    elif kind == "datetime":
+        moment = _to_datetime(value)
+        if moment is not None:
+            if moment.time() == time():
+                return moment.strftime("%Y-%m-%d")
+            return moment.strftime("%Y-%m-%d %H:%M" if moment.second == 0 else "%Y-%m-%d %H:%M:%S")
+    if isinstance(value, datetime):
+        return value.isoformat(" ")
+    return " ".join(str(value).split())
+
+
+# === Serialisation ===
+def extract_table(stream, filename, max_chars=MAX_CHARS):
+    """Return the upload as compact CSV text, cut off at ``max_chars``."""
+    rows = iter_rows(stream, filename)
+    header = next(rows, None)
+    if header is None:
+        return ""
+    names = column_names(header)
+    header_key = [str(cell).strip().lower() for cell in header]
+    sample = list(islice(rows, SAMPLE_ROWS))
+    types = infer_types(sample, len(names))
+
+    out = io.StringIO()
+    writer = csv.writer(out, lineterminator="\n")
+    writer.writerow(names)
+    skipped = 0
+    for row in chain(sample, rows):
+        if not any(str(cell).strip() for cell in row):
+            continue
+        if [str(cell).strip().lower() for cell in row] == header_key:
+            continue  # header repeated by a concatenated export
+        if out.tell() >= max_chars:
+            skipped += 1
+            continue
+        writer.writerow([_format(cell, types[i] if i < len(types) else "text") for i, cell in enumerate(row)])
+    if skipped:
+        out.write(TRUNCATED_NOTE.format(rows=skipped) + "\n")
+    return out.getvalue()
+
+
+def describe(text):
+    """One-line summary for logs: rows and characters."""
+    return f"{max(0, text.count(chr(10)) - 1)} rows, {len(text)} chars"
+
@@ -0,0 +1,31 @@
+"""Per-request stage timing, reported to clients as a ``Server-Timing`` header.
+
+Each stage is also a span of the current trace (see :mod:`dashboard.tracing`),
+and ``on_stage(name, seconds)``, if given, is called as it ends (the page
+handler feeds it to :mod:`dashboard.metrics`).
+"""
+import time
+from contextlib import contextmanager
+
+from dashboard import tracing
+
+
+class StageTimer:
+    def __init__(self, on_stage=None):
+        self.stages = {}
+        self.on_stage = on_stage
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            with tracing.span(name):
+                yield
+        finally:
+            seconds = time.perf_counter() - start
+            self.stages[name] = self.stages.get(name, 0.0) + seconds
+            if self.on_stage is not None:
+                self.on_stage(name, seconds)
+
+    def server_timing(self):
+        return ", ".join(f"{name};dur={seconds * 1000:.1f}" for name, seconds in self.stages.items())
@@ -0,0 +1,217 @@
+"""Lightweight request tracing.
+
+Each request (or background job) is a trace; ``span(name)`` blocks inside
+it record where the time went: the page stages, extraction, the agent call
+and each upstream HTTP request. The trace id doubles as the request id: it
+is taken from an incoming ``traceparent`` or ``X-Request-ID`` header when
+present, returned as ``X-Request-ID`` and sent upstream with every LLM call
+(``X-Request-ID`` and W3C ``traceparent``), so one id ties our logs to the
+provider's.
+
+Finished traces are appended to ``TRACE_FILE`` as OTLP/JSON, one export
+request per line: readable with ``jq`` and ingestible by an OpenTelemetry
+collector's ``otlpjsonfile`` receiver. With ``TRACE_FILE`` unset ids are
+still propagated but nothing is recorded. ``TRACE_SAMPLE_RATE`` keeps a
+fraction of traces.
+
+Spans follow the current context (``contextvars``); work handed to other
+threads or processes is only covered where it is traced explicitly.
+"""
+import contextvars
+import json
+import os
+import random
+import re
+import threading
+import time
+from contextlib import contextmanager
+
+TRACE_FILE = os.getenv("TRACE_FILE", "")
+SAMPLE_RATE = float(os.getenv("TRACE_SAMPLE_RATE", "1"))
+SERVICE_NAME = os.getenv("TRACE_SERVICE_NAME", "crewai-dashboard")
+
+# OTLP span kinds.
+INTERNAL, SERVER, CLIENT = 1, 2, 3
+
+_TRACEPARENT = re.compile(r"^[0-9a-f]{2}-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$")
+_REQUEST_ID = re.compile(r"^[A-Za-z0-9._:-]{1,128}$")
+_current = contextvars.ContextVar("dashboard_span", default=None)
+_write_lock = threading.Lock()
+
+
+class Trace:
+    __slots__ = ("trace_id", "request_id", "sampled", "spans")
+
+    def __init__(self, trace_id, request_id, sampled):
+        self.trace_id = trace_id
+        self.request_id = request_id
+        self.sampled = sampled
+        self.spans = []
+
+
+class Span:
+    __slots__ = ("trace", "span_id", "parent_id", "name", "kind", "start", "end", "attributes", "error")
+
+    def __init__(self, trace, name, parent_id=None, kind=INTERNAL, attributes=None):
+        self.trace = trace
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        self.name = name
+        self.kind = kind
+        self.start = time.time_ns()
+        self.end = None
+        self.attributes = {k: v for k, v in (attributes or {}).items() if v is not None}
+        self.error = None
+
+    def set(self, key, value):
+        if value is not None:
+            self.attributes[key] = value
+
+    def finish(self, error=None):
+        self.end = time.time_ns()
+        if error is not None:
+            self.error = f"{type(error).__name__}: {error}"
+        if self.trace.sampled:
+            self.trace.spans.append(self)
+
+
+# === Starting and ending spans ===
+def begin(name, request_id=None, traceparent=None, kind=SERVER, **attributes):
+    """Start a trace with a root span; returns a handle for :func:`end`."""
+    parent_id = None
+    match = _TRACEPARENT.match((traceparent or "").strip().lower())
+    if match:
+        trace_id, parent_id = match[1], match[2]
+    else:
+        trace_id = os.urandom(16).hex()
+    sampled = bool(TRACE_FILE) and random.random() < SAMPLE_RATE
+    if not request_id or not _REQUEST_ID.match(request_id):
+        request_id = trace_id  # ignore ids we would not want to echo into headers and logs
+    trace = Trace(trace_id, request_id, sampled)
+    root = Span(trace, name, parent_id, kind, dict(attributes, **{"request.id": trace.request_id}))
+    return root, _current.set(root)
+
+
+def end(handle, error=None):
+    """Finish the trace started by :func:`begin` and export it."""
+    root, token = handle
+    try:
+        _current.reset(token)
+    except ValueError:
+        pass  # ended from another context (e.g. after a streamed response), which never saw the span
+    root.finish(error)
+    if root.trace.sampled:
+        _export(root.trace)
+
+
+@contextmanager
+def trace(name, **attributes):
+    """A whole trace as a ``with`` block (background jobs, scripts)."""
+    handle = begin(name, kind=INTERNAL, **attributes)
+    try:
+        yield handle[0]
+    except BaseException as err:
+        end(handle, err)
+        raise
+    end(handle)
+
+
+@contextmanager
+def span(name, kind=INTERNAL, **attributes):
+    """Record a child span of the current one; a no-op outside a trace."""
+    parent = _current.get()
+    if parent is None:
+        yield None
+        return
+    child = Span(parent.trace, name, parent.span_id, kind, attributes)
+    token = _current.set(child)
+    try:
+        yield child
+    except BaseException as err:
+        child.finish(err)
+        raise
+    else:
+        child.finish()
+    finally:
+        _current.reset(token)
+
+
+def start_span(name, kind=INTERNAL, **attributes):
+    """A child span that is not made current; call ``finish()`` on it yourself.
+
+    For generators, which may be resumed in another context than the one
+    that created them.
+    """
+    parent = _current.get()
+    if parent is None:
+        return None
+    return Span(parent.trace, name, parent.span_id, kind, attributes)
+
+
+def set_attribute(key, value):
+    current = _current.get()
+    if current is not None:
+        current.set(key, value)
+
+
+def request_id():
+    current = _current.get()
+    return None if current is None else current.trace.request_id
+
+
+def headers(current=None):
+    """Propagation headers for an outgoing call made in ``current`` (default: the current span)."""
+    current = current or _current.get()
+    if current is None:
+        return {}
+    flags = "01" if current.trace.sampled else "00"
+    return {"X-Request-ID": current.trace.request_id,
+            "traceparent": f"00-{current.trace.trace_id}-{current.span_id}-{flags}"}
+
+
+# === Export ===
+def _value(value):
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def _otlp(trace):
+    spans = []
+    for s in trace.spans:
+        item = {
+            "traceId": trace.trace_id,
+            "spanId": s.span_id,
+            "name": s.name,
+            "kind": s.kind,
+            "startTimeUnixNano": str(s.start),
+            "endTimeUnixNano": str(s.end),
+            "attributes": [{"key": k, "value": _value(v)} for k, v in s.attributes.items()],
+            "status": {"code": 2, "message": s.error} if s.error else {"code": 1},
+        }
+        if s.parent_id:
+            item["parentSpanId"] = s.parent_id
+        spans.append(item)
+    return {"resourceSpans": [{
+        "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": SERVICE_NAME}},
+                                    {"key": "process.pid", "value": {"intValue": str(os.getpid())}}]},
+        "scopeSpans": [{"scope": {"name": "dashboard.tracing"}, "spans": spans}],
+    }]}
+
+
+def _export(trace):
+    line = (json.dumps(_otlp(trace), separators=(",", ":")) + "\n").encode("utf-8")
+    try:
+        with _write_lock:
+            # One O_APPEND write per trace keeps lines from different workers whole.
+            fd = os.open(TRACE_FILE, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            try:
+                os.write(fd, line)
+            finally:
+                os.close(fd)
+    except OSError as err:
+        print(f"⚠️ Trace export failed: {err}")
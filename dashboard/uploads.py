@@ -0,0 +1,92 @@
+"""Size-bounded, streaming handling of file uploads.
+
+Out of the box Werkzeug accepts a body of any size and buffers each file
+part in memory or a temp file. :class:`UploadRequest` (set as the Flask
+app's ``request_class``) replaces that:
+
+* a body whose ``Content-Length`` exceeds ``UPLOAD_MAX_BYTES`` is refused
+  with 413 before any of it is read (the app sets ``MAX_CONTENT_LENGTH``),
+* every file part gets a per-type limit from ``UPLOAD_LIMITS_MB``, checked
+  as the part streams in, so an oversized file fails at the limit instead
+  of after it has been written out,
+* parts are held in memory up to ``UPLOAD_SPOOL_BYTES`` and spooled to an
+  anonymous temp file (in ``UPLOAD_TMP_DIR``) above that,
+* the SHA-256 is computed while the part is received, so the extraction
+  cache does not read the file a second time.
+
+Extractors read the spooled upload directly. The temp files have no name
+on disk: they are gone once Flask closes the request's files at the end of
+the request, or when the worker dies.
+"""
+import hashlib
+import os
+import tempfile
+
+from flask import Request
+from werkzeug.exceptions import RequestEntityTooLarge
+
+from dashboard import tabular
+
+MB = 1024 * 1024
+
+SPOOL_BYTES = int(os.getenv("UPLOAD_SPOOL_BYTES", str(1 * MB)))
+TMP_DIR = os.getenv("UPLOAD_TMP_DIR") or None
+
+EXTENSION_KINDS = {
+    ".wav": "audio", ".aif": "audio", ".aiff": "audio", ".flac": "audio",
+    ".png": "image", ".jpg": "image", ".jpeg": "image", ".tif": "image", ".tiff": "image",
+    ".bmp": "image", ".gif": "image", ".webp": "image",
+    ".pdf": "pdf",
+}
+
+
+def parse_limits(spec):
+    """``"audio=50,pdf=50"`` -> ``{"audio": 52428800, "pdf": 52428800}`` (values in MB)."""
+    limits = {}
+    for item in spec.split(","):
+        kind, _, size = item.partition("=")
+        if kind.strip() and size.strip():
+            limits[kind.strip()] = int(float(size) * MB)
+    return limits
+
+
+# Pasted text shares the "text" limit (it is the form's non-file field budget).
+LIMITS = parse_limits(os.getenv("UPLOAD_LIMITS_MB", "audio=50,image=20,pdf=50,table=100,text=10"))
+MAX_BYTES = int(os.getenv("UPLOAD_MAX_BYTES", str(max(LIMITS.values()) + MB)))
+FORM_MEMORY_BYTES = LIMITS.get("text", 10 * MB)
+
+
+def kind_for(filename):
+    """The limit class of an upload, from its extension (unknown types count as text)."""
+    if tabular.is_table(filename or ""):
+        return "table"
+    return EXTENSION_KINDS.get(os.path.splitext(filename or "")[1].lower(), "text")
+
+
+class SpooledUpload(tempfile.SpooledTemporaryFile):
+    """A spooled temp file that enforces a size limit and hashes what is written to it."""
+
+    def __init__(self, filename=None, kind=None, limit=None):
+        super().__init__(max_size=SPOOL_BYTES, dir=TMP_DIR, prefix="upload-")
+        self.filename = filename or ""
+        self.kind = kind or kind_for(self.filename)
+        self.limit = LIMITS.get(self.kind, MAX_BYTES) if limit is None else limit
+        self.size = 0
+        self._sha = hashlib.sha256()
+
+    def write(self, data):
+        self.size += len(data)
+        if self.size > self.limit:
+            raise RequestEntityTooLarge(
+                f"{self.filename or 'Upload'} is larger than the {self.limit // MB} MB allowed for {self.kind} files")
+        self._sha.update(data)
+        return super().write(data)
+
+    def sha256(self):
+        """Hex digest of everything written so far."""
+        return self._sha.hexdigest()
+
+
+class UploadRequest(Request):
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        return SpooledUpload(filename)
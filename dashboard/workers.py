@@ -0,0 +1,25 @@
+"""Per-process worker pools for CPU-bound extraction (PDF, OCR)."""
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+_pools = {}
+_lock = threading.Lock()
+
+
+def process_pool(name, max_workers, initializer=None):
+    """Return the named pool for this process, creating it on first use.
+
+    Pools are started with forkserver where available: forking a threaded
+    web worker directly is not safe. A pool inherited across a fork is
+    discarded and rebuilt.
+    """
+    with _lock:
+        pool, pid = _pools.get(name, (None, None))
+        if pool is None or pid != os.getpid():
+            methods = multiprocessing.get_all_start_methods()
+            context = multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+            pool = ProcessPoolExecutor(max_workers=max_workers, mp_context=context, initializer=initializer)
+            _pools[name] = (pool, os.getpid())
+        return pool
@@ -5,17 +5,18 @@ import pdfplumber
 import speech_recognition as sr
 from dotenv import load_dotenv
 from flask import Flask, request, render_template
-import requests
-from werkzeug.utils import secure_filename
 from PIL import Image
 
+from dashboard import agent_registry, providers, uploads
+
 load_dotenv()
 
 pytesseract.pytesseract.tesseract_cmd = os.getenv("TESSERACT_PATH")
 
 app = Flask(__name__)
-app.config["UPLOAD_FOLDER"] = "uploads"
-os.makedirs(app.config["UPLOAD_FOLDER"], exist_ok=True)
+app.request_class = uploads.UploadRequest
+app.config["MAX_CONTENT_LENGTH"] = uploads.MAX_BYTES
+app.config["MAX_FORM_MEMORY_SIZE"] = uploads.FORM_MEMORY_BYTES
 
 
 def extract_text_from_pdf(file_stream):
@@ -36,57 +37,23 @@ def transcribe_audio(audio_file):
 
 
 def run_agent(prompt, agent_type):
-    api_key = os.getenv("OPENROUTER_API_KEY")
-    if not api_key:
-        return "❌ ERROR: OPENROUTER_API_KEY not found in .env"
-
-    model_map = {key: "openai/gpt-4" for key in [
-        "fintech", "support", "payment", "credit", "faq", "sales", "hiring",
-        "regulatory", "portfolio", "onboarding", "monitor", "reporter", "leadgen", "fraud", "closer"
-    ]}
-
-    role_map = {
-        "fintech": "You are a senior Fintech Data Analyst...",
-        "support": "You are a support ticket summarizer...",
-        "payment": "You are a payments manager...",
-        "credit": "You are a credit advisor...",
-        "faq": "You are a friendly Customer Support FAQ Bot...",
-        "sales": "You are a sales conversion agent...",
-        "hiring": "You are a hiring screening agent...",
-        "regulatory": "You are a regulatory compliance officer...",
-        "portfolio": "You are an investment portfolio recommender...",
-        "onboarding": "You are a customer onboarding specialist...",
-        "monitor": "You are a transaction monitoring agent...",
-        "reporter": "You are a business intelligence reporter...",
-        "leadgen": "You are a lead generation bot...",
-        "fraud": "You are a fraud detection bot...",
-        "closer": "You are an account closure assistant..."
-    }
-
+    agent = agent_registry.get(agent_type)
+    openrouter = providers.PROVIDERS["openrouter"]
     payload = {
-        "model": model_map.get(agent_type),
+        "agent": agent.name,
+        "models": {"openrouter": agent.model_for(openrouter)},
         "messages": [
-            {"role": "system", "content": role_map.get(agent_type)},
+            {"role": "system", "content": agent.system},
             {"role": "user", "content": prompt}
         ],
-        "temperature": 0.5,
+        "temperature": agent.temperature,
         "max_tokens": 300
     }
 
-    headers = {
-        "Authorization": f"Bearer {api_key}",
-        "Content-Type": "application/json"
-    }
-
     try:
-        response = requests.post(
-            "https://openrouter.ai/api/v1/chat/completions", headers=headers, json=payload)
-        response.raise_for_status()
-        return response.json()["choices"][0]["message"]["content"]
-    except requests.exceptions.HTTPError as http_err:
-        return f"❌ HTTP error: {http_err}\n🔁 Response: {response.text}"
-    except Exception as err:
-        return f"❌ Unexpected error: {err}"
+        return providers.call(openrouter, payload)
+    except providers.UpstreamError as err:
+        return f"❌ {err}"
 
 
 @app.route("/", methods=["GET", "POST"])
@@ -98,10 +65,7 @@ def index():
 
         if "audio_file" in request.files and request.files["audio_file"].filename:
             audio_file = request.files["audio_file"]
-            path = os.path.join(
-                app.config["UPLOAD_FOLDER"], secure_filename(audio_file.filename))
-            audio_file.save(path)
-            user_input = transcribe_audio(path)
+            user_input = transcribe_audio(audio_file.stream)
         elif "image_file" in request.files and request.files["image_file"].filename:
             image_file = request.files["image_file"]
             user_input = extract_text_from_image(image_file)
@@ -116,7 +80,7 @@ def index():
         prompt = user_input
         result = run_agent(prompt, agent)
 
-    return render_template("index.html", result=result)
+    return render_template("index.html", result=result, agents=agent_registry.choices())
 
 
 if __name__ == "__main__":
@@ -0,0 +1,8 @@
+"""gunicorn settings, read automatically when gunicorn starts from the repo root."""
+
+
+def on_starting(server):
+    # Metrics are summed from every worker's files; drop the previous run's before any worker starts.
+    from dashboard import metrics
+
+    metrics.reset()
@@ -0,0 +1,109 @@
+"""Checkpoint store for crew task outputs.
+
+Each task's output is saved under a hash of everything that determines it:
+the rendered description and expected output, the agent's role, goal,
+backstory and model, and the upstream outputs handed to it as context. A
+rerun whose key matches loads the saved output instead of calling the LLM,
+so changing only the reporting prompt reuses the research step.
+
+Checkpoints live in CREW_CHECKPOINT_DIR (default .crew_checkpoints/); set
+CREW_CHECKPOINTS=0 to always run every task.
+"""
+import hashlib
+import json
+import os
+import tempfile
+from typing import List, Optional
+
+from crewai import Task
+from crewai.tasks.task_output import TaskOutput
+
+CHECKPOINT_DIR = os.getenv("CREW_CHECKPOINT_DIR", ".crew_checkpoints")
+ENABLED = os.getenv("CREW_CHECKPOINTS", "1") != "0"
+LAST_RUN_FILE = "last_run.json"
+
+
+def _path(name):
+    return os.path.join(CHECKPOINT_DIR, name)
+
+
+def _write(name, text):
+    os.makedirs(CHECKPOINT_DIR, exist_ok=True)
+    # A temp file per write: concurrent crews (run_many) may write the same name at once.
+    fd, tmp = tempfile.mkstemp(dir=CHECKPOINT_DIR, prefix=name + ".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(text)
+        os.replace(tmp, _path(name))  # readers never see a half-written checkpoint
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+def task_key(task, agent, context) -> str:
+    llm = getattr(agent, "llm", None)
+    parts = [
+        task.description,
+        task.expected_output,
+        getattr(agent, "role", None),
+        getattr(agent, "goal", None),
+        getattr(agent, "backstory", None),
+        getattr(llm, "model", None) or str(llm),
+        context or "",
+    ]
+    return hashlib.sha256(json.dumps(parts, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+def load(key) -> Optional[TaskOutput]:
+    try:
+        with open(_path(f"{key}.json"), encoding="utf-8") as f:
+            return TaskOutput.model_validate_json(f.read())
+    except (OSError, ValueError):
+        return None
+
+
+def save(key, output: TaskOutput):
+    _write(f"{key}.json", output.model_dump_json())
+
+
+def save_last_run(runs: List[dict]):
+    """Record the inputs of the last invocation: one run, or every topic of a ``run_many`` batch."""
+    _write(LAST_RUN_FILE, json.dumps({"runs": runs}, ensure_ascii=False))
+
+
+def load_last_run() -> Optional[List[dict]]:
+    try:
+        with open(_path(LAST_RUN_FILE), encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(data, dict):
+        return None
+    if "runs" not in data:
+        return [data]  # written before batches were recorded
+    return data["runs"] or None
+
+
+class CheckpointedTask(Task):
+    """A Task that reuses its saved output when nothing upstream has changed."""
+
+    def _execute_core(self, agent, context, tools):
+        if not ENABLED:
+            return super()._execute_core(agent, context, tools)
+
+        key = task_key(self, agent or self.agent, context)
+        cached = load(key)
+        if cached is not None:
+            print(f"♻️ Reusing checkpoint for '{self.name or self.description[:40]}'")
+            self.output = cached
+            if self.output_file:
+                directory = os.path.dirname(self.output_file)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                with open(self.output_file, "w", encoding="utf-8") as f:
+                    f.write(cached.raw)
+            return cached
+
+        output = super()._execute_core(agent, context, tools)
+        save(key, output)
+        return output
@@ -1,7 +1,9 @@
 from crewai import Agent, Crew, Process, Task
-from crewai.project import CrewBase, agent, crew, task
+from crewai.project import CrewBase, agent, before_kickoff, crew, task
 from crewai.agents.agent_builder.base_agent import BaseAgent
 from typing import List
+
+from crewai_project import checkpoints
 # If you want to run a snippet of code before or after the crew starts,
 # you can use the @before_kickoff and @after_kickoff decorators
 # https://docs.crewai.com/concepts/crews#example-crew-class-with-decorators
@@ -17,6 +19,16 @@ class CrewaiProject():
     # Agents: https://docs.crewai.com/concepts/agents#yaml-configuration-recommended
     # Tasks: https://docs.crewai.com/concepts/tasks#yaml-configuration-recommended
     
+    # run_many records its whole batch up front and turns this off for each crew.
+    remember_run = True
+
+    @before_kickoff
+    def remember_inputs(self, inputs):
+        # Lets `replay` with no task id resume the last run from its checkpoints.
+        if self.remember_run:
+            checkpoints.save_last_run([inputs or {}])
+        return inputs
+
     # If you would like to add tools to your agents, you can learn more about it here:
     # https://docs.crewai.com/concepts/agents#agent-tools
     @agent
@@ -38,15 +50,16 @@ class CrewaiProject():
     # https://docs.crewai.com/concepts/tasks#overview-of-a-task
     @task
     def research_task(self) -> Task:
-        return Task(
+        return checkpoints.CheckpointedTask(
             config=self.tasks_config['research_task'], # type: ignore[index]
         )
 
     @task
     def reporting_task(self) -> Task:
-        return Task(
+        return checkpoints.CheckpointedTask(
             config=self.tasks_config['reporting_task'], # type: ignore[index]
-            output_file='report.md'
+            # Interpolated from the kickoff inputs, so batch runs don't overwrite each other.
+            output_file='{report_file}'
         )
 
     @crew
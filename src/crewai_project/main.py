@@ -1,9 +1,13 @@
 #!/usr/bin/env python
+import os
+import re
 import sys
 import warnings
 
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
 
+from crewai_project import checkpoints
 from crewai_project.crew import CrewaiProject
 
 warnings.filterwarnings("ignore", category=SyntaxWarning, module="pysbd")
@@ -19,7 +23,8 @@ def run():
     """
     inputs = {
         'topic': 'AI LLMs',
-        'current_year': str(datetime.now().year)
+        'current_year': str(datetime.now().year),
+        'report_file': 'report.md'
     }
     
     try:
@@ -28,13 +33,73 @@ def run():
         raise Exception(f"An error occurred while running the crew: {e}")
 
 
+def _report_file(topic, reports_dir):
+    slug = re.sub(r'[^a-z0-9]+', '-', topic.lower()).strip('-') or 'topic'
+    return os.path.join(reports_dir, f"{slug}.md")
+
+
+def _kickoff_all(runs):
+    """Run one crew per inputs dict, at most CREW_CONCURRENCY (default 4) at once."""
+    concurrency = int(os.getenv('CREW_CONCURRENCY', '4'))
+    # The whole batch is the last run, so `replay` resumes every topic, not whichever started last.
+    checkpoints.save_last_run(runs)
+
+    def kickoff(inputs):
+        # A crew holds per-run state, so every topic gets its own instance.
+        project = CrewaiProject()
+        project.remember_run = False
+        project.crew().kickoff(inputs=inputs)
+        return inputs['report_file']
+
+    failures = {}
+    with ThreadPoolExecutor(max_workers=max(1, min(concurrency, len(runs)))) as pool:
+        futures = {pool.submit(kickoff, inputs): inputs['topic'] for inputs in runs}
+        for future in as_completed(futures):
+            topic = futures[future]
+            try:
+                print(f"✅ {topic} -> {future.result()}")
+            except Exception as e:
+                failures[topic] = e
+                print(f"❌ {topic}: {e}")
+
+    if failures:
+        raise Exception(f"{len(failures)} of {len(runs)} topics failed: {', '.join(failures)}")
+
+
+def run_many():
+    """
+    Run the crew for many topics concurrently, one report file per topic.
+
+    Usage: run_many "topic one" "topic two" ...  (or run_many --file topics.txt)
+    At most CREW_CONCURRENCY crews (default 4) run at once; reports are written
+    to CREW_REPORTS_DIR (default reports/).
+    """
+    args = sys.argv[1:]
+    if args[:1] == ['--file']:
+        with open(args[1], encoding='utf-8') as f:
+            topics = [line.strip() for line in f if line.strip()]
+    else:
+        topics = args
+    if not topics:
+        raise Exception("run_many needs at least one topic")
+
+    reports_dir = os.getenv('CREW_REPORTS_DIR', 'reports')
+    os.makedirs(reports_dir, exist_ok=True)
+    current_year = str(datetime.now().year)
+    _kickoff_all([
+        {'topic': topic, 'current_year': current_year, 'report_file': _report_file(topic, reports_dir)}
+        for topic in topics
+    ])
+
+
 def train():
     """
     Train the crew for a given number of iterations.
     """
     inputs = {
         "topic": "AI LLMs",
-        'current_year': str(datetime.now().year)
+        'current_year': str(datetime.now().year),
+        'report_file': 'report.md'
     }
     try:
         CrewaiProject().crew().train(n_iterations=int(sys.argv[1]), filename=sys.argv[2], inputs=inputs)
@@ -45,8 +110,21 @@ def train():
 def replay():
     """
     Replay the crew execution from a specific task.
+
+    Without a task id, resume the last run (every topic of it, after
+    run_many): tasks whose inputs are unchanged are loaded from their
+    checkpoints and only the rest are executed.
     """
     try:
+        if len(sys.argv) < 2:
+            runs = checkpoints.load_last_run()
+            if runs is None:
+                raise Exception("no previous run to resume; pass a task id")
+            if len(runs) == 1:
+                CrewaiProject().crew().kickoff(inputs=runs[0])
+            else:
+                _kickoff_all(runs)
+            return
         CrewaiProject().crew().replay(task_id=sys.argv[1])
 
     except Exception as e:
@@ -58,7 +136,8 @@ def test():
     """
     inputs = {
         "topic": "AI LLMs",
-        "current_year": str(datetime.now().year)
+        "current_year": str(datetime.now().year),
+        "report_file": "report.md"
     }
     
     try:
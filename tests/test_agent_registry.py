@@ -0,0 +1,73 @@
+import pytest
+
+from dashboard import agent_registry
+from dashboard.agent_registry import RegistryError
+from dashboard.providers import PROVIDERS
+
+
+@pytest.fixture
+def registry(tmp_path):
+    def load(text):
+        path = tmp_path / "agents.yaml"
+        path.write_text(text, encoding="utf-8")
+        return agent_registry.load(str(path))
+    return load
+
+
+def test_agents_load_in_file_order_with_defaults_applied(registry):
+    agents = registry("""
+defaults:
+  temperature: 0.2
+  max_tokens: 300
+agents:
+  zeta:
+    system: "  Be brief.  "
+    template: "Summarize: {input}"
+  alpha:
+    label: Alpha
+    system: Be thorough.
+    template: "{input}"
+    max_tokens: 900
+    cache: false
+    knowledge: 3
+    model: {openrouter: openai/gpt-4o-mini}
+""")
+    assert list(agents) == ["zeta", "alpha"]
+    zeta, alpha = agents["zeta"], agents["alpha"]
+    assert (zeta.label, zeta.system, zeta.temperature, zeta.max_tokens, zeta.cache) == (
+        "zeta", "Be brief.", 0.2, 300, True)
+    assert (alpha.max_tokens, alpha.cache, alpha.knowledge) == (900, False, 3)
+    assert alpha.model_for(PROVIDERS["openrouter"]) == "openai/gpt-4o-mini"
+    assert alpha.model_for(PROVIDERS["grok"]) == PROVIDERS["grok"].model
+
+
+def test_templates_are_compiled_once(registry):
+    agent = registry('agents: {a: {system: s, template: "Q: {input} {{literal}} / {input}"}}')["a"]
+    assert agent.template.count(None) == 2 and all(piece is None or "input" not in piece for piece in agent.template)
+    assert agent.render("x") == "Q: x {literal} / x"
+
+
+@pytest.mark.parametrize("text, message", [
+    ("agents: {}", "no agents defined"),
+    ("agents: {a: just a string}", "'a' must be a mapping"),
+    ("agents: {a: {system: s, template: t, colour: red}}", r"unknown keys \['colour'\]"),
+    ("agents: {a: {template: t}}", "'system' is required"),
+    ("agents: {a: {system: s, template: '  '}}", "'template' is required"),
+    ("agents: {a: {system: s, template: t, model: gpt-4}}", "'model' maps provider names"),
+    ("agents: {a: {system: s, template: 'Use {text}'}}", r"may only use \{input\}, found \{text\}"),
+    ("agents: {a: {system: s, template: '{input!r}'}}", r"may only use \{input\}"),
+    ("agents: {a: {system: s, template: 'open {'}}", "bad template"),
+    ("agents: {a: {system: s, template: t, max_tokens: lots}}", "Agent 'a': invalid literal"),
+])
+def test_invalid_registries_are_rejected(registry, text, message):
+    with pytest.raises(RegistryError, match=message):
+        registry(text)
+
+
+def test_the_shipped_registry_loads():
+    assert agent_registry.load() == agent_registry.AGENTS
+
+
+def test_unknown_agents_send_the_input_as_is():
+    agent = agent_registry.get("no-such-agent")
+    assert agent is agent_registry.FALLBACK and agent.render("hello") == "hello"
@@ -0,0 +1,81 @@
+import json
+import threading
+import time
+
+from dashboard import batch
+
+
+def lines(*records):
+    return [json.dumps(record) if isinstance(record, dict) else record for record in records]
+
+
+def test_results_keep_ids_and_report_failures():
+    def runner(agent, user_input, model):
+        if user_input == "boom":
+            raise RuntimeError("upstream exploded")
+        if user_input == "bad":
+            return "❌ provider said no"
+        return f"{agent}:{user_input}:{model}"
+
+    source = lines(
+        {"id": "a", "agent": "support", "input": "hi", "model": "grok"},
+        "",
+        "{not json",
+        {"input": "no agent"},
+        {"agent": "support", "input": "boom"},
+        {"id": "c", "agent": "fraud", "input": "bad"},
+    )
+    results = list(batch.run_batch(source, runner, concurrency=2))
+    by_id = {result["id"]: result for result in results}
+
+    assert by_id["a"] == {"id": "a", "agent": "support", "ok": True, "result": "support:hi:grok"}
+    assert by_id[5] == {"id": 5, "agent": "support", "ok": False, "error": "RuntimeError: upstream exploded"}
+    assert by_id["c"]["ok"] is False and by_id["c"]["result"] == "❌ provider said no"
+    errors = [result for result in results if result["id"] is None]
+    assert [(e["line"], e["error"].split(":")[0]) for e in errors] == [(3, "Invalid JSON"), (4, "Record needs an 'agent'")]
+    assert len(results) == 5
+
+
+def test_slow_records_do_not_hold_back_later_ones():
+    def runner(agent, user_input, model):
+        time.sleep(0.3 if user_input == "slow" else 0)
+        return user_input
+
+    source = lines({"id": 1, "agent": "x", "input": "slow"}, *({"id": i, "agent": "x", "input": "fast"}
+                                                                for i in range(2, 6)))
+    order = [result["id"] for result in batch.run_batch(source, runner, concurrency=2)]
+    assert order[-1] == 1 and sorted(order) == [1, 2, 3, 4, 5]
+
+
+def test_concurrency_is_bounded_and_input_read_lazily():
+    running, peak, lock = 0, 0, threading.Lock()
+    read = []
+
+    def runner(agent, user_input, model):
+        nonlocal running, peak
+        with lock:
+            running += 1
+            peak = max(peak, running)
+        time.sleep(0.02)
+        with lock:
+            running -= 1
+        return "ok"
+
+    def source():
+        for i in range(20):
+            read.append(i)
+            yield json.dumps({"id": i, "agent": "x", "input": "go"})
+
+    results = batch.run_batch(source(), runner, concurrency=3)
+    next(results)
+    assert len(read) <= 4  # three in flight plus the one waiting for a slot
+    assert len(list(results)) == 19
+    assert peak <= 3
+
+
+def test_clamp_concurrency(monkeypatch):
+    monkeypatch.setattr(batch, "MAX_CONCURRENCY", 32)
+    assert batch.clamp_concurrency("4") == 4
+    assert batch.clamp_concurrency(0) == 1
+    assert batch.clamp_concurrency(1000) == 32
+    assert batch.clamp_concurrency("many") == batch.DEFAULT_CONCURRENCY
@@ -0,0 +1,170 @@
+import asyncio
+import sqlite3
+import threading
+import time
+
+import pytest
+
+from dashboard import governor as governor_module
+from dashboard.governor import FAILED, OK, RATE_LIMITED, Governor, Throttled
+
+
+@pytest.fixture
+def make_governor(tmp_path):
+    def make(limits="", max_inflight=0):
+        return Governor(path=str(tmp_path / "governor.sqlite3"), limits=limits, max_inflight=max_inflight)
+    return make
+
+
+def test_parse_limits():
+    assert governor_module.parse_limits("grok=60/200000, grok:grok-3-mini=300/0") == {
+        ("grok", None): (60.0, 200000.0), ("grok", "grok-3-mini"): (300.0, 0.0)}
+
+
+def test_request_bucket_empties_then_refills(make_governor, monkeypatch):
+    gov = make_governor("p=2/0")
+    assert gov.acquire("p", "m", 10, max_wait=0) and gov.acquire("p", "m", 10, max_wait=0)
+    with pytest.raises(Throttled) as err:
+        gov.acquire("p", "m", 10, max_wait=0)
+    assert err.value.wait == pytest.approx(30, abs=1)  # one request back at 2/min
+
+    now = governor_module.time.time()
+    monkeypatch.setattr(governor_module.time, "time", lambda: now + 31)
+    assert gov.acquire("p", "m", 10, max_wait=0)
+
+
+def test_token_bucket_refunds_unused_tokens(make_governor):
+    gov = make_governor("p=0/1000")
+    lease = gov.acquire("p", "m", 800, max_wait=0)
+    with pytest.raises(Throttled):
+        gov.acquire("p", "m", 800, max_wait=0)
+    gov.release(lease, "p", OK, used_tokens=100)  # estimated 800, billed 100
+    assert gov.acquire("p", "m", 800, max_wait=0)
+
+
+def test_model_limits_override_provider_limits(make_governor):
+    gov = make_governor("p=1/0,p:fast=0/0")
+    for _ in range(5):
+        gov.acquire("p", "fast", 10, max_wait=0)
+    gov.acquire("p", "slow", 10, max_wait=0)
+    with pytest.raises(Throttled):
+        gov.acquire("p", "slow", 10, max_wait=0)
+
+
+def test_inflight_cap_counts_unreleased_leases(make_governor):
+    gov = make_governor(max_inflight=1)
+    lease = gov.acquire("p", "m", 10, max_wait=0)
+    with pytest.raises(Throttled):
+        gov.acquire("p", "m", 10, max_wait=0)
+    assert gov.stats()["p"]["inflight"] == 1
+    gov.release(lease, "p", OK)
+    assert gov.acquire("p", "m", 10, max_wait=0)
+
+
+def test_retry_after_pauses_the_provider(make_governor):
+    gov = make_governor()
+    gov.release(gov.acquire("p", "m", 10), "p", RATE_LIMITED, retry_after=20)
+    assert gov.stats()["p"]["paused_for"] == pytest.approx(20, abs=1)
+    with pytest.raises(Throttled) as err:
+        gov.acquire("p", "m", 10, max_wait=5)
+    assert err.value.wait > 5
+    assert gov.acquire("q", "m", 10, max_wait=0)  # other providers are not paused
+
+
+def test_breaker_opens_then_lets_one_probe_through(make_governor, monkeypatch):
+    monkeypatch.setattr(governor_module, "BREAKER_FAILURES", 3)
+    monkeypatch.setattr(governor_module, "BREAKER_COOLDOWN", 30)
+    gov = make_governor()
+    for _ in range(3):
+        gov.release(gov.acquire("p", "m", 10), "p", FAILED)
+    assert gov.stats()["p"]["circuit"] == "open"
+    with pytest.raises(Throttled, match="circuit open"):
+        gov.acquire("p", "m", 10, max_wait=60)
+
+    now = governor_module.time.time()
+    monkeypatch.setattr(governor_module.time, "time", lambda: now + 31)
+    probe = gov.acquire("p", "m", 10, max_wait=0)
+    with pytest.raises(Throttled, match="circuit open"):
+        gov.acquire("p", "m", 10, max_wait=0)  # only the probe goes out
+    gov.release(probe, "p", OK)
+    assert gov.stats()["p"]["circuit"] == "closed"
+    assert gov.acquire("p", "m", 10, max_wait=0)
+
+
+def test_async_acquire_and_release(make_governor):
+    gov = make_governor(max_inflight=1)
+
+    async def run():
+        lease = await gov.aacquire("p", "m", 10, max_wait=0)
+        with pytest.raises(Throttled):
+            await gov.aacquire("p", "m", 10, max_wait=0)
+        await gov.arelease(lease, "p", OK)
+        return await gov.aacquire("p", "m", 10, max_wait=0)
+
+    assert asyncio.run(run())
+
+
+def test_provider_wide_limits_are_shared_by_its_models(make_governor):
+    gov = make_governor("p=2/0")
+    gov.acquire("p", "small", 10, max_wait=0)
+    gov.acquire("p", "large", 10, max_wait=0)
+    with pytest.raises(Throttled):
+        gov.acquire("p", "other", 10, max_wait=0)
+
+
+@pytest.fixture
+def breaker(monkeypatch):
+    monkeypatch.setattr(governor_module, "BREAKER_FAILURES", 1)
+    monkeypatch.setattr(governor_module, "BREAKER_COOLDOWN", 30)
+    now = governor_module.time.time()
+    return lambda seconds: monkeypatch.setattr(governor_module.time, "time", lambda: now + seconds)
+
+
+def test_half_open_probe_is_kept_for_after_a_pause(make_governor, breaker):
+    gov = make_governor()
+    first, second = gov.acquire("p", "m", 10), gov.acquire("p", "m", 10)
+    gov.release(first, "p", FAILED)  # circuit opens for 30s
+    gov.release(second, "p", RATE_LIMITED, retry_after=40)
+
+    breaker(31)  # half-open, but still paused
+    with pytest.raises(Throttled, match="rate limit"):
+        gov.acquire("p", "m", 10, max_wait=0)
+    breaker(41)
+    assert gov.acquire("p", "m", 10, max_wait=0)  # the probe
+    with pytest.raises(Throttled, match="circuit open"):
+        gov.acquire("p", "m", 10, max_wait=0)
+
+
+def test_half_open_probe_is_kept_while_the_inflight_cap_is_full(make_governor, breaker):
+    gov = make_governor(max_inflight=1)
+    busy = gov.acquire("p", "m", 10)
+    gov.release("gone", "p", FAILED)  # another caller's failure opens the circuit
+
+    breaker(31)
+    with pytest.raises(Throttled, match="rate limit"):
+        gov.acquire("p", "m", 10, max_wait=0)
+    gov.release(busy, "p", outcome=None)  # frees the slot without reporting an outcome
+    assert gov.acquire("p", "m", 10, max_wait=0)
+
+
+def test_full_inflight_cap_is_seen_without_the_write_lock(make_governor):
+    gov = make_governor(max_inflight=1)
+    gov.acquire("p", "m", 10)
+    other = sqlite3.connect(gov._db.path, isolation_level=None)
+    other.execute("BEGIN IMMEDIATE")  # another worker mid-transaction
+    try:
+        started = time.monotonic()
+        assert gov._reserve("p", "m", 10) == (None, None)
+        assert time.monotonic() - started < 1
+    finally:
+        other.execute("ROLLBACK")
+
+
+def test_waiters_get_the_slot_once_it_frees_up(make_governor):
+    gov = make_governor(max_inflight=1)
+    lease = gov.acquire("p", "m", 10)
+    threading.Timer(0.3, gov.release, (lease, "p", OK)).start()
+    started = time.monotonic()
+    assert gov.acquire("p", "m", 10, max_wait=5)
+    assert 0.3 <= time.monotonic() - started < 2
+
@@ -0,0 +1,145 @@
+import asyncio
+import io
+import os
+import threading
+import time
+
+import pytest
+from werkzeug.datastructures import FileStorage
+
+from dashboard import jobs
+from dashboard.local_db import ThreadLocalConnection
+
+
+@pytest.fixture(autouse=True)
+def queue(tmp_path, monkeypatch):
+    monkeypatch.setattr(jobs, "_db", ThreadLocalConnection(str(tmp_path / "jobs.sqlite3"), jobs.SCHEMA, jobs._setup,
+                                                           timeout=10, isolation_level=None))
+    monkeypatch.setattr(jobs, "JOBS_DIR", str(tmp_path / "uploads"))
+    monkeypatch.setattr(jobs, "MAX_ATTEMPTS", 2)
+    monkeypatch.setattr(jobs, "HEARTBEAT", 10)
+    monkeypatch.setattr(jobs, "TIMEOUT", 900)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = time.time()
+    return lambda seconds: monkeypatch.setattr(jobs.time, "time", lambda: now + seconds)
+
+
+def test_jobs_queue_in_order_and_run_once():
+    first, second = jobs.submit("support", "grok", "one"), jobs.submit("fraud", "grok", "two")
+    assert jobs.get(first)["position"] == 0 and jobs.get(second)["position"] == 1
+
+    job = jobs._claim()
+    assert (job["id"], job["status"], job["attempts"]) == (first, jobs.RUNNING, 1)
+    jobs._set_progress(job, {"stage": "map", "done": 1, "total": 2})
+    assert jobs.get(first)["progress"] == {"stage": "map", "done": 1, "total": 2}
+    assert jobs._finish(job, jobs.DONE, result="answer")
+    assert jobs.get(first)["status"] == jobs.DONE and jobs.get(first)["result"] == "answer"
+    assert jobs._claim()["id"] == second and jobs._claim() is None
+    assert jobs.stats() == {jobs.DONE: 1, jobs.RUNNING: 1}
+
+
+def test_uploads_are_saved_for_the_runner():
+    job_id = jobs.submit("support", "grok", upload=FileStorage(io.BytesIO(b"a,b\n1,2\n"), filename="T.CSV"),
+                         kind="table")
+    job = jobs._claim()
+    assert job["id"] == job_id and job["input_kind"] == "table" and job["input_path"].endswith(job_id + ".csv")
+    with open(job["input_path"], "rb") as f:
+        assert f.read() == b"a,b\n1,2\n"
+
+
+def test_jobs_of_a_dead_runner_are_requeued_then_failed(clock):
+    job_id = jobs.submit("support", "grok", "hi")
+    first = jobs._claim()
+    clock(31)  # three missed check-ins
+    jobs._sweep()
+    assert jobs.get(job_id)["status"] == jobs.QUEUED
+
+    second = jobs._claim()
+    assert second["attempts"] == 2
+    assert not jobs._finish(first, jobs.DONE, result="late")  # the first run no longer owns the job
+    clock(62)
+    jobs._sweep()
+    job = jobs.get(job_id)
+    assert (job["status"], job["error"]) == (jobs.FAILED, "Job runner stopped")
+
+
+def test_a_slow_job_with_a_live_runner_is_not_run_twice(clock):
+    job_id = jobs.submit("support", "grok", "hi")
+    job = jobs._claim()
+    for seconds in (20, 40, 60):
+        clock(seconds)
+        jobs._heartbeat()
+        jobs._sweep()
+    assert jobs.get(job_id)["status"] == jobs.RUNNING and jobs._claim() is None
+
+    clock(901)
+    jobs._heartbeat()
+    jobs._sweep()
+    assert jobs.get(job_id)["error"] == "Job timed out"
+    assert not jobs._finish(job, jobs.DONE, result="too late")
+    assert jobs.get(job_id)["status"] == jobs.FAILED
+
+
+def test_worker_runs_jobs_and_keeps_the_upload_of_a_run_it_lost(monkeypatch):
+    job_id = jobs.submit("support", "grok", upload=FileStorage(io.BytesIO(b"text"), filename="a.txt"))
+    stop = threading.Event()
+    seen = []
+
+    def run(job):
+        seen.append(job["id"])
+        stop.set()
+        return "answer"
+
+    monkeypatch.setattr(jobs, "_run", run)
+    jobs._work(stop)
+    assert seen == [job_id] and jobs.get(job_id)["result"] == "answer"
+
+    # A run whose job was requeued meanwhile leaves the upload to the next attempt.
+    other = jobs.submit("support", "grok", upload=FileStorage(io.BytesIO(b"text"), filename="b.txt"))
+    stop.clear()
+
+    def lose(job):
+        jobs._db().execute("UPDATE jobs SET status = ?, runner = NULL WHERE id = ?", (jobs.QUEUED, job["id"]))
+        stop.set()
+        raise RuntimeError("lost the lease")
+
+    monkeypatch.setattr(jobs, "_run", lose)
+    jobs._work(stop)
+    job = jobs._claim()
+    assert job["id"] == other and job["attempts"] == 2
+    with open(job["input_path"], "rb") as f:
+        assert f.read() == b"text"
+
+
+def test_events_follow_the_job_until_it_finishes():
+    job_id = jobs.submit("support", "grok", "hi")
+
+    def work():
+        time.sleep(0.05)
+        job = jobs._claim()
+        time.sleep(0.05)
+        jobs._finish(job, jobs.DONE, result="answer")
+
+    threading.Thread(target=work).start()
+    statuses = [job["status"] for job in jobs.wait_events(job_id, interval=0.01)]
+    assert statuses == [jobs.QUEUED, jobs.RUNNING, jobs.DONE]
+
+
+def test_async_events_report_unknown_jobs():
+    async def collect():
+        return [job async for job in jobs.await_events("missing", interval=0.01)]
+
+    assert asyncio.run(collect()) == [None]
+
+
+def test_expired_jobs_and_their_uploads_are_dropped(clock):
+    job_id = jobs.submit("support", "grok", upload=FileStorage(io.BytesIO(b"x"), filename="a.txt"))
+    job = jobs._claim()
+    jobs._finish(job, jobs.FAILED, error="boom")
+    clock(jobs.RETENTION + 1)
+    jobs._sweep()
+    assert jobs.get(job_id) is None
+    assert not os.path.exists(job["input_path"])
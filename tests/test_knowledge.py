@@ -0,0 +1,66 @@
+import pytest
+
+from dashboard.knowledge import KnowledgeIndex
+
+FAQ_MD = """# Support FAQ
+
+<!-- maintained by support -->
+
+Q: How do I reset my password?
+A: Use "Forgot password" on the sign-in page.
+
+Q: What are the transfer limits?
+A: 5,000 per day for verified accounts.
+
+Refunds are processed within five business days of approval.
+"""
+
+FAQ_YAML = """
+- question: Which currencies do you support?
+  answer: NGN, USD and EUR.
+- question: no answer here
+"""
+
+
+@pytest.fixture
+def index(tmp_path):
+    docs = tmp_path / "knowledge"
+    docs.mkdir()
+    (docs / "faq.md").write_text(FAQ_MD, encoding="utf-8")
+    (docs / "more.yaml").write_text(FAQ_YAML, encoding="utf-8")
+    return KnowledgeIndex(directory=str(docs), index_path=str(tmp_path / "index.sqlite3"))
+
+
+def test_answer_matches_questions_exactly_up_to_case_and_punctuation(index):
+    assert index.answer("how do I reset my password") == 'Use "Forgot password" on the sign-in page.'
+    assert index.answer("WHICH currencies do you support??") == "NGN, USD and EUR."
+
+
+def test_answer_tolerates_small_typos(index):
+    assert index.answer("What are the transfer limit?") == "5,000 per day for verified accounts."
+
+
+def test_answer_leaves_other_questions_to_the_model(index):
+    assert index.answer("How do I reset my PIN on the mobile app?") is None
+    assert index.answer("How long do refunds take?") is None  # a passage, not an FAQ entry
+    assert index.answer("?!") is None
+
+
+def test_search_ranks_passages_and_skips_comments(index):
+    hits = index.search("refunds business days", k=3)
+    assert hits[0][1] == "faq.md" and hits[0][2].startswith("Refunds are processed")
+    assert all("maintained by" not in hit[2] for hit in hits)
+
+
+def test_index_picks_up_edited_files(index, tmp_path):
+    assert index.answer("Do you charge fees?") is None
+    (tmp_path / "knowledge" / "fees.md").write_text("Q: Do you charge fees?\nA: No.\n", encoding="utf-8")
+    index.refresh(force=True)
+    assert index.answer("Do you charge fees?") == "No."
+
+
+def test_a_new_index_reuses_the_stored_passages(index, tmp_path):
+    index.refresh()
+    again = KnowledgeIndex(directory=index.directory, index_path=index.index_path)
+    again.refresh()
+    assert again.answer("how do I reset my password") == 'Use "Forgot password" on the sign-in page.'
@@ -0,0 +1,26 @@
+import sqlite3
+import threading
+
+from dashboard.local_db import ThreadLocalConnection
+
+
+def test_one_connection_per_thread_with_schema_and_setup(tmp_path):
+    db = ThreadLocalConnection(str(tmp_path / "state.sqlite3"), "CREATE TABLE IF NOT EXISTS t (x INTEGER);",
+                               lambda conn: setattr(conn, "row_factory", sqlite3.Row), isolation_level=None)
+    conn = db()
+    assert db() is conn
+    conn.execute("INSERT INTO t VALUES (1)")
+
+    other = []
+    thread = threading.Thread(target=lambda: other.append((db(), db().execute("SELECT x FROM t").fetchone()["x"])))
+    thread.start()
+    thread.join()
+    assert other[0][0] is not conn and other[0][1] == 1
+    assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+
+
+def test_a_forked_process_opens_its_own_connection(tmp_path, monkeypatch):
+    db = ThreadLocalConnection(str(tmp_path / "state.sqlite3"))
+    conn = db()
+    monkeypatch.setattr("dashboard.local_db.os.getpid", lambda: -1)
+    assert db() is not conn
@@ -0,0 +1,48 @@
+from dashboard import long_input
+
+
+def test_split_covers_the_text_with_overlap_and_cuts_at_lines():
+    text = "".join(f"line {i:04d} of the statement\n" for i in range(2000))
+    chunks = long_input.split(text, chunk_tokens=500, overlap_tokens=50)
+    assert len(chunks) > 1
+    assert chunks[0].startswith("line 0000") and chunks[-1].endswith("line 1999 of the statement\n")
+    assert all(chunk.endswith("\n") for chunk in chunks)
+    for previous, chunk in zip(chunks, chunks[1:]):
+        assert chunk.split("\n", 1)[0] in previous  # each chunk starts inside the previous one
+
+
+def test_split_short_text_is_one_chunk():
+    assert long_input.split("short") == ["short"]
+
+
+def run(text, answer=lambda prompt: "note", **kwargs):
+    prompts = []
+
+    def runner(prompt):
+        prompts.append(prompt)
+        return answer(prompt)
+
+    updates = []
+    result = long_input.drain(long_input.collect_notes(text, lambda chunk: chunk, runner, **kwargs), updates.append)
+    return result, prompts, updates
+
+
+def test_collect_notes_caps_the_map_calls_and_says_what_was_left_out():
+    text = "word " * 200_000
+    parts = len(long_input.split(text))
+    result, prompts, updates = run(text, max_chunks=5)
+    assert len(prompts) == 5
+    assert result.startswith(long_input.UNREAD_NOTE.format(read=5, parts=parts))
+    assert updates[-1]["stage"] == "reduce"
+
+
+def test_collect_notes_returns_the_first_failure():
+    result, _, _ = run("word " * 20_000, answer=lambda prompt: "❌ upstream down")
+    assert result == "❌ upstream down"
+
+
+def test_collect_notes_refuses_notes_that_never_fit():
+    # Every note is as long as a chunk, so the combined notes never shrink below the threshold.
+    result, _, updates = run("word " * 20_000, answer=lambda prompt: prompt)
+    assert result.startswith("❌")
+    assert all(update["stage"] == "map" for update in updates)
@@ -0,0 +1,33 @@
+import io
+
+from PIL import Image
+
+from dashboard import ocr
+
+
+def encode(frames, **params):
+    out = io.BytesIO()
+    frames[0].save(out, format="TIFF", save_all=True, append_images=frames[1:], **params)
+    return out.getvalue()
+
+
+def test_frames_are_encoded_one_at_a_time_with_their_dpi():
+    data = encode([Image.new(mode, (400 + i, 300)) for i, mode in enumerate(("1", "L", "RGB", "CMYK"))],
+                  dpi=(600, 600), compression="tiff_lzw")
+    frames = [Image.open(io.BytesIO(frame)) for frame in ocr._frames(data)]
+    assert [(f.mode, f.width, getattr(f, "n_frames", 1)) for f in frames] == [
+        ("1", 400, 1), ("L", 401, 1), ("RGB", 402, 1), ("CMYK", 403, 1)]
+    assert all(f.info["dpi"] == (600, 600) for f in frames)
+
+
+def test_frames_come_out_upright():
+    exif = Image.Exif()
+    exif[0x0112] = 6  # rotated 90 degrees
+    data = encode([Image.new("L", (400, 300)), Image.new("L", (400, 300))], exif=exif)
+    assert [Image.open(io.BytesIO(frame)).size for frame in ocr._frames(data)] == [(300, 400), (300, 400)]
+
+
+def test_single_frame_images_pass_through_unchanged():
+    out = io.BytesIO()
+    Image.new("RGB", (50, 50)).save(out, format="PNG")
+    assert list(ocr._frames(out.getvalue())) == [out.getvalue()]
@@ -0,0 +1,71 @@
+import pandas as pd
+
+from dashboard import prescreen
+
+HEADER = "transaction_id,account_id,amount,timestamp,status,merchant"
+
+
+def transactions(rows):
+    lines = [HEADER] + [",".join(map(str, row)) for row in rows]
+    return "\n".join(lines) + "\n"
+
+
+def normal_rows(n=30):
+    # Ten accounts, one payment an hour each, ordinary amounts.
+    return [(f"t{i}", f"acc{i % 10}", 10 + i % 7, f"2024-01-01 {i // 10:02d}:{i % 10 * 5:02d}:00", "completed",
+             f"shop{i % 4}") for i in range(n)]
+
+
+def test_screen_flags_each_check():
+    rows = normal_rows()
+    rows += [
+        ("d1", "acc1", 99, "2024-01-02 10:00:00", "completed", "dupe"),
+        ("d2", "acc1", 99, "2024-01-02 10:00:00", "completed", "dupe"),  # same content, other id
+        ("n1", "acc2", 55, "2024-01-02 11:00:00", "completed", "near"),
+        ("n2", "acc2", 55, "2024-01-02 11:04:00", "completed", "near"),
+        ("f1", "acc3", 12, "2024-01-02 12:00:00", "declined", "shop1"),
+        ("r1", "acc4", -12, "2024-01-02 13:00:00", "refunded", "shop1"),
+        ("o1", "hist", 5000, "2024-01-05 00:00:00", "completed", "shop2"),
+    ]
+    # An outlier needs enough history for its z-score to stand out.
+    rows += [(f"h{i}", "hist", 40 + i % 3, f"2024-01-04 {i:02d}:00:00", "completed", "shop2") for i in range(15)]
+    rows += [(f"v{i}", "acc9", 20 + i, f"2024-01-03 09:{i * 5:02d}:00", "completed", f"m{i}") for i in range(7)]
+    frame = prescreen.parse_table(transactions(rows))
+    flags, stats = prescreen.screen(frame)
+
+    def flagged(check):
+        return set(frame["transaction_id"][flags[check]])
+
+    assert stats["detected"]["id"] == "transaction_id" and stats["detected"]["account"] == "account_id"
+    assert flagged("exact_duplicate") == {"d1", "d2"}
+    assert flagged("near_duplicate") == {"n1", "n2"}
+    assert flagged("failed_status") == {"f1"}
+    assert flagged("refund_status") == {"r1"}
+    assert flagged("negative_amount") == {"r1"}
+    assert flagged("amount_outlier") == {"o1"}
+    assert {"v5", "v6"} <= flagged("high_velocity") <= {f"v{i}" for i in range(7)}
+    assert stats["rows"] == len(rows) and stats["accounts"] == 11
+
+
+def test_screen_skips_checks_without_their_columns():
+    frame = pd.DataFrame({"note": ["a", "b", "a"], "amount": ["1", "2", "-3"]})
+    flags, stats = prescreen.screen(frame)
+    assert set(flags) == {"exact_duplicate", "negative_amount"}
+    assert stats["negative_amount"] == 1
+
+
+def test_prescreen_shrinks_large_tables():
+    text = transactions(normal_rows(2000))
+    report = prescreen.prescreen(text)
+    assert report is not None and len(report) < len(text)
+    assert report.startswith("Automated pre-screen") and "Rows: 2000" in report
+
+
+def test_prescreen_keeps_tables_the_report_would_not_shrink():
+    # Every row fails, so the report would repeat the whole table plus a summary.
+    rows = [(f"t{i}", f"acc{i}", 10, "2024-01-01 10:00:00", "declined", "shop") for i in range(25)]
+    assert prescreen.prescreen(transactions(rows)) is None
+
+
+def test_prescreen_ignores_prose():
+    assert prescreen.prescreen("Please review my last payment.\n" * 40) is None
@@ -0,0 +1,129 @@
+import asyncio
+import time
+
+import pytest
+import requests
+
+from bench.stub_llm import StubConfig, start_in_thread
+from dashboard import llm_client, providers
+from dashboard.governor import Governor
+from dashboard.providers import Provider, UpstreamError
+
+PAYLOAD = {"messages": [{"role": "user", "content": "hi"}], "max_tokens": 3}
+
+
+def inflight(gov, provider):
+    return gov.stats().get(provider, {}).get("inflight", 0)
+
+
+@pytest.fixture
+def stub():
+    servers = []
+
+    def start(**config):
+        server, url = start_in_thread(StubConfig(jitter=0, tokens_per_sec=1000, **config))
+        servers.append(server)
+        return url
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+@pytest.fixture
+def chain(tmp_path, monkeypatch):
+    """Point ``primary`` and ``backup`` at the given URLs, with a fresh governor and no retries."""
+    gov = Governor(path=str(tmp_path / "governor.sqlite3"), limits="", max_inflight=0)
+    monkeypatch.setattr(providers, "governor", gov)
+    monkeypatch.setattr(providers, "RETRIES", 0)
+    monkeypatch.setattr(providers, "FALLBACK_ENABLED", True)
+    monkeypatch.setattr(providers, "FALLBACK_ORDER", ["primary", "backup"])
+    monkeypatch.setenv("PRIMARY_API_KEY", "test")
+    monkeypatch.setenv("BACKUP_API_KEY", "test")
+
+    def make(primary_url, backup_url):
+        monkeypatch.setattr(providers, "PROVIDERS", {
+            name: Provider(name=name, label=name.title(), url=url, api_key_env=f"{name.upper()}_API_KEY", model="m")
+            for name, url in (("primary", primary_url), ("backup", backup_url))})
+        return gov
+    return make
+
+
+@pytest.mark.parametrize("status", [503, 429])
+def test_a_failing_primary_falls_back_to_the_next_provider(stub, chain, status):
+    gov = chain(stub(latency=0, error_rate=1, error_status=status), stub(latency=0))
+    text, name = providers.complete(PAYLOAD, "primary", hedge_after=0)
+    assert name == "backup" and text == "tok0 tok1 tok2"
+    assert inflight(gov, "primary") == 0
+
+
+def test_a_client_error_is_not_sent_to_the_backup(stub, chain):
+    chain(stub(latency=0, error_rate=1, error_status=400), stub(latency=0))
+    with pytest.raises(UpstreamError) as err:
+        providers.complete(PAYLOAD, "primary", hedge_after=0)
+    assert err.value.provider == "primary" and err.value.status == 400
+
+
+def test_the_hedge_fires_after_the_delay_and_the_faster_answer_wins(stub, chain, capsys):
+    gov = chain(stub(latency=1.5), stub(latency=0))
+    started = time.monotonic()
+    text, name = providers.complete(PAYLOAD, "primary", hedge_after=0.2)
+    assert name == "backup" and 0.2 <= time.monotonic() - started < 1
+    assert "hedging to Backup" in capsys.readouterr().out
+
+    time.sleep(1.5)  # a thread cannot be interrupted; the slow primary still returns its lease
+    assert inflight(gov, "primary") == 0
+
+
+def test_a_primary_that_answers_within_the_delay_is_not_hedged(stub, chain, capsys):
+    chain(stub(latency=0), stub(latency=0))
+    assert providers.complete(PAYLOAD, "primary", hedge_after=1)[1] == "primary"
+    assert "hedging" not in capsys.readouterr().out
+
+
+def test_the_async_hedge_cancels_the_losing_request(stub, chain):
+    gov = chain(stub(latency=3), stub(latency=0))
+
+    async def run():
+        started = time.monotonic()
+        result = await providers.acomplete(PAYLOAD, "primary", hedge_after=0.2)
+        elapsed = time.monotonic() - started
+        await asyncio.sleep(0.2)  # let the cancelled call release its lease
+        leases = inflight(gov, "primary")
+        await llm_client.aclose()
+        return result, elapsed, leases
+
+    (text, name), elapsed, leases = asyncio.run(run())
+    assert name == "backup" and elapsed < 1
+    assert leases == 0  # released long before the primary's 3s answer
+
+
+def test_a_stream_that_fails_midway_is_not_retried_elsewhere(stub, chain, monkeypatch):
+    primary_url, backup_url = stub(latency=0), stub(latency=0)
+    chain(primary_url, backup_url)
+    real_stream_post, urls = llm_client.stream_post, []
+
+    def stream_post(url, **kwargs):
+        urls.append(url)
+        for delta in real_stream_post(url, **kwargs):
+            yield delta
+            if url == primary_url:
+                raise requests.exceptions.ChunkedEncodingError("connection dropped")
+    monkeypatch.setattr(llm_client, "stream_post", stream_post)
+
+    deltas = []
+    with pytest.raises(UpstreamError) as err:
+        for delta in providers.stream(PAYLOAD, "primary"):
+            deltas.append(delta)
+    assert deltas == [" tok0"] and err.value.provider == "primary"
+    assert urls == [primary_url]  # the backup would repeat the tokens already shown
+
+
+def test_a_stream_that_fails_before_its_first_token_falls_back(stub, chain):
+    chain(stub(latency=0, error_rate=1), stub(latency=0))
+    gen = providers.stream(PAYLOAD, "primary")
+    deltas = []
+    with pytest.raises(StopIteration) as done:
+        while True:
+            deltas.append(next(gen))
+    assert "".join(deltas) == " tok0 tok1 tok2" and done.value.value == "backup"
@@ -0,0 +1,42 @@
+import io
+
+from dashboard import tabular
+
+
+def table(text, filename="t.csv", **kwargs):
+    return tabular.extract_table(io.BytesIO(text.encode("utf-8")), filename, **kwargs).splitlines()
+
+
+def test_codes_that_look_numeric_are_kept_verbatim():
+    rows = table("acct,zip,ref,card\n00123,02134,00000,12345678901234567\n0123,10001,5,1\n")
+    assert rows[1:] == ["00123,02134,00000,12345678901234567", "0123,10001,5,1"]
+
+
+def test_amounts_are_normalised():
+    rows = table('amount,fee\n"$1,234.50",(3.335)\n7,0.50\n')
+    assert rows[1:] == ["1234.5,-3.34", "7,0.5"]
+
+
+def test_long_amount_keeps_every_digit():
+    assert table("amount\n123456789012345.25\n")[1] == "123456789012345.25"
+
+
+def test_dates_and_long_headers():
+    rows = table("Posted Date,Customer Reference Number For Settlement\n2024-01-05,A1\n2024-01-06 10:30:00,A2\n")
+    assert rows == ["posted_date,cust_refe_numb_for_sett", "2024-01-05,A1", "2024-01-06 10:30,A2"]
+
+
+def test_repeated_header_rows_are_dropped():
+    assert table("id,amount\na,1\nid,amount\nb,2\n") == ["id,amount", "a,1", "b,2"]
+
+
+def test_truncation_counts_the_rest():
+    rows = table("n\n" + "".join(f"{i}\n" for i in range(100)), max_chars=20)
+    assert rows[-1] == tabular.TRUNCATED_NOTE.format(rows=100 - (len(rows) - 2))
+
+
+def test_the_extension_decides_how_the_same_bytes_are_parsed():
+    data = b"a;b c\n1;2 3\n4;5 6\n"
+    assert [tabular.reader_for(name) for name in ("x.CSV", "x.tsv", "x.xlsx", None)] == ["csv", "tsv", "xlsx", "csv"]
+    assert tabular.extract_table(io.BytesIO(data), "x.csv") == "a,b_c\n1,2 3\n4,5 6\n"
+    assert tabular.extract_table(io.BytesIO(data), "x.tsv") == "a_b_c\n1;2 3\n4;5 6\n"
@@ -0,0 +1,75 @@
+import hashlib
+import io
+
+import pytest
+from flask import Flask, jsonify, request
+from werkzeug.exceptions import RequestEntityTooLarge
+
+from dashboard import uploads
+from dashboard.uploads import MB, SpooledUpload, UploadRequest
+
+
+def test_parse_limits():
+    assert uploads.parse_limits("audio=50, pdf=0.5,,bad") == {"audio": 50 * MB, "pdf": MB // 2}
+
+
+def test_kind_for():
+    assert [uploads.kind_for(name) for name in ("a.WAV", "scan.jpeg", "doc.pdf", "sheet.xlsx", "notes.txt", None)] == [
+        "audio", "image", "pdf", "table", "text", "text"]
+
+
+def test_each_type_has_its_own_limit(monkeypatch):
+    monkeypatch.setattr(uploads, "LIMITS", {"image": 10, "text": 100})
+    SpooledUpload("notes.txt").write(b"x" * 50)
+    image = SpooledUpload("scan.png")
+    image.write(b"x" * 10)
+    with pytest.raises(RequestEntityTooLarge, match="scan.png is larger than .* allowed for image files"):
+        image.write(b"x")
+
+
+def test_sha256_is_computed_while_spooling(monkeypatch):
+    monkeypatch.setattr(uploads, "SPOOL_BYTES", 1000)
+    upload = SpooledUpload("data.csv")
+    chunks = [bytes([i]) * 300 for i in range(10)]
+    for chunk in chunks:
+        upload.write(chunk)
+    assert upload._rolled  # past the spool size, now a temp file
+    assert upload.sha256() == hashlib.sha256(b"".join(chunks)).hexdigest()
+    upload.seek(0)
+    assert upload.read() == b"".join(chunks)
+
+
+def test_uploads_are_received_as_hashed_spooled_files():
+    app = Flask(__name__)
+    app.request_class = UploadRequest
+
+    @app.post("/")
+    def receive():
+        stream = request.files["file"].stream
+        return jsonify(kind=stream.kind, size=stream.size, sha256=stream.sha256())
+
+    data = b"a,b\n1,2\n"
+    response = app.test_client().post("/", data={"file": (io.BytesIO(data), "t.csv")})
+    assert response.get_json() == {"kind": "table", "size": len(data), "sha256": hashlib.sha256(data).hexdigest()}
+
+
+@pytest.fixture
+def client():
+    from app import app
+    return app.test_client()
+
+
+def test_an_oversized_file_gets_a_413_naming_its_limit(client, monkeypatch):
+    monkeypatch.setattr(uploads, "LIMITS", dict(uploads.LIMITS, image=MB))
+    response = client.post("/", data={"agent": "summarize", "image_file": (io.BytesIO(b"x" * (MB + 1)), "big.png")})
+    assert response.status_code == 413
+    assert response.get_json() == {"error": "big.png is larger than the 1 MB allowed for image files"}
+
+
+def test_an_oversized_body_is_refused_before_it_is_read(client, monkeypatch):
+    monkeypatch.setattr(uploads, "MAX_BYTES", 2 * MB)
+    monkeypatch.setitem(client.application.config, "MAX_CONTENT_LENGTH", 2 * MB)
+    monkeypatch.setattr(SpooledUpload, "write", lambda self, data: pytest.fail("the body was read"))
+    response = client.post("/", data={"text_file": (io.BytesIO(b"x" * 3 * MB), "big.txt")})
+    assert response.status_code == 413
+    assert response.get_json() == {"error": "Request is larger than the 2 MB upload limit"}